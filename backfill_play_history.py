@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script para copiar o histórico legado (spotify_tracks) para o esquema normalizado
+Roda fora da inicialização do bot, em lotes com um commit por lote; pode ser
+repetido sem duplicar reproduções (nem as que o bot já gravou com horário
+próximo, dentro de PLAY_DEDUP_WINDOW). Ao final, reconstrói agregados e crowns
+Uso:
+    python backfill_play_history.py
+    python backfill_play_history.py --batch-size 5000
+"""
+import argparse
+import asyncio
+from sqlalchemy import delete, select
+from src.database.db import db
+from src.database.models import SpotifyTrack, Track, TrackArtist
+from src.database.plays import (
+    resolve_track,
+    resolve_artist,
+    link_track_artists,
+    play_row,
+    insert_plays
+)
+from src.database.aggregates import rebuild_group_artist_plays, recompute_group_crowns
+
+def legacy_payload(row):
+    """Música no formato da API a partir de uma linha legada (sem IDs de artista e álbum)"""
+    return {
+        'id': row.track_id,
+        'name': row.track_name,
+        'album': {
+            'id': None,
+            'name': row.album_name,
+            'images': [{'url': row.album_image_url}] if row.album_image_url else []
+        },
+        # O texto legado juntava os artistas com ", ", mas nomes reais também têm
+        # vírgula ("Tyler, The Creator"): fica um único artista até o play ao vivo
+        'artists': [{'id': None, 'name': row.artist_name}]
+    }
+
+async def resolve_batch(session, rows, track_ids, repaired):
+    """Resolve as músicas de um lote, criando as novas e corrigindo as legadas já copiadas"""
+    pending = {row.track_id: row for row in rows if row.track_id not in track_ids}
+    if not pending:
+        return
+
+    result = await session.execute(
+        select(Track.spotify_id, Track.id, Track.legacy).where(Track.spotify_id.in_(pending))
+    )
+    for spotify_id, track_id, legacy in result.all():
+        track_ids[spotify_id] = track_id
+        if legacy and track_id not in repaired:
+            # Cópias anteriores quebravam o texto na vírgula: volta ao artista único
+            artist_id = await resolve_artist(session, None, pending[spotify_id].artist_name)
+            await session.execute(delete(TrackArtist).where(TrackArtist.track_id == track_id))
+            await link_track_artists(session, track_id, [artist_id])
+            repaired.add(track_id)
+
+    for spotify_id, row in pending.items():
+        if spotify_id not in track_ids:
+            track_ids[spotify_id] = await resolve_track(session, legacy_payload(row), legacy=True)
+
+async def main(batch_size):
+    await db.init_db()
+
+    legacy = SpotifyTrack.__table__
+    track_ids = {}
+    repaired = set()
+    group_ids = set()
+    last_id = 0
+    copied = 0
+
+    while True:
+        async with db.session_maker() as session:
+            result = await session.execute(
+                select(legacy).where(legacy.c.id > last_id).order_by(legacy.c.id).limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            await resolve_batch(session, rows, track_ids, repaired)
+
+            # Mesma chave única dos plays ao vivo: linhas legadas a até PLAY_DEDUP_WINDOW s
+            # de outra da mesma música (já copiada, gravada ao vivo ou no próprio lote) são ignoradas
+            copied += len(await insert_plays(session, [
+                play_row(row.user_id, row.group_id, track_ids[row.track_id], row.played_at)
+                for row in rows
+            ]))
+            await session.commit()
+
+        group_ids.update(row.group_id for row in rows)
+        last_id = rows[-1].id
+        print(f"📥 Até o id {last_id}: {copied} reproduções novas, {len(track_ids)} músicas")
+
+    # Os agregados passam a contar as reproduções copiadas e as ligações corrigidas
+    for gid in sorted(group_ids):
+        async with db.session_maker() as session:
+            rows = await rebuild_group_artist_plays(session, gid)
+            crowns = await recompute_group_crowns(session, gid)
+            await session.commit()
+            print(f"✅ Grupo {gid}: {rows} linhas reconstruídas, {crowns} crowns")
+
+    print(f"🎵 {copied} reproduções copiadas, {len(repaired)} músicas legadas corrigidas")
+    await db.engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copia o histórico legado para o esquema normalizado")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Linhas legadas por lote")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1 @@
+"""Benchmarks e fixtures reproduzíveis"""
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Custo por mensagem do AutoMod em grupos com AutoMod desabilitado
+Reproduz mensagens sintéticas por grupos desabilitados e por grupos sem
+registro, comparando o caminho antigo (get_chat_member + SELECT do grupo a
+cada mensagem) com o atual (MessageContext.load com as configurações em
+cache + check_automod), e mostra o recarregamento após invalidar o cache
+O get_chat_member do caminho antigo é simulado localmente: o custo real
+(uma chamada à API do Telegram) seria ainda maior
+Uso:
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m bench.automod_overhead
+    python -m bench.automod_overhead --messages 5000
+Grava grupos de teste no banco de DATABASE_URL: use um banco descartável
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from src.database.db import db
+from src.database.models import Group
+from src.modules.automod import check_automod
+from src.utils.group_settings import get_group_settings, invalidate_group_settings, group_settings_cache
+from src.utils.message_context import MessageContext
+
+DISABLED_GROUP = -990001
+MISSING_GROUP = -990002
+
+
+class StubBot:
+    """Bot sem rede: todo mundo é membro comum"""
+
+    async def get_chat_member(self, chat_id, user_id):
+        return SimpleNamespace(status="member")
+
+
+def make_update(chat_id, text):
+    user = SimpleNamespace(id=1, first_name="Ana", last_name=None, username="ana", is_bot=False)
+    chat = SimpleNamespace(id=chat_id, title="Grupo", type="supergroup")
+    message = SimpleNamespace(text=text, entities=(), from_user=user, chat=chat)
+    return SimpleNamespace(message=message, effective_chat=chat, effective_user=user, effective_message=message)
+
+
+async def old_check(update, context):
+    """Início do check_automod antigo, até decidir que o AutoMod está desabilitado"""
+    member = await context.bot.get_chat_member(update.effective_chat.id, update.effective_user.id)
+    if member.status in ["administrator", "creator"]:
+        return
+    async with db.session_maker() as session:
+        result = await session.execute(select(Group).where(Group.id == update.effective_chat.id))
+        group = result.scalar_one_or_none()
+        if not group or not group.automod_enabled:
+            return
+
+
+async def new_check(update, context):
+    message = await MessageContext.load(update)
+    await check_automod(update, context, message)
+
+
+async def measure(check, update, context, messages):
+    await check(update, context)
+    started = time.perf_counter()
+    for _ in range(messages):
+        await check(update, context)
+    return (time.perf_counter() - started) / messages * 1e6
+
+
+async def main(messages):
+    await db.init_db()
+    try:
+        async with db.session_maker() as session:
+            if await session.get(Group, DISABLED_GROUP) is None:
+                session.add(Group(id=DISABLED_GROUP, title="Bench", automod_enabled=False))
+            missing = await session.get(Group, MISSING_GROUP)
+            if missing is not None:
+                await session.delete(missing)
+            await session.commit()
+
+        context = SimpleNamespace(bot=StubBot())
+        print(f"⚡ {messages} mensagens por cenário (µs por mensagem)")
+        for label, chat_id in (("AutoMod desabilitado", DISABLED_GROUP), ("grupo sem registro", MISSING_GROUP)):
+            update = make_update(chat_id, "mensagem comum do grupo")
+            before = await measure(old_check, update, context, messages)
+            after = await measure(new_check, update, context, messages)
+            print(f"   {label}: antigo {before:.1f}µs, atual {after:.1f}µs ({before / after:.0f}x)")
+
+        # Após uma alteração no painel, a próxima mensagem volta a ler o banco
+        await invalidate_group_settings(DISABLED_GROUP)
+        started = time.perf_counter()
+        await get_group_settings(DISABLED_GROUP)
+        print(f"🔄 Primeira leitura após invalidar: {(time.perf_counter() - started) * 1e6:.0f}µs")
+        print(f"   cache: {group_settings_cache.stats()}")
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo por mensagem do AutoMod desabilitado")
+    parser.add_argument("--messages", type=int, default=3000, help="Mensagens por cenário")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages))
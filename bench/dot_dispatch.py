@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do despacho dos comandos de ponto (.fm, .wk, .chart...)
+Compara a cadeia antiga de oito MessageHandler com filters.Regex (testados em
+ordem para cada mensagem) com o DotCommandDispatcher, usando a tabela real
+registrada por register_spotify_handlers; mostra também o resultado de casos
+de borda (aliases, maiúsculas, prefixos parecidos e argumentos)
+Uso:
+    python -m bench.dot_dispatch
+    python -m bench.dot_dispatch --messages 1000000 --dot-share 0.1
+"""
+import argparse
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from src.modules.spotify_music import register_spotify_handlers
+from src.utils.dot_commands import dot_commands
+
+# Padrões dos handlers antigos, na ordem em que eram registrados
+OLD_PATTERNS = [
+    (re.compile(pattern), name) for pattern, name in [
+        (r'^\.fm\b', "fm"), (r'^\.w\b', "w"), (r'^\.profile\b', "profile"),
+        (r'^\.plays\b', "plays"), (r'^\.chart\b', "chart"), (r'^\.whoknows\b', "whoknows"),
+        (r'^\.crowns\b', "crowns"), (r'^\.friends\b', "friends")
+    ]
+]
+
+EDGE_CASES = [".fm", ".FM", ".np", ".fm!", ".fmx", ".w", ".wk radiohead", ".whoknows the beatles",
+              ".who", ".chart m", ".friends 2", "oi", ". fm", ".plays  x"]
+
+CHAT = ["oi", "kkkk", "bom dia", "alguém aí?", "veja isso", "hoje tem show", "...",
+        "https://x.com", ". não", ".com certeza"]
+DOT = [".fm", ".np", ".whoknows radiohead", ".wk", ".chart w", ".w", ".crowns", ".friends"]
+
+
+def old_match(text):
+    for pattern, name in OLD_PATTERNS:
+        if pattern.search(text):
+            return name
+    return None
+
+
+def measure(label, corpus, match):
+    started = time.perf_counter()
+    for text in corpus:
+        match(text)
+    elapsed = time.perf_counter() - started
+    print(f"   {label}: {elapsed / len(corpus) * 1e9:.0f} ns/mensagem")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark do despacho dos comandos de ponto")
+    parser.add_argument("--messages", type=int, default=100_000, help="Mensagens no corpus")
+    parser.add_argument("--dot-share", type=float, default=0.05, help="Fração de comandos de ponto")
+    args = parser.parse_args()
+
+    # Registra a tabela real; os outros handlers do módulo são ignorados
+    register_spotify_handlers(SimpleNamespace(add_handler=lambda *a, **k: None))
+
+    print("🔎 Casos de borda (antigo -> despachante)")
+    for text in EDGE_CASES:
+        found = dot_commands.match(text)
+        new = (found[0].__name__, found[1]) if found else None
+        print(f"   {text!r}: {old_match(text)} -> {new}")
+
+    random.seed(3)
+    corpus = [
+        random.choice(DOT) if random.random() < args.dot_share else random.choice(CHAT)
+        for _ in range(args.messages)
+    ]
+    dots = [text for text in corpus if text.startswith(".")]
+
+    print(f"⚡ {len(corpus)} mensagens ({args.dot_share:.0%} comandos de ponto)")
+    measure("cadeia de regex", corpus, old_match)
+    measure("despachante", corpus, dot_commands.match)
+    print(f"⚡ Só mensagens começando com ponto ({len(dots)})")
+    measure("cadeia de regex", dots, old_match)
+    measure("despachante", dots, dot_commands.match)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark do detector de flood do AutoMod
+Reproduz as fixtures (um JSON por linha com t, chat, user, text e o veredito
+esperado) contra um FloodDetector novo, mostra a semelhança de pares de
+exemplo em torno do limite FLOOD_SIMILARITY e mede mensagens/s e a memória limitada
+Uso:
+    python -m bench.flood_detector
+    python -m bench.flood_detector --messages 500000
+    python -m bench.flood_detector --fixtures bench/fixtures/flood
+Termina com código 1 se algum veredito divergir das fixtures
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from src.config import FLOOD_SIMILARITY, FLOOD_IDLE_TTL
+from src.utils.flood import FloodDetector, fingerprint, similarity
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "flood"
+
+# Variações típicas de spam e de conversa, do mais parecido ao mais diferente
+PAIRS = [
+    ("compre agora promo imperdível no link", "Compre agora promo imperdivel no link!"),
+    ("entre no grupo vip e ganhe pix grátis", "ENTRE no grupo VIP e ganhe pix gratis!!"),
+    ("entre no grupo vip e ganhe pix grátis", "entre no grupo vip e ganhe pix grátis hoje"),
+    ("alguém vai no show do radiohead amanhã", "alguém vai no show do radiohead sábado"),
+    ("compre agora promo imperdível no link", "compre já promo imperdível no link"),
+    ("ganhe 500 reais por dia trabalhando de casa", "ganhe 800 reais por dia trabalhando de casa"),
+    ("sigam meu perfil link na bio", "sigam meu perfil novo link na bio"),
+    ("alguém vai no show do radiohead amanhã", "quem vai no show amanhã?"),
+    ("bom dia grupo", "boa noite pessoal"),
+    ("compre agora promo imperdível no link", "quem vai no show amanhã?"),
+]
+
+WORDS = ["olá", "pessoal", "música", "hoje", "show", "álbum", "ouvindo", "banda",
+         "novo", "legal", "que", "de", "para", "muito", "bom", "kkkk"]
+
+
+def replay_fixtures(directory):
+    """Reproduz cada arquivo de fixtures e retorna quantos divergiram"""
+    failures = 0
+    for path in sorted(directory.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+
+        detector = FloodDetector(FLOOD_IDLE_TTL, 1000)
+        got = [detector.observe(e["chat"], e["user"], e["text"], now=e["t"]) for e in events]
+        expected = [e["expected"] for e in events]
+        if got == expected:
+            print(f"✅ {path.stem}: {len(events)} mensagens")
+        else:
+            failures += 1
+            print(f"❌ {path.stem}: esperado {expected}, obtido {got}")
+    return failures
+
+
+def report_similarities():
+    """Semelhança dos pares de exemplo contra o limite configurado"""
+    print(f"📏 Limite de semelhança: {FLOOD_SIMILARITY:.2f}")
+    for a, b in PAIRS:
+        score = similarity(fingerprint(a), fingerprint(b))
+        verdict = "repetição" if score >= FLOOD_SIMILARITY else "distinta"
+        print(f"   {score:.2f} ({verdict}): {a!r} x {b!r}")
+
+
+def run_throughput(messages, users, chats):
+    """Mensagens/s num corpus sintético e número de estados mantidos"""
+    random.seed(2)
+    corpus = [
+        (random.randint(1, users), " ".join(random.choices(WORDS, k=random.randint(2, 15))))
+        for _ in range(messages)
+    ]
+    detector = FloodDetector(FLOOD_IDLE_TTL, users)
+
+    started = time.perf_counter()
+    for i, (user_id, text) in enumerate(corpus):
+        detector.observe(-100 - user_id % chats, user_id, text, now=i * 0.001)
+    elapsed = time.perf_counter() - started
+
+    print(f"⚡ {messages} mensagens em {elapsed:.2f}s ({messages / elapsed:.0f}/s)")
+    print(f"   {detector.stats()}")
+
+    # Memória limitada: usuários novos além do máximo descartam os mais antigos
+    bounded = FloodDetector(FLOOD_IDLE_TTL, 1000)
+    for i in range(20 * 1000):
+        bounded.observe(-1, i, "oi", now=i * 0.001)
+    print(f"🧹 20000 usuários com limite 1000: {bounded.stats()['tracked']} mantidos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do detector de flood")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR, help="Diretório com as fixtures .jsonl")
+    parser.add_argument("--messages", type=int, default=200_000, help="Mensagens do corpus sintético")
+    parser.add_argument("--users", type=int, default=5000, help="Usuários distintos no corpus")
+    parser.add_argument("--chats", type=int, default=20, help="Grupos distintos no corpus")
+    args = parser.parse_args()
+
+    failures = replay_fixtures(args.fixtures)
+    report_similarities()
+    run_throughput(args.messages, args.users, args.chats)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
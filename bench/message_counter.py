@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do contador de mensagens do rank
+Reproduz mensagens sintéticas (100k por padrão) pelo message_counter e, numa
+amostra, pelo caminho antigo (get_or_create_user, get_or_create_group e
+increment_message_count com commit por mensagem), contando os comandos SQL
+de cada um e conferindo que o total gravado bate com as mensagens enviadas
+Uso:
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m bench.message_counter
+    python -m bench.message_counter --messages 100000 --users 2000 --groups 20 --baseline 2000
+Grava no banco de DATABASE_URL: use um banco descartável
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import event, func, select
+
+from src.database.db import db
+from src.database.message_counter import message_counter
+from src.database.models import GroupUser
+
+# Grupos do caminho antigo ficam em outra faixa para não somar com os do contador
+BASELINE_GROUP_OFFSET = 1_000_000
+
+
+class StatementCounter:
+    """Conta os comandos SQL enviados ao banco"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def take(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+def synthetic_messages(count, users, groups):
+    random.seed(1)
+    for _ in range(count):
+        user_id = random.randint(1, users)
+        group_id = -random.randint(1, groups)
+        yield group_id, f"Grupo {group_id}", user_id, f"user{user_id}", f"Usuário {user_id}", None
+
+
+async def total_messages(group_ids):
+    async with db.session_maker() as session:
+        result = await session.execute(
+            select(func.coalesce(func.sum(GroupUser.message_count), 0))
+            .where(GroupUser.group_id.in_(group_ids))
+        )
+        return result.scalar()
+
+
+async def run_baseline(messages, users, groups, statements):
+    """Caminho antigo: três get_or_create e um commit por mensagem"""
+    statements.take()
+    started = time.monotonic()
+    for group_id, title, user_id, username, first_name, last_name in synthetic_messages(messages, users, groups):
+        group_id -= BASELINE_GROUP_OFFSET
+        async with db.session_maker() as session:
+            await db.get_or_create_user(session, user_id, username, first_name, last_name)
+            await db.get_or_create_group(session, group_id, title)
+            await db.increment_message_count(session, user_id, group_id)
+    elapsed = time.monotonic() - started
+
+    print(f"🐢 Antigo: {messages} mensagens em {elapsed:.2f}s ({messages / elapsed:,.0f}/s), "
+          f"{statements.take() / messages:.1f} comandos SQL por mensagem")
+
+
+async def run_counter(messages, users, groups, statements):
+    """Contador em memória com gravação em lote periódica"""
+    group_ids = [-g for g in range(1, groups + 1)]
+    before = await total_messages(group_ids)
+    statements.take()
+
+    started = time.monotonic()
+    for i, message in enumerate(synthetic_messages(messages, users, groups)):
+        message_counter.record(*message)
+        # Devolve o loop de vez em quando, como entre updates reais, para a gravação periódica rodar
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    recorded = time.monotonic() - started
+    await message_counter.close()
+    elapsed = time.monotonic() - started
+
+    sql = statements.take()
+    written = await total_messages(group_ids) - before
+    print(f"⚡ Contador: {messages} mensagens registradas em {recorded:.2f}s "
+          f"({messages / recorded:,.0f}/s), gravadas em {elapsed:.2f}s")
+    print(f"   {sql} comandos SQL ({sql / messages:.3f} por mensagem)")
+    print(f"   total gravado: {written} {'✅' if written == messages else '❌'}")
+    print(f"   {message_counter.stats()}")
+
+
+async def main(messages, users, groups, baseline):
+    await db.init_db()
+    statements = StatementCounter(db.engine)
+    try:
+        if baseline:
+            await run_baseline(baseline, users, groups, statements)
+        await run_counter(messages, users, groups, statements)
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do contador de mensagens")
+    parser.add_argument("--messages", type=int, default=100_000, help="Mensagens pelo contador")
+    parser.add_argument("--users", type=int, default=2000, help="Usuários distintos")
+    parser.add_argument("--groups", type=int, default=20, help="Grupos distintos")
+    parser.add_argument("--baseline", type=int, default=2000,
+                        help="Mensagens pelo caminho antigo (0 para pular)")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages, args.users, args.groups, args.baseline))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Verificação do RedisCache contra um servidor Redis em memória (fakeredis)
+Confere ida e volta em JSON (inclusive None como cache negativo), expiração
+pelo TTL, invalidação, erros de conexão e valores corrompidos tratados como
+miss, carga única por chave e o cliente por loop de redis_client (thread
+separada, como o servidor OAuth sob start.py) vendo os mesmos dados; no fim,
+mede get/s
+Uso:
+    python -m bench.redis_cache
+    python -m bench.redis_cache --lookups 50000
+Requer o pacote fakeredis (pip install fakeredis); termina com código 1 se
+alguma verificação falhar
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import fakeredis
+
+import src.utils.cache as cache_module
+from src.utils.cache import RedisCache, redis_client
+
+# Servidor em memória compartilhado pelos clientes criados com a mesma URL
+FAKE_URL = "redis://bench-fakeredis:6379/0"
+
+VALUES = {
+    "dicionário": {"id": 42, "nome": "Ação", "tags": ["a", "b"], "ativo": True},
+    "lista": [1, 2.5, "três", None],
+    "texto": "olá, 世界",
+    "número": 1234567890123,
+    "None (cache negativo)": None,
+}
+
+
+class Checks:
+    """Resultados das verificações"""
+
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, label, ok, detail=""):
+        if not ok:
+            self.failures += 1
+        print(f"{'✅' if ok else '❌'} {label}{f': {detail}' if detail and not ok else ''}")
+
+
+async def run_checks(checks):
+    cache = RedisCache("bench", 60, redis_client)
+
+    for label, value in VALUES.items():
+        await cache.set(("valor", label), value)
+        found, loaded = await cache.get(("valor", label))
+        checks.check(f"JSON ida e volta: {label}", found and loaded == value, f"{found}, {loaded!r}")
+
+    await cache.set("curto", "x", ttl=0.2)
+    found_before, _ = await cache.get("curto")
+    await asyncio.sleep(0.3)
+    found_after, _ = await cache.get("curto")
+    checks.check("TTL: presente antes e ausente depois de expirar", found_before and not found_after)
+
+    await cache.set("removida", 1)
+    await cache.invalidate("removida")
+    found, _ = await cache.get("removida")
+    checks.check("invalidação", not found)
+
+    await redis_client().set(cache._key("corrompida"), b"{nao e json")
+    found, _ = await cache.get("corrompida")
+    checks.check("valor corrompido vira miss", not found)
+
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        return {"carregado": True}
+
+    results = await asyncio.gather(*(cache.get_or_load("coalescida", loader) for _ in range(20)))
+    checks.check(
+        "get_or_load: uma carga para 20 chamadas concorrentes",
+        loads == 1 and all(result == {"carregado": True} for result in results),
+        f"{loads} cargas"
+    )
+
+    # Servidor fora do ar: leitura e gravação viram miss, e o loader é usado
+    offline_server = fakeredis.FakeServer()
+    offline_server.connected = False
+    offline_client = fakeredis.aioredis.FakeRedis(server=offline_server)
+    offline = RedisCache("bench", 60, lambda: offline_client)
+    found, _ = await offline.get(("valor", "texto"))
+    await offline.set("offline", 1)
+    value = await offline.get_or_load("offline", lambda: asyncio.sleep(0, result="da fonte"))
+    # get, set e o get/set do get_or_load: quatro erros contados
+    checks.check(
+        "erro de conexão vira miss",
+        not found and value == "da fonte" and offline.errors == 4,
+        f"found={found}, value={value!r}, erros={offline.errors}"
+    )
+
+    # Outro loop em outra thread (como o servidor OAuth): cliente próprio, mesmos dados
+    seen = {}
+
+    def other_thread():
+        async def read():
+            seen["value"] = (await cache.get(("valor", "dicionário")))[1]
+            seen["client"] = redis_client()
+        asyncio.run(read())
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+    checks.check(
+        "outro loop: cliente próprio e os mesmos dados",
+        seen.get("value") == VALUES["dicionário"] and seen.get("client") is not redis_client()
+    )
+    print(f"   {cache.stats()}")
+
+
+async def run_throughput(lookups):
+    cache = RedisCache("bench", 60, redis_client)
+    await cache.set("quente", VALUES["dicionário"])
+
+    started = time.perf_counter()
+    for _ in range(lookups):
+        await cache.get("quente")
+    elapsed = time.perf_counter() - started
+    print(f"⚡ {lookups} leituras em {elapsed:.2f}s ({lookups / elapsed:,.0f}/s, fakeredis em processo)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificação do RedisCache com fakeredis")
+    parser.add_argument("--lookups", type=int, default=10_000, help="Leituras na medição de throughput")
+    args = parser.parse_args()
+
+    # Os avisos de erro esperados (servidor fora do ar, valor corrompido) poluiriam a saída
+    logging.basicConfig(level=logging.ERROR)
+    # redis_client passa a abrir clientes fakeredis no lugar do pacote redis
+    cache_module.aioredis = SimpleNamespace(from_url=fakeredis.aioredis.FakeRedis.from_url)
+    cache_module.CACHE_URL = FAKE_URL
+
+    checks = Checks()
+    asyncio.run(run_checks(checks))
+    asyncio.run(run_throughput(args.lookups))
+    sys.exit(1 if checks.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Harness do governador de taxa do Spotify contra um servidor local que responde 429
+Sobe um stub aiohttp no lugar da API e passa pelo spotify_client três cenários:
+rajadas de 429 com Retry-After curto (as chamadas esperam e são repetidas),
+Retry-After maior que o prazo da fila (as chamadas são descartadas com 429) e
+mais chamadas do que o orçamento do endpoint (o excedente nem sai do processo)
+Uso:
+    python -m bench.spotify_429
+    python -m bench.spotify_429 --requests 50 --bursts 3 --retry-after 1
+Depois de cada cenário mostra spotify_governor.stats() e as respostas do stub
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from src.utils.spotify_client import spotify_client
+from src.utils.rate_limit import spotify_governor
+
+
+class StubSpotify:
+    """API falsa: responde 429 enquanto houver rajada pendente, senão a música atual"""
+
+    def __init__(self):
+        self.pending_429 = 0
+        self.retry_after = "1"
+        self.responses = Counter()
+
+    async def currently_playing(self, request):
+        if self.pending_429 > 0:
+            self.pending_429 -= 1
+            self.responses["429"] += 1
+            return web.Response(status=429, headers={"Retry-After": self.retry_after})
+        self.responses["200"] += 1
+        return web.json_response({"is_playing": True, "item": {"id": "stub", "name": "Stub"}})
+
+
+async def run_scenario(name, stub, url, requests, queue_timeout):
+    """Dispara as chamadas em paralelo e mostra o resultado e os contadores"""
+    stub.responses.clear()
+    started = time.monotonic()
+    results = await asyncio.gather(*(
+        spotify_client.get(url, "token", queue_timeout=queue_timeout) for _ in range(requests)
+    ))
+    elapsed = time.monotonic() - started
+
+    statuses = Counter(status for status, _ in results)
+    print(f"▶️ {name}: {requests} chamadas em {elapsed:.2f}s")
+    print(f"   cliente: {dict(statuses)}  stub: {dict(stub.responses)}")
+    print(f"   governador: {spotify_governor.stats()}")
+
+
+async def main(port, requests, bursts, retry_after):
+    stub = StubSpotify()
+    app = web.Application()
+    app.router.add_get("/v1/me/player/currently-playing", stub.currently_playing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    url = f"http://127.0.0.1:{port}/v1/me/player/currently-playing"
+
+    try:
+        # 1. Rajadas curtas: cada 429 pausa todas as chamadas e elas são repetidas
+        stub.pending_429 = bursts
+        stub.retry_after = str(retry_after)
+        await run_scenario("Retry-After curto", stub, url, requests,
+                           queue_timeout=bursts * retry_after + 5)
+
+        # 2. Retry-After além do prazo da fila: quem chega durante a pausa desiste em vez de esperar
+        stub.pending_429 = 1
+        stub.retry_after = str(retry_after * 5)
+        await run_scenario("429 com Retry-After longo", stub, url, 1, queue_timeout=retry_after)
+        await run_scenario("Chamadas durante a pausa", stub, url, requests, queue_timeout=retry_after)
+
+        # Espera a pausa acabar para o próximo cenário medir só o orçamento
+        await asyncio.sleep(spotify_governor.stats()["cooldown_seconds"])
+
+        # 3. Mais chamadas que o orçamento do endpoint: o excedente é descartado localmente
+        # (os cenários anteriores já consumiram parte do orçamento)
+        budget = spotify_governor.budget("currently-playing", 30)
+        await run_scenario(f"Acima do orçamento ({budget} por 30s)", stub, url, budget * 2,
+                           queue_timeout=1)
+    finally:
+        await spotify_client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harness de 429 do cliente Spotify")
+    parser.add_argument("--port", type=int, default=8766, help="Porta do stub local")
+    parser.add_argument("--requests", type=int, default=20, help="Chamadas paralelas por cenário")
+    parser.add_argument("--bursts", type=int, default=3, help="Respostas 429 na primeira rajada")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After do stub, em segundos")
+    args = parser.parse_args()
+
+    # Os descartes aparecem nos contadores; o aviso por chamada só polui a saída
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(args.port, args.requests, args.bursts, args.retry_after))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cliente Spotify compartilhado contra um servidor local
+Sobe um stub aiohttp de /me/player/currently-playing e mede p50/p99 de
+1.000 consultas do .fm sequenciais e 1.000 concorrentes em dois modos: uma
+ClientSession nova por chamada (como os helpers faziam) e o spotify_client
+com pool keep-alive. O stub é HTTP local: com TLS até api.spotify.com o
+handshake evitado pelo pool custa bem mais
+Uso:
+    python -m bench.spotify_client
+    python -m bench.spotify_client --lookups 5000 --latency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+import src.utils.spotify_client as spotify_client_module
+from src.utils.rate_limit import SpotifyRateGovernor
+from src.utils.spotify_client import spotify_client
+
+TRACK = {
+    "is_playing": True,
+    "item": {
+        "id": "stub", "name": "Stub", "artists": [{"id": "a1", "name": "Artista"}],
+        "album": {"id": "al1", "name": "Álbum", "images": []}
+    }
+}
+
+
+async def per_call_session(url):
+    """Como os helpers faziam antes: sessão (e conexão) nova a cada chamada"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers={"Authorization": "Bearer token"}) as response:
+            return response.status, await response.json()
+
+
+async def pooled_client(url):
+    return await spotify_client.get(url, "token")
+
+
+async def timed(fetch, url):
+    started = time.perf_counter()
+    status, _ = await fetch(url)
+    assert status == 200, status
+    return (time.perf_counter() - started) * 1000
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[98]
+
+
+async def run(label, fetch, url, lookups):
+    sequential = [await timed(fetch, url) for _ in range(lookups)]
+
+    started = time.perf_counter()
+    concurrent = await asyncio.gather(*(timed(fetch, url) for _ in range(lookups)))
+    wall = time.perf_counter() - started
+
+    p50, p99 = percentiles(sequential)
+    print(f"   {label} sequencial: p50 {p50:.2f}ms, p99 {p99:.2f}ms")
+    p50, p99 = percentiles(concurrent)
+    print(f"   {label} concorrente: p50 {p50:.2f}ms, p99 {p99:.2f}ms ({lookups / wall:,.0f}/s)")
+
+
+async def main(port, lookups, latency):
+    async def currently_playing(request):
+        if latency:
+            await asyncio.sleep(latency / 1000)
+        return web.json_response(TRACK)
+
+    app = web.Application()
+    app.router.add_get("/v1/me/player/currently-playing", currently_playing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    url = f"http://127.0.0.1:{port}/v1/me/player/currently-playing"
+
+    # Mede só o transporte: um orçamento folgado evita que o governador segure as chamadas
+    spotify_client_module.spotify_governor = SpotifyRateGovernor(lookups * 10, 1, {})
+
+    try:
+        print(f"⚡ {lookups} consultas por modo (stub local, latência de {latency}ms)")
+        await run("sessão por chamada", per_call_session, url, lookups)
+        await spotify_client.start()
+        await run("cliente com pool", pooled_client, url, lookups)
+    finally:
+        await spotify_client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do cliente Spotify com pool")
+    parser.add_argument("--port", type=int, default=8767, help="Porta do stub local")
+    parser.add_argument("--lookups", type=int, default=1000, help="Consultas por modo")
+    parser.add_argument("--latency", type=float, default=0, help="Latência simulada do stub, em ms")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.port, args.lookups, args.latency))
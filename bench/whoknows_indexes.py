@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos índices de spotify_tracks (migração 0001)
+Popula o histórico legado com reproduções sintéticas (5M por padrão) e mede
+a consulta do .whoknows (ILIKE '%artista%' e nome exato) e as de histórico
+por usuário e por grupo sem os índices e depois de aplicá-los pela migração
+Uso:
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m bench.whoknows_indexes
+    python -m bench.whoknows_indexes --plays 1000000 --runs 20
+    python -m bench.whoknows_indexes --skip-seed     # reaproveita as linhas já geradas
+Grava no banco de DATABASE_URL: use um banco descartável
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from src.database.db import db
+from src.database.migrations import spotify_tracks_indexes
+from src.database.models import SpotifyTrack, User, Group
+from src.database.plays import dialect_insert
+
+SEED_BATCH_SIZE = 10_000
+INDEXES = (
+    "ix_spotify_tracks_group_artist_user",
+    "ix_spotify_tracks_user_played",
+    "ix_spotify_tracks_group_played",
+    "ix_spotify_tracks_artist_trgm",
+)
+
+ARTISTS = [f"Artista {i}" for i in range(20_000)] + ["Radiohead", "Kanye West", "Tyler, The Creator"]
+
+
+async def seed(plays, users, groups):
+    """Insere usuários, grupos e reproduções sintéticas em lotes"""
+    random.seed(7)
+    start = datetime(2024, 1, 1)
+    async with db.engine.begin() as conn:
+        await conn.execute(
+            dialect_insert(conn, User)
+            .values([{"id": u, "first_name": f"Usuário {u}"} for u in range(1, users + 1)])
+            .on_conflict_do_nothing()
+        )
+        await conn.execute(
+            dialect_insert(conn, Group)
+            .values([{"id": -g, "title": f"Grupo {g}"} for g in range(1, groups + 1)])
+            .on_conflict_do_nothing()
+        )
+
+    started = time.monotonic()
+    for offset in range(0, plays, SEED_BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, plays)):
+            # Poucos artistas concentram a maioria das reproduções, como num histórico real
+            artist = ARTISTS[min(int(random.paretovariate(1.2)) - 1, len(ARTISTS) - 1)]
+            rows.append({
+                "user_id": random.randint(1, users),
+                "group_id": -random.randint(1, groups),
+                "track_id": f"t{i % 200_000}",
+                "track_name": f"Música {i % 200_000}",
+                "artist_name": artist,
+                "album_name": "Álbum",
+                "spotify_url": "https://open.spotify.com/track/x",
+                "played_at": start + timedelta(seconds=i * 7),
+            })
+        async with db.engine.begin() as conn:
+            await conn.execute(insert(SpotifyTrack), rows)
+        if (offset // SEED_BATCH_SIZE) % 50 == 0:
+            print(f"📥 {offset + len(rows)} reproduções ({time.monotonic() - started:.0f}s)")
+
+
+def queries(group_id, user_id):
+    """As consultas medidas: .whoknows antigo, nome exato e históricos recentes"""
+    play_count = func.count(SpotifyTrack.id)
+
+    def whoknows(condition):
+        return (
+            select(SpotifyTrack.user_id, User.first_name, User.username, play_count.label("play_count"))
+            .join(User, SpotifyTrack.user_id == User.id)
+            .where(SpotifyTrack.group_id == group_id, condition)
+            .group_by(SpotifyTrack.user_id, User.first_name, User.username)
+            .order_by(play_count.desc())
+            .limit(10)
+        )
+
+    return {
+        ".whoknows (ILIKE '%radiohead%')": whoknows(SpotifyTrack.artist_name.ilike("%radiohead%")),
+        ".whoknows (nome exato)": whoknows(SpotifyTrack.artist_name == "Radiohead"),
+        "histórico do usuário": (
+            select(SpotifyTrack.track_name).where(SpotifyTrack.user_id == user_id)
+            .order_by(SpotifyTrack.played_at.desc()).limit(50)
+        ),
+        "histórico do grupo": (
+            select(SpotifyTrack.track_name).where(SpotifyTrack.group_id == group_id)
+            .order_by(SpotifyTrack.played_at.desc()).limit(50)
+        ),
+    }
+
+
+async def measure(runs):
+    results = {}
+    async with db.engine.connect() as conn:
+        for label, stmt in queries(-1, 1).items():
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await conn.execute(stmt)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(samples)
+    return results
+
+
+async def main(plays, users, groups, runs, skip_seed):
+    await db.init_db()
+    try:
+        # Sem os índices também a inserção em massa fica mais rápida
+        async with db.engine.begin() as conn:
+            for name in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        if not skip_seed:
+            await seed(plays, users, groups)
+
+        async with db.engine.connect() as conn:
+            total = (await conn.execute(select(func.count(SpotifyTrack.id)))).scalar()
+        print(f"🎵 {total} reproduções em spotify_tracks; mediana de {runs} execuções")
+
+        before = await measure(runs)
+
+        started = time.monotonic()
+        async with db.engine.begin() as conn:
+            await spotify_tracks_indexes(conn)
+            if conn.dialect.name == "sqlite":
+                await conn.execute(text("ANALYZE spotify_tracks"))
+        print(f"🔧 Índices criados em {time.monotonic() - started:.1f}s")
+
+        after = await measure(runs)
+        for label in before:
+            print(f"   {label}: sem índices {before[label]:.1f}ms, com índices {after[label]:.1f}ms")
+    finally:
+        await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos índices de spotify_tracks")
+    parser.add_argument("--plays", type=int, default=5_000_000, help="Reproduções sintéticas a inserir")
+    parser.add_argument("--users", type=int, default=5000, help="Usuários distintos")
+    parser.add_argument("--groups", type=int, default=50, help="Grupos distintos")
+    parser.add_argument("--runs", type=int, default=10, help="Execuções de cada consulta")
+    parser.add_argument("--skip-seed", action="store_true", help="Não insere; mede as linhas existentes")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.plays, args.users, args.groups, args.runs, args.skip_seed))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir ou verificar o agregado group_artist_plays
+A reconstrução também recalcula as crowns de cada grupo
+Uso:
+    python rebuild_aggregates.py                 # reconstrói todos os grupos
+    python rebuild_aggregates.py --group <id>    # reconstrói um grupo
+    python rebuild_aggregates.py --check         # apenas compara com o histórico bruto
+"""
+import argparse
+import asyncio
+from src.database.db import db
+from src.database.aggregates import (
+    aggregate_group_ids,
+    rebuild_group_artist_plays,
+    check_group_artist_plays,
+    recompute_group_crowns
+)
+
+async def main(group_id, check_only):
+    await db.init_db()
+
+    async with db.session_maker() as session:
+        group_ids = [group_id] if group_id is not None else await aggregate_group_ids(session)
+
+    inconsistent = 0
+    for gid in group_ids:
+        # Uma transação por grupo: o histórico é processado em lotes, não de uma vez
+        async with db.session_maker() as session:
+            if check_only:
+                mismatches = await check_group_artist_plays(session, gid)
+                if mismatches:
+                    inconsistent += 1
+                    print(f"❌ Grupo {gid}: {len(mismatches)} divergências")
+                    for artist_id, user_id, expected, actual in mismatches[:10]:
+                        print(f"   artista {artist_id}, usuário {user_id}: esperado {expected}, agregado {actual}")
+                continue
+
+            rows = await rebuild_group_artist_plays(session, gid)
+            crowns = await recompute_group_crowns(session, gid)
+            await session.commit()
+            print(f"✅ Grupo {gid}: {rows} linhas reconstruídas, {crowns} crowns")
+
+    if check_only:
+        print(f"🔎 {len(group_ids)} grupos verificados, {inconsistent} com divergências")
+
+    await db.engine.dispose()
+    return inconsistent
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói ou verifica o agregado group_artist_plays")
+    parser.add_argument("--group", type=int, default=None, help="ID do grupo (padrão: todos)")
+    parser.add_argument("--check", action="store_true", help="Apenas verifica a consistência")
+    args = parser.parse_args()
+
+    raise SystemExit(1 if asyncio.run(main(args.group, args.check)) else 0)
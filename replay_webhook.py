@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Script para reenviar payloads de webhook gravados ao servidor local
+Cada linha do arquivo é um update do Telegram em JSON (como recebido em /webhook)
+Uso:
+    python replay_webhook.py bench/fixtures/webhook/updates.jsonl
+    python replay_webhook.py updates.jsonl --concurrency 200 --repeat 10
+    python replay_webhook.py updates.jsonl --url http://localhost:5000/webhook --secret <token>
+O token deve ser o mesmo WEBHOOK_SECRET_TOKEN do servidor; ao final, mostra a fila
+de entrada reportada em /metrics
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+import aiohttp
+
+
+async def main(path, url, secret, concurrency, repeat):
+    with open(path, encoding="utf-8") as f:
+        payloads = [json.loads(line) for line in f if line.strip()]
+
+    # Ids distintos por repetição: o Telegram nunca reenvia o mesmo update_id
+    updates = []
+    for round_number in range(repeat):
+        for payload in payloads:
+            updates.append({**payload, "update_id": payload.get("update_id", 0) + round_number * 10_000_000})
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    results = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def send(update):
+            async with semaphore:
+                try:
+                    async with session.post(url, json=update) as response:
+                        body = await response.json(content_type=None)
+                        results["shed" if body.get("shed") else str(response.status)] += 1
+                except aiohttp.ClientError as e:
+                    results[type(e).__name__] += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(send(update) for update in updates))
+        elapsed = time.monotonic() - started
+
+        print(f"📨 {len(updates)} updates em {elapsed:.2f}s ({len(updates) / elapsed:.0f}/s)")
+        for status, count in sorted(results.items()):
+            print(f"   {status}: {count}")
+
+        metrics_url = url.rsplit("/webhook", 1)[0] + "/metrics"
+        try:
+            async with session.get(metrics_url) as response:
+                metrics = await response.json(content_type=None)
+            print(json.dumps(metrics.get("webhook_intake"), indent=2, ensure_ascii=False))
+        except (aiohttp.ClientError, ValueError) as e:
+            print(f"⚠️ Não foi possível ler {metrics_url}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reenvia payloads de webhook gravados ao servidor local")
+    parser.add_argument("file", help="Arquivo JSONL com um update por linha")
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('PORT', '5000')}/webhook")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET_TOKEN", ""))
+    parser.add_argument("--concurrency", type=int, default=50, help="Requisições simultâneas")
+    parser.add_argument("--repeat", type=int, default=1, help="Quantas vezes reenviar o arquivo")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.file, args.url, args.secret, args.concurrency, args.repeat))
@@ -15,6 +15,12 @@ from src.modules.rank import register_rank_handlers
 from src.modules.ai import register_ai_handlers
 from src.modules.info import register_info_handlers
 from src.modules.spotify_music import register_spotify_handlers
+from src.modules.spotify_jobs import register_spotify_jobs
+from src.modules.pipeline import register_pipeline_handlers
+from src.utils.spotify_client import spotify_client
+from src.database.write_buffer import play_write_buffer
+from src.database.message_counter import message_counter
+from src.utils.update_processor import update_processor
 
 # Configuração de logging
 logging.basicConfig(
@@ -53,7 +59,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "Configuração:\n"
         "/configuracoes - Painel de configurações\n\n"
         "Sistema de Rank:\n"
-        "/rank - Ver sua posição\n\n"
+        "/rank - Ver sua posição\n"
+        "/top [página] - Ranking do grupo\n\n"
         "IA e Pesquisa:\n"
         "/gerarimagem - Gerar imagem\n"
         "/pesquisar - Pesquisar na web\n"
@@ -98,9 +105,16 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "/chatinfo - Ver informações completas do grupo\n"
         "/id - Ver seu ID e do chat\n\n"
         "CONFIGURAÇÃO:\n"
-        "/configuracoes - Acessar painel de configurações interativo\n\n"
+        "/configuracoes - Acessar painel de configurações interativo\n"
+        "/proibir {termo} - Proibir termo (AutoMod)\n"
+        "/desproibir {termo} - Remover termo proibido\n"
+        "/proibirdominio {dominio} - Proibir links de um domínio\n"
+        "/desproibirdominio {dominio} - Remover domínio proibido\n"
+        "/filtros - Listar termos e domínios proibidos\n"
+        "/antiflood {mensagens} {segundos} [repetições] - Limites de flood\n\n"
         "RANK:\n"
-        "/rank - Ver sua posição no ranking do grupo\n\n"
+        "/rank - Ver sua posição no ranking do grupo\n"
+        "/top {página} - Ver o ranking de mensagens do grupo\n\n"
         "IA E PESQUISA:\n"
         "/gerarimagem {descrição} - Gerar imagem com IA\n"
         "/pesquisar {consulta} - Pesquisar na web\n"
@@ -111,15 +125,15 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "**Primeiros Passos:**\n"
         "/conectarspotify - Conectar sua conta do Spotify (obrigatório)\n\n"
         "**Comandos Principais:**\n"
-        ".fm - Mostra a música que você está ouvindo agora com capa\n"
+        ".fm (ou .np) - Mostra a música que você está ouvindo agora com capa\n"
         ".profile - Seu perfil musical com estatísticas\n"
         ".chart [w/m/y] - Gráficos das suas tops (semanal, mensal, anual)\n"
         ".plays - Histórico das últimas reproduções\n"
         ".w - Estatísticas das últimas 4 semanas\n\n"
         "**Comandos Sociais:**\n"
-        ".whoknows [artista] - Top ouvintes deste artista no grupo\n"
+        ".whoknows (ou .wk) [artista] - Top ouvintes deste artista no grupo\n"
         ".crowns - Ranking de quem tem mais crowns no grupo\n"
-        ".friends - Ver o que seus amigos estão ouvindo\n"
+        ".friends [página] - Ver o que seus amigos estão ouvindo\n"
         "/adicionaramigo - Adicionar amigo (responda msg ou mencione)\n\n"
         "**Pesquisa:**\n"
         "/pesquisarmusica {nome} - Buscar músicas\n"
@@ -152,6 +166,15 @@ async def post_init(application: Application) -> None:
         logger.error(f"❌ ERRO ao inicializar banco de dados: {e}")
         logger.error("=" * 60)
         raise
+    
+    await spotify_client.start()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Encerramento pós-shutdown"""
+    await play_write_buffer.close()
+    await message_counter.close()
+    await spotify_client.close()
 
 
 def create_application() -> Application:
@@ -161,7 +184,14 @@ def create_application() -> Application:
         raise ValueError("BOT_TOKEN não configurado")
     
     # Cria aplicação
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(update_processor)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Registra handlers básicos
     application.add_handler(CommandHandler("start", start_command))
@@ -189,6 +219,12 @@ def create_application() -> Application:
     logger.info("Registrando handlers do Spotify...")
     register_spotify_handlers(application)
     
+    logger.info("Registrando tarefas periódicas do Spotify...")
+    register_spotify_jobs(application)
+    
+    logger.info("Registrando pipeline de mensagens...")
+    register_pipeline_handlers(application)
+    
     logger.info("Bot configurado com sucesso!")
     
     return application
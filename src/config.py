@@ -78,6 +78,110 @@ MAX_MESSAGE_DELETE_BATCH: Final[int] = 100
 RATE_LIMIT_DELAY: Final[float] = 0.5
 NUKE_BATCH_SIZE: Final[int] = 100
 
+# AutoMod - filtro de spam: tamanho máximo, menções por mensagem e caracteres repetidos seguidos
+SPAM_MAX_LENGTH: Final[int] = int(os.getenv("SPAM_MAX_LENGTH", "500"))
+SPAM_MAX_MENTIONS: Final[int] = int(os.getenv("SPAM_MAX_MENTIONS", "5"))
+SPAM_MAX_REPEATED_CHARS: Final[int] = int(os.getenv("SPAM_MAX_REPEATED_CHARS", "30"))
+
+# AutoMod - flood: mensagens por janela (s) e repetições quase idênticas por janela (s),
+# padrões para grupos sem limites próprios (/antiflood)
+FLOOD_MAX_MESSAGES: Final[int] = int(os.getenv("FLOOD_MAX_MESSAGES", "8"))
+FLOOD_WINDOW: Final[float] = float(os.getenv("FLOOD_WINDOW", "10"))
+FLOOD_MAX_DUPLICATES: Final[int] = int(os.getenv("FLOOD_MAX_DUPLICATES", "3"))
+FLOOD_DUPLICATE_WINDOW: Final[float] = float(os.getenv("FLOOD_DUPLICATE_WINDOW", "60"))
+# Semelhança mínima (0 a 1, fração de 4-gramas em comum) para duas mensagens contarem
+# como repetição: variações com uma palavra trocada ou acrescentada ficam acima de 0.6
+FLOOD_SIMILARITY: Final[float] = float(os.getenv("FLOOD_SIMILARITY", "0.6"))
+# Usuários sem mensagens há N s são descartados; teto de (chat, usuário) acompanhados
+FLOOD_IDLE_TTL: Final[float] = float(os.getenv("FLOOD_IDLE_TTL", "300"))
+FLOOD_MAX_TRACKED: Final[int] = int(os.getenv("FLOOD_MAX_TRACKED", "100000"))
+
+# Cache compartilhado (opcional): URL Redis, ex.: redis://localhost:6379/0
+# Sem ela (ou sem o pacote redis), cada processo usa um cache em memória
+CACHE_URL: Final[str] = os.getenv("CACHE_URL", os.getenv("REDIS_URL", ""))
+CACHE_NAMESPACE: Final[str] = os.getenv("CACHE_NAMESPACE", "bot")
+# TTLs (s) dos caches de administradores por chat e de configurações de grupo
+# (ambos também são invalidados nas alterações: atualizações chat_member e /configuracoes)
+PERMISSION_CACHE_TTL: Final[float] = float(os.getenv("PERMISSION_CACHE_TTL", "600"))
+GROUP_SETTINGS_CACHE_TTL: Final[float] = float(os.getenv("GROUP_SETTINGS_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+
+# Processamento concorrente de updates: máximo em andamento (aguardando faixa ou executando;
+# quem espera o update anterior do mesmo chat/usuário não conta) e execuções simultâneas
+# nas faixas rápida (mensagens/moderação) e lenta (IA/Spotify)
+UPDATE_MAX_PENDING: Final[int] = int(os.getenv("UPDATE_MAX_PENDING", "1000"))
+UPDATE_FAST_CONCURRENCY: Final[int] = int(os.getenv("UPDATE_FAST_CONCURRENCY", "32"))
+UPDATE_SLOW_CONCURRENCY: Final[int] = int(os.getenv("UPDATE_SLOW_CONCURRENCY", "8"))
+
+# Fila de entrada dos webhooks: capacidade antes de descartar updates de menor prioridade
+WEBHOOK_QUEUE_SIZE: Final[int] = int(os.getenv("WEBHOOK_QUEUE_SIZE", "5000"))
+
+# Cliente HTTP do Spotify (pool de conexões compartilhado)
+SPOTIFY_POOL_SIZE: Final[int] = int(os.getenv("SPOTIFY_POOL_SIZE", "50"))
+SPOTIFY_KEEPALIVE_TIMEOUT: Final[float] = float(os.getenv("SPOTIFY_KEEPALIVE_TIMEOUT", "60"))
+SPOTIFY_DNS_CACHE_TTL: Final[int] = int(os.getenv("SPOTIFY_DNS_CACHE_TTL", "300"))
+SPOTIFY_REQUEST_TIMEOUT: Final[float] = float(os.getenv("SPOTIFY_REQUEST_TIMEOUT", "10"))
+
+# Limite global de requisições ao Spotify (token bucket por janela de tempo)
+SPOTIFY_RATE_LIMIT: Final[int] = int(os.getenv("SPOTIFY_RATE_LIMIT", "90"))
+SPOTIFY_RATE_PERIOD: Final[float] = float(os.getenv("SPOTIFY_RATE_PERIOD", "30"))
+# Fatia do limite global reservada à coleta em segundo plano (requisições por período,
+# incluindo as renovações de token da coleta). Cada conta ouvindo custa cerca de
+# SPOTIFY_RATE_PERIOD / SCROBBLE_MIN_INTERVAL requisições por período mais uma renovação
+# por hora: com 30 por 30s e intervalo de 300s, ~270 contas ativas mantêm o ritmo.
+# Para mais contas, aumente esta fatia junto com SPOTIFY_RATE_LIMIT (cota do app no Spotify)
+SPOTIFY_SCROBBLE_RATE: Final[int] = int(os.getenv("SPOTIFY_SCROBBLE_RATE", "30"))
+# Tempo máximo que uma requisição espera na fila antes de ser descartada
+SPOTIFY_QUEUE_TIMEOUT: Final[float] = float(os.getenv("SPOTIFY_QUEUE_TIMEOUT", "8"))
+
+# Cache de "tocando agora" / "tocadas recentemente" por usuário
+NOW_PLAYING_CACHE_TTL: Final[float] = float(os.getenv("NOW_PLAYING_CACHE_TTL", "10"))
+NOW_PLAYING_CACHE_SIZE: Final[int] = int(os.getenv("NOW_PLAYING_CACHE_SIZE", "10000"))
+
+# Comando .friends: amigos por página, consultas simultâneas e prazo total (s)
+FRIENDS_PAGE_SIZE: Final[int] = int(os.getenv("FRIENDS_PAGE_SIZE", "20"))
+FRIENDS_CONCURRENCY: Final[int] = int(os.getenv("FRIENDS_CONCURRENCY", "8"))
+FRIENDS_DEADLINE: Final[float] = float(os.getenv("FRIENDS_DEADLINE", "6"))
+
+# Cache das consultas de .whoknows resolvidas para artistas
+ARTIST_RESOLVE_CACHE_TTL: Final[float] = float(os.getenv("ARTIST_RESOLVE_CACHE_TTL", "3600"))
+ARTIST_RESOLVE_CACHE_SIZE: Final[int] = int(os.getenv("ARTIST_RESOLVE_CACHE_SIZE", "10000"))
+
+# Renovação antecipada de tokens do Spotify (job em segundo plano)
+TOKEN_REFRESH_INTERVAL: Final[int] = int(os.getenv("TOKEN_REFRESH_INTERVAL", "120"))
+TOKEN_REFRESH_AHEAD_MINUTES: Final[int] = int(os.getenv("TOKEN_REFRESH_AHEAD_MINUTES", "10"))
+TOKEN_ACTIVE_WINDOW_HOURS: Final[int] = int(os.getenv("TOKEN_ACTIVE_WINDOW_HOURS", "24"))
+TOKEN_REFRESH_CONCURRENCY: Final[int] = int(os.getenv("TOKEN_REFRESH_CONCURRENCY", "5"))
+
+# Tolerância (s) entre inícios estimados para considerar duas reproduções a mesma;
+# define as faixas da chave única de plays (alterá-la só vale para as novas linhas)
+PLAY_DEDUP_WINDOW: Final[int] = int(os.getenv("PLAY_DEDUP_WINDOW", "30"))
+
+# Buffer de escrita das reproduções do .fm: grava a cada N ms ou M linhas, com fila limitada
+WRITE_BUFFER_FLUSH_MS: Final[int] = int(os.getenv("WRITE_BUFFER_FLUSH_MS", "500"))
+WRITE_BUFFER_BATCH_SIZE: Final[int] = int(os.getenv("WRITE_BUFFER_BATCH_SIZE", "200"))
+WRITE_BUFFER_MAX_ROWS: Final[int] = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "5000"))
+
+# Contador de mensagens do rank: deltas em memória gravados a cada intervalo (s)
+MESSAGE_COUNTER_FLUSH_INTERVAL: Final[float] = float(os.getenv("MESSAGE_COUNTER_FLUSH_INTERVAL", "5"))
+MESSAGE_COUNTER_MAX_KEYS: Final[int] = int(os.getenv("MESSAGE_COUNTER_MAX_KEYS", "10000"))
+PROFILE_CACHE_TTL: Final[float] = float(os.getenv("PROFILE_CACHE_TTL", "3600"))
+PROFILE_CACHE_SIZE: Final[int] = int(os.getenv("PROFILE_CACHE_SIZE", "50000"))
+
+# Membros por página do /top
+TOP_PAGE_SIZE: Final[int] = int(os.getenv("TOP_PAGE_SIZE", "10"))
+
+# Coleta automática de reproduções (recently-played) em segundo plano
+SCROBBLE_ENABLED: Final[bool] = os.getenv("SCROBBLE_ENABLED", "true").lower() == "true"
+SCROBBLE_TICK_INTERVAL: Final[int] = int(os.getenv("SCROBBLE_TICK_INTERVAL", "60"))
+# Teto de contas por ciclo (o lote também é limitado pela fatia "scrobble" do governador)
+SCROBBLE_BATCH_SIZE: Final[int] = int(os.getenv("SCROBBLE_BATCH_SIZE", "500"))
+SCROBBLE_CONCURRENCY: Final[int] = int(os.getenv("SCROBBLE_CONCURRENCY", "10"))
+# Intervalo por conta: mínimo para quem está ouvindo, dobra a cada coleta vazia até o máximo
+# (o endpoint só devolve as últimas 50 músicas, então o máximo deve ficar abaixo de ~2h)
+SCROBBLE_MIN_INTERVAL: Final[int] = int(os.getenv("SCROBBLE_MIN_INTERVAL", "300"))
+SCROBBLE_MAX_INTERVAL: Final[int] = int(os.getenv("SCROBBLE_MAX_INTERVAL", "3600"))
+
 # Permissões necessárias
 ADMIN_COMMANDS: Final[set] = {
     "nuke", "purge", "ban", "kick", "mute", "unmute", 
@@ -0,0 +1,136 @@
+"""
+Manutenção do agregado group_artist_plays: reconstrução a partir do histórico
+bruto (plays), verificação de consistência e recálculo de crowns
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import and_, delete, func, insert, literal, select, union, union_all
+
+from src.database.models import Artist, ArtistCrown, GroupArtistPlays, Play, TrackArtist
+from src.database.plays import Executor
+
+# Linhas por lote na leitura e na gravação das crowns
+REBUILD_BATCH_SIZE = 1000
+
+# (artist_id, user_id, play_count esperado, play_count no agregado)
+Mismatch = Tuple[int, int, int, int]
+
+
+def _raw_counts(group_id: int):
+    """Contagem por artista e usuário calculada direto do histórico bruto"""
+    return select(
+        TrackArtist.artist_id,
+        Play.user_id,
+        func.count(Play.id).label("play_count"),
+        func.max(Play.played_at).label("last_played")
+    ).join(
+        TrackArtist, TrackArtist.track_id == Play.track_id
+    ).where(
+        Play.group_id == group_id
+    ).group_by(
+        TrackArtist.artist_id,
+        Play.user_id
+    )
+
+
+async def aggregate_group_ids(executor: Executor) -> List[int]:
+    """Grupos com histórico ou com linhas no agregado"""
+    result = await executor.execute(
+        union(select(Play.group_id), select(GroupArtistPlays.group_id))
+    )
+    return sorted(result.scalars().all())
+
+
+async def rebuild_group_artist_plays(executor: Executor, group_id: int) -> int:
+    """Recalcula o agregado de um grupo a partir de plays; retorna o número de linhas
+
+    Um único INSERT ... SELECT ... GROUP BY: as contagens não passam pela memória
+    do processo, qualquer que seja o tamanho do histórico do grupo.
+    """
+    await executor.execute(delete(GroupArtistPlays).where(GroupArtistPlays.group_id == group_id))
+
+    raw = _raw_counts(group_id).subquery()
+    result = await executor.execute(
+        insert(GroupArtistPlays).from_select(
+            ["group_id", "artist_id", "user_id", "play_count", "last_played"],
+            select(literal(group_id), raw.c.artist_id, raw.c.user_id, raw.c.play_count, raw.c.last_played)
+        )
+    )
+    return result.rowcount
+
+
+async def check_group_artist_plays(executor: Executor, group_id: int) -> List[Mismatch]:
+    """Compara o agregado de um grupo com as contagens do histórico bruto
+
+    A comparação é feita no banco; só as divergências são lidas.
+    """
+    raw = _raw_counts(group_id).subquery()
+    aggregate = select(GroupArtistPlays).where(GroupArtistPlays.group_id == group_id).subquery()
+
+    # Contagens do histórico que faltam ou diferem no agregado, e linhas do agregado sem histórico
+    actual = func.coalesce(aggregate.c.play_count, 0)
+    missing_or_different = select(
+        raw.c.artist_id, raw.c.user_id, raw.c.play_count.label("expected"), actual.label("actual")
+    ).outerjoin(
+        aggregate, and_(aggregate.c.artist_id == raw.c.artist_id, aggregate.c.user_id == raw.c.user_id)
+    ).where(
+        actual != raw.c.play_count
+    )
+    orphaned = select(
+        aggregate.c.artist_id, aggregate.c.user_id, literal(0).label("expected"),
+        aggregate.c.play_count.label("actual")
+    ).outerjoin(
+        raw, and_(raw.c.artist_id == aggregate.c.artist_id, raw.c.user_id == aggregate.c.user_id)
+    ).where(
+        raw.c.artist_id.is_(None),
+        aggregate.c.play_count != 0
+    )
+
+    mismatches = union_all(missing_or_different, orphaned).subquery()
+    result = await executor.execute(
+        select(mismatches).order_by(mismatches.c.artist_id, mismatches.c.user_id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def recompute_group_crowns(executor: Executor, group_id: int) -> int:
+    """Recalcula todas as crowns de um grupo a partir do agregado; retorna o número de crowns
+
+    Uma crown por artist_id, comparando a mesma contagem que update_crowns usa
+    no caminho de cada play (sem somar homônimos).
+    """
+    # Lido em partes: só o dono atual de cada artista fica em memória
+    result = await executor.stream(
+        select(
+            GroupArtistPlays.artist_id,
+            Artist.name,
+            GroupArtistPlays.user_id,
+            GroupArtistPlays.play_count,
+            GroupArtistPlays.last_played
+        ).join(
+            Artist, Artist.id == GroupArtistPlays.artist_id
+        ).where(
+            GroupArtistPlays.group_id == group_id,
+            GroupArtistPlays.play_count > 0
+        ).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+
+    # Maior contagem vence; no empate, fica quem chegou lá primeiro
+    holders: Dict[int, Tuple[str, int, int, datetime]] = {}
+    async for artist_id, artist_name, user_id, play_count, last_played in result:
+        current = holders.get(artist_id)
+        if current is None or (play_count, current[3]) > (current[2], last_played):
+            holders[artist_id] = (artist_name, user_id, play_count, last_played)
+
+    await executor.execute(delete(ArtistCrown).where(ArtistCrown.group_id == group_id))
+
+    now = datetime.utcnow()
+    rows = [
+        {"group_id": group_id, "user_id": user_id, "artist_id": artist_id, "artist_name": artist_name,
+         "play_count": play_count, "created_at": now, "updated_at": now}
+        for artist_id, (artist_name, user_id, play_count, _) in holders.items()
+    ]
+    for i in range(0, len(rows), REBUILD_BATCH_SIZE):
+        await executor.execute(insert(ArtistCrown.__table__), rows[i:i + REBUILD_BATCH_SIZE])
+
+    return len(rows)
@@ -3,11 +3,12 @@ Gerenciamento de conexão com banco de dados
 """
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy import select
+from sqlalchemy import func, select
 from src.database.models import (
     Base, User, Group, GroupUser, ModerationLog, 
     SpotifyAccount, SpotifyTrack, UserFriend, UserSettings, ArtistCrown
 )
+from src.database.migrations import run_migrations
 from src.config import DATABASE_URL
 
 
@@ -32,6 +33,7 @@ class Database:
         """Inicializa o banco de dados"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await run_migrations(conn)
     
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
         """Retorna uma sessão do banco de dados"""
@@ -107,23 +109,52 @@ class Database:
         await session.commit()
     
     async def get_user_rank(self, session: AsyncSession, user_id: int, group_id: int) -> tuple[int, int]:
-        """Retorna posição e total de mensagens do usuário"""
+        """Retorna posição e total de mensagens do usuário
+        
+        Posição = 1 + membros com mais mensagens (COUNT em ix_group_users_group_count).
+        """
         result = await session.execute(
-            select(GroupUser).where(GroupUser.group_id == group_id)
-            .order_by(GroupUser.message_count.desc())
+            select(GroupUser.message_count).where(
+                GroupUser.group_id == group_id,
+                GroupUser.user_id == user_id
+            )
         )
-        group_users = result.scalars().all()
+        user_messages = result.scalar_one_or_none()
+        if user_messages is None:
+            return 0, 0
         
-        user_messages = 0
-        user_position = 0
+        result = await session.execute(
+            select(func.count()).select_from(GroupUser).where(
+                GroupUser.group_id == group_id,
+                GroupUser.message_count > user_messages
+            )
+        )
+        return result.scalar_one() + 1, user_messages
+    
+    async def get_leaderboard(self, session: AsyncSession, group_id: int, limit: int,
+                              offset: int = 0) -> tuple[list[tuple[int, int, str, str | None, int]], int]:
+        """Retorna uma página do ranking (posição, user_id, nome, username, mensagens) e o total de membros
         
-        for idx, gu in enumerate(group_users, 1):
-            if gu.user_id == user_id:
-                user_position = idx
-                user_messages = gu.message_count
-                break
+        A posição segue get_user_rank: empatados dividem a posição (RANK).
+        """
+        position = func.rank().over(order_by=GroupUser.message_count.desc())
+        result = await session.execute(
+            select(position, GroupUser.user_id, User.first_name, User.username, GroupUser.message_count)
+            .join(User, User.id == GroupUser.user_id)
+            .where(GroupUser.group_id == group_id, GroupUser.message_count > 0)
+            .order_by(GroupUser.message_count.desc(), GroupUser.user_id)
+            .limit(limit)
+            .offset(offset)
+        )
+        rows = [tuple(row) for row in result.all()]
         
-        return user_position, user_messages
+        result = await session.execute(
+            select(func.count()).select_from(GroupUser).where(
+                GroupUser.group_id == group_id,
+                GroupUser.message_count > 0
+            )
+        )
+        return rows, result.scalar_one()
     
     async def log_moderation(self, session: AsyncSession, group_id: int, moderator_id: int,
                             target_user_id: int, action: str, reason: str | None = None,
@@ -0,0 +1,199 @@
+"""
+Contador de mensagens do rank com escrita agregada
+As mensagens só incrementam deltas (grupo, usuário) em memória; a cada
+intervalo os deltas viram um único UPSERT em lote (message_count + delta)
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from src.config import (
+    MESSAGE_COUNTER_FLUSH_INTERVAL,
+    MESSAGE_COUNTER_MAX_KEYS,
+    PROFILE_CACHE_TTL,
+    PROFILE_CACHE_SIZE
+)
+from src.database.db import db
+from src.database.models import User, Group, GroupUser
+from src.database.plays import dialect_insert, BULK_INSERT_SIZE
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+UserProfile = Tuple[Optional[str], str, Optional[str]]
+
+
+class MessageCounter:
+    """Acumula contagens de mensagens e grava em lote periodicamente"""
+
+    def __init__(self, flush_interval: float, max_keys: int, profile_ttl: float, profile_size: int):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self._deltas: Dict[Tuple[int, int], int] = {}
+        self._users: Dict[int, UserProfile] = {}
+        self._groups: Dict[int, str] = {}
+        # Últimos nomes gravados: mensagens com o mesmo perfil não geram upsert de usuário/grupo
+        # (só entram aqui após gravar, então um acerto também garante que a linha existe)
+        self._profiles = TTLCache(profile_ttl, profile_size)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.counters: Dict[str, float] = {
+            "messages": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "flush_failures": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0
+        }
+
+    def start(self) -> None:
+        """Inicia a gravação periódica no loop atual"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Grava os deltas pendentes e encerra a tarefa"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def record(self, group_id: int, group_title: str, user_id: int, username: Optional[str],
+               first_name: str, last_name: Optional[str]) -> None:
+        """Conta uma mensagem (sem acesso ao banco)"""
+        self.start()
+        self.counters["messages"] += 1
+        key = (group_id, user_id)
+        self._deltas[key] = self._deltas.get(key, 0) + 1
+
+        profile = (username, first_name, last_name)
+        if self._profiles.lookup(("user", user_id)) != (True, profile):
+            self._users[user_id] = profile
+        if self._profiles.lookup(("group", group_id)) != (True, group_title):
+            self._groups[group_id] = group_title
+
+        # Memória limitada: muitas chaves distintas antecipam a gravação
+        if len(self._deltas) >= self.max_keys:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Protegido: um cancelamento no shutdown não interrompe uma gravação no meio
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> None:
+        """Grava os deltas e perfis acumulados em uma única transação"""
+        if self._flush_lock is None:
+            return
+
+        async with self._flush_lock:
+            if not self._deltas and not self._users and not self._groups:
+                return
+
+            deltas, self._deltas = self._deltas, {}
+            users, self._users = self._users, {}
+            groups, self._groups = self._groups, {}
+            started = time.monotonic()
+
+            try:
+                async with db.session_maker() as session:
+                    now = datetime.utcnow()
+                    user_rows = [
+                        {"id": user_id, "username": username, "first_name": first_name,
+                         "last_name": last_name, "created_at": now, "updated_at": now}
+                        for user_id, (username, first_name, last_name) in users.items()
+                    ]
+                    for i in range(0, len(user_rows), BULK_INSERT_SIZE):
+                        stmt = dialect_insert(session, User).values(user_rows[i:i + BULK_INSERT_SIZE])
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=["id"],
+                            set_={
+                                "username": stmt.excluded.username,
+                                "first_name": stmt.excluded.first_name,
+                                "last_name": stmt.excluded.last_name,
+                                "updated_at": stmt.excluded.updated_at
+                            }
+                        ))
+
+                    group_rows = [
+                        {"id": group_id, "title": title, "created_at": now, "updated_at": now}
+                        for group_id, title in groups.items()
+                    ]
+                    for i in range(0, len(group_rows), BULK_INSERT_SIZE):
+                        stmt = dialect_insert(session, Group).values(group_rows[i:i + BULK_INSERT_SIZE])
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=["id"],
+                            set_={"title": stmt.excluded.title, "updated_at": stmt.excluded.updated_at}
+                        ))
+
+                    table = GroupUser.__table__
+                    delta_rows = [
+                        {"group_id": group_id, "user_id": user_id, "message_count": delta,
+                         "created_at": now, "updated_at": now}
+                        for (group_id, user_id), delta in deltas.items()
+                    ]
+                    for i in range(0, len(delta_rows), BULK_INSERT_SIZE):
+                        stmt = dialect_insert(session, GroupUser).values(delta_rows[i:i + BULK_INSERT_SIZE])
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=["user_id", "group_id"],
+                            set_={
+                                "message_count": table.c.message_count + stmt.excluded.message_count,
+                                "updated_at": stmt.excluded.updated_at
+                            }
+                        ))
+
+                    await session.commit()
+            except Exception as e:
+                # Devolve os deltas para a próxima tentativa em vez de perder as contagens
+                for key, delta in deltas.items():
+                    self._deltas[key] = self._deltas.get(key, 0) + delta
+                for user_id, profile in users.items():
+                    self._users.setdefault(user_id, profile)
+                for group_id, title in groups.items():
+                    self._groups.setdefault(group_id, title)
+                self.counters["flush_failures"] += 1
+                logger.error(f"Erro ao gravar contadores de mensagens: {e}")
+                return
+
+            for user_id, profile in users.items():
+                self._profiles.set(("user", user_id), profile)
+            for group_id, title in groups.items():
+                self._profiles.set(("group", group_id), title)
+
+            self.counters["flushes"] += 1
+            self.counters["rows_flushed"] += len(deltas)
+            self.counters["last_batch_size"] = len(deltas)
+            self.counters["last_flush_ms"] = round((time.monotonic() - started) * 1000, 2)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores para monitoramento"""
+        return {
+            **self.counters,
+            "pending_keys": len(self._deltas),
+            "profile_cache": self._profiles.stats()
+        }
+
+
+# Instância global do contador de mensagens
+message_counter = MessageCounter(
+    MESSAGE_COUNTER_FLUSH_INTERVAL,
+    MESSAGE_COUNTER_MAX_KEYS,
+    PROFILE_CACHE_TTL,
+    PROFILE_CACHE_SIZE
+)
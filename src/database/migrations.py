@@ -0,0 +1,243 @@
+"""
+Migrações incrementais do banco de dados
+create_all só cria tabelas que ainda não existem; índices e alterações em
+tabelas já existentes são aplicados aqui, uma única vez, e registrados em
+schema_migrations
+"""
+import logging
+from typing import Awaitable, Callable
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.models import SpotifyTrack, Artist, ArtistCrown, Play
+from src.database.plays import normalize_artist_name, play_buckets
+from src.database.aggregates import aggregate_group_ids, rebuild_group_artist_plays, recompute_group_crowns
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[AsyncConnection], Awaitable[None]]
+
+MIGRATIONS: list[tuple[str, Migration]] = []
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def migration(version: str) -> Callable[[Migration], Migration]:
+    """Registra uma migração; a ordem de declaração é a ordem de execução"""
+    def decorator(func: Migration) -> Migration:
+        MIGRATIONS.append((version, func))
+        return func
+    return decorator
+
+
+@migration("0001_spotify_tracks_indexes")
+async def spotify_tracks_indexes(conn: AsyncConnection) -> None:
+    """Índices para .whoknows, .crowns e consultas de histórico"""
+    for stmt in (
+        "CREATE INDEX IF NOT EXISTS ix_spotify_tracks_group_artist_user "
+        "ON spotify_tracks (group_id, artist_name, user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_spotify_tracks_user_played "
+        "ON spotify_tracks (user_id, played_at)",
+        "CREATE INDEX IF NOT EXISTS ix_spotify_tracks_group_played "
+        "ON spotify_tracks (group_id, played_at)",
+    ):
+        await conn.execute(text(stmt))
+
+    # No PostgreSQL, um índice trigram atende o ILIKE '%artista%'. No SQLite não
+    # há equivalente: o índice composto acima é usado como índice de cobertura
+    if conn.dialect.name == "postgresql":
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                await conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_spotify_tracks_artist_trgm "
+                    "ON spotify_tracks USING gin (artist_name gin_trgm_ops)"
+                ))
+        except Exception as e:
+            logger.warning(f"Índice trigram não criado (extensão pg_trgm indisponível?): {e}")
+
+
+async def add_column(conn: AsyncConnection, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ADD COLUMN apenas se a coluna ainda não existir (create_all pode tê-la criado)"""
+    columns = await conn.run_sync(
+        lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns(table)}
+    )
+    if column not in columns:
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+@migration("0002_normalized_play_history")
+async def normalized_play_history(conn: AsyncConnection) -> None:
+    """Avisa sobre histórico legado a copiar (a cópia é feita por backfill_play_history.py)"""
+    # Músicas copiadas do histórico legado (artista sem ID do Spotify) são religadas no próximo play
+    await add_column(conn, "tracks", "legacy", "BOOLEAN NOT NULL DEFAULT FALSE")
+    await conn.execute(text(
+        "UPDATE tracks SET legacy = TRUE WHERE id IN ("
+        "SELECT track_artists.track_id FROM track_artists "
+        "JOIN artists ON artists.id = track_artists.artist_id "
+        "WHERE artists.spotify_id IS NULL)"
+    ))
+
+    # Copiar na inicialização travava o bot em históricos grandes; o script grava em lotes
+    result = await conn.execute(select(SpotifyTrack.id).limit(1))
+    if result.first() is not None:
+        logger.warning(
+            "Histórico legado em spotify_tracks: rode python backfill_play_history.py "
+            "para copiá-lo para o esquema normalizado"
+        )
+
+
+@migration("0003_artist_name_normalized")
+async def artist_name_normalized(conn: AsyncConnection) -> None:
+    """Coluna e índice do nome normalizado, usados na resolução exata de artistas"""
+    await add_column(conn, "artists", "name_normalized", "VARCHAR(500)")
+
+    artists = Artist.__table__
+    result = await conn.execute(
+        select(artists.c.id, artists.c.name).where(artists.c.name_normalized.is_(None))
+    )
+    rows = result.all()
+    for i in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        await conn.execute(
+            update(artists).where(artists.c.id == bindparam("artist_id")).values(name_normalized=bindparam("normalized")),
+            [
+                {"artist_id": row.id, "normalized": normalize_artist_name(row.name)}
+                for row in rows[i:i + BACKFILL_BATCH_SIZE]
+            ]
+        )
+
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_artists_name_normalized ON artists (name_normalized)"
+    ))
+
+
+@migration("0004_group_artist_plays")
+async def group_artist_plays(conn: AsyncConnection) -> None:
+    """Preenche o agregado por grupo/artista/usuário com o histórico existente"""
+    for group_id in await aggregate_group_ids(conn):
+        await rebuild_group_artist_plays(conn, group_id)
+
+
+@migration("0005_recompute_crowns")
+async def recompute_crowns(conn: AsyncConnection) -> None:
+    """Substitui as crowns gravadas pelo .whoknows pelas calculadas a partir do agregado"""
+    columns = await conn.run_sync(
+        lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns("artist_crowns")}
+    )
+    if "artist_id" not in columns:
+        # Chave antiga (grupo, nome): a restrição única não pode ser removida no SQLite,
+        # e a tabela é só derivada do agregado, então é recriada com a chave (grupo, artist_id)
+        await conn.execute(text("DROP TABLE artist_crowns"))
+        await conn.run_sync(lambda sync_conn: ArtistCrown.__table__.create(sync_conn))
+    for group_id in await aggregate_group_ids(conn):
+        await recompute_group_crowns(conn, group_id)
+
+
+@migration("0006_unique_plays")
+async def unique_plays(conn: AsyncConnection) -> None:
+    """Preenche as faixas de horário, remove reproduções repetidas e cria as chaves únicas do ON CONFLICT"""
+    await add_column(conn, "plays", "dedup_bucket", "INTEGER")
+    await add_column(conn, "plays", "dedup_bucket_shifted", "INTEGER")
+
+    plays = Play.__table__
+    result = await conn.execute(
+        select(plays.c.id, plays.c.played_at).where(plays.c.dedup_bucket.is_(None))
+    )
+    rows = result.all()
+    for i in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        await conn.execute(
+            update(plays).where(plays.c.id == bindparam("play_id")).values(
+                dedup_bucket=bindparam("bucket"), dedup_bucket_shifted=bindparam("shifted")
+            ),
+            [
+                {"play_id": row.id, "bucket": bucket, "shifted": shifted}
+                for row in rows[i:i + BACKFILL_BATCH_SIZE]
+                for bucket, shifted in [play_buckets(row.played_at)]
+            ]
+        )
+
+    removed = 0
+    for column in ("dedup_bucket", "dedup_bucket_shifted"):
+        result = await conn.execute(text(
+            "DELETE FROM plays WHERE id NOT IN ("
+            f"SELECT MIN(id) FROM plays GROUP BY user_id, group_id, track_id, {column})"
+        ))
+        removed += result.rowcount
+    await conn.execute(text("DROP INDEX IF EXISTS uq_plays_user_group_track_played"))
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_plays_user_group_track_bucket "
+        "ON plays (user_id, group_id, track_id, dedup_bucket)"
+    ))
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_plays_user_group_track_bucket_shifted "
+        "ON plays (user_id, group_id, track_id, dedup_bucket_shifted)"
+    ))
+
+    if removed:
+        logger.info(f"{removed} reproduções duplicadas removidas; recalculando agregados")
+        for group_id in await aggregate_group_ids(conn):
+            await rebuild_group_artist_plays(conn, group_id)
+            await recompute_group_crowns(conn, group_id)
+
+
+@migration("0007_unique_group_users")
+async def unique_group_users(conn: AsyncConnection) -> None:
+    """Junta relações grupo-usuário duplicadas e cria a chave única do contador de mensagens"""
+    await conn.execute(text(
+        "UPDATE group_users SET message_count = ("
+        "SELECT SUM(dup.message_count) FROM group_users dup "
+        "WHERE dup.user_id = group_users.user_id AND dup.group_id = group_users.group_id) "
+        "WHERE id IN (SELECT MIN(id) FROM group_users GROUP BY user_id, group_id HAVING COUNT(*) > 1)"
+    ))
+    await conn.execute(text(
+        "DELETE FROM group_users WHERE id NOT IN ("
+        "SELECT MIN(id) FROM group_users GROUP BY user_id, group_id)"
+    ))
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_group_users_user_group ON group_users (user_id, group_id)"
+    ))
+
+
+@migration("0008_group_users_rank_index")
+async def group_users_rank_index(conn: AsyncConnection) -> None:
+    """Índice para calcular a posição no rank sem carregar o grupo inteiro"""
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_group_users_group_count ON group_users (group_id, message_count)"
+    ))
+
+
+@migration("0009_group_filter_lists")
+async def group_filter_lists(conn: AsyncConnection) -> None:
+    """Listas de termos e domínios proibidos do AutoMod"""
+    await add_column(conn, "groups", "banned_words", "TEXT")
+    await add_column(conn, "groups", "banned_domains", "TEXT")
+
+
+@migration("0010_group_flood_limits")
+async def group_flood_limits(conn: AsyncConnection) -> None:
+    """Limites de flood configuráveis por grupo"""
+    await add_column(conn, "groups", "flood_max_messages", "INTEGER")
+    await add_column(conn, "groups", "flood_window", "INTEGER")
+    await add_column(conn, "groups", "flood_max_duplicates", "INTEGER")
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    """Aplica as migrações pendentes"""
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(100) PRIMARY KEY, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    applied = {row[0] for row in result.all()}
+
+    for version, func in MIGRATIONS:
+        if version in applied:
+            continue
+
+        logger.info(f"Aplicando migração {version}...")
+        await func(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+            {"version": version}
+        )
@@ -3,7 +3,7 @@ Modelos de banco de dados usando SQLAlchemy 2.0+
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import BigInteger, String, Integer, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, CheckConstraint
+from sqlalchemy import BigInteger, String, Integer, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, CheckConstraint, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -43,6 +43,13 @@ class Group(Base):
     automod_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
     filter_links: Mapped[bool] = mapped_column(Boolean, default=False)
     filter_spam: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Termos e domínios proibidos (um por linha)
+    banned_words: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    banned_domains: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Limites de flood (None = padrão do config)
+    flood_max_messages: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    flood_window: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    flood_max_duplicates: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Log Channel
     log_channel_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
@@ -72,6 +79,13 @@ class GroupUser(Base):
     # Relacionamentos
     user: Mapped["User"] = relationship("User", back_populates="group_users")
     group: Mapped["Group"] = relationship("Group", back_populates="group_users")
+    
+    __table_args__ = (
+        # Chave do UPSERT do contador de mensagens
+        Index('uq_group_users_user_group', 'user_id', 'group_id', unique=True),
+        # Posição no rank e páginas do /top
+        Index('ix_group_users_group_count', 'group_id', 'message_count'),
+    )
 
 
 class ModerationLog(Base):
@@ -107,8 +121,22 @@ class SpotifyAccount(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class ScrobbleCursor(Base):
+    """Posição da coleta automática de reproduções de cada conta do Spotify"""
+    __tablename__ = "scrobble_cursors"
+    
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    # Cursor "after" do /me/player/recently-played (played_at em ms)
+    after_ms: Mapped[int] = mapped_column(BigInteger, default=0)
+    next_poll_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    interval_seconds: Mapped[int] = mapped_column(Integer, default=0)
+    last_play_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class SpotifyTrack(Base):
-    """Modelo para armazenar histórico de músicas do Spotify"""
+    """Histórico legado de músicas do Spotify (substituído por Play; mantido para backfill)"""
     __tablename__ = "spotify_tracks"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -125,6 +153,115 @@ class SpotifyTrack(Base):
     played_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    # Bancos já existentes recebem estes índices via src/database/migrations.py
+    __table_args__ = (
+        Index('ix_spotify_tracks_group_artist_user', 'group_id', 'artist_name', 'user_id'),
+        Index('ix_spotify_tracks_user_played', 'user_id', 'played_at'),
+        Index('ix_spotify_tracks_group_played', 'group_id', 'played_at'),
+    )
+
+
+class Artist(Base):
+    """Dimensão de artistas (chave natural: ID do Spotify)"""
+    __tablename__ = "artists"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Nulo apenas para artistas importados do histórico legado, que não tinha IDs
+    spotify_id: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
+    name: Mapped[str] = mapped_column(String(500), index=True)
+    # Nome minúsculo, sem acentos e espaços repetidos (busca exata do .whoknows)
+    name_normalized: Mapped[Optional[str]] = mapped_column(String(500), nullable=True, index=True)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ArtistAlias(Base):
+    """Consultas de .whoknows já resolvidas para um artista"""
+    __tablename__ = "artist_aliases"
+    
+    alias: Mapped[str] = mapped_column(String(500), primary_key=True)
+    artist_id: Mapped[int] = mapped_column(Integer, ForeignKey("artists.id"))
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class Album(Base):
+    """Dimensão de álbuns"""
+    __tablename__ = "albums"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    spotify_id: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
+    name: Mapped[str] = mapped_column(String(500))
+    image_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class Track(Base):
+    """Dimensão de músicas"""
+    __tablename__ = "tracks"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    spotify_id: Mapped[str] = mapped_column(String(64), unique=True)
+    name: Mapped[str] = mapped_column(String(500))
+    album_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("albums.id"), nullable=True)
+    # Importada do histórico legado (artistas e álbum sem IDs do Spotify); religada
+    # aos artistas reais no primeiro play ao vivo
+    legacy: Mapped[bool] = mapped_column(Boolean, default=False)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TrackArtist(Base):
+    """Relação N:N entre músicas e artistas"""
+    __tablename__ = "track_artists"
+    
+    track_id: Mapped[int] = mapped_column(Integer, ForeignKey("tracks.id"), primary_key=True)
+    artist_id: Mapped[int] = mapped_column(Integer, ForeignKey("artists.id"), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, default=0)
+    
+    __table_args__ = (
+        Index('ix_track_artists_artist', 'artist_id'),
+    )
+
+
+class Play(Base):
+    """Fato de reprodução: apenas chaves inteiras e o horário"""
+    __tablename__ = "plays"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"))
+    group_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("groups.id"))
+    track_id: Mapped[int] = mapped_column(Integer, ForeignKey("tracks.id"))
+    played_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Faixas de horário do início (plays.play_buckets): a chave única que descarta a
+    # mesma reprodução vinda do .fm e da coleta automática com horários próximos
+    dedup_bucket: Mapped[int] = mapped_column(Integer)
+    dedup_bucket_shifted: Mapped[int] = mapped_column(Integer)
+    
+    __table_args__ = (
+        Index('ix_plays_group_track_user', 'group_id', 'track_id', 'user_id'),
+        Index('ix_plays_user_played', 'user_id', 'played_at'),
+        Index('uq_plays_user_group_track_bucket', 'user_id', 'group_id', 'track_id', 'dedup_bucket', unique=True),
+        Index('uq_plays_user_group_track_bucket_shifted',
+              'user_id', 'group_id', 'track_id', 'dedup_bucket_shifted', unique=True),
+    )
+
+
+class GroupArtistPlays(Base):
+    """Agregado de reproduções por grupo, artista e usuário (mantido a cada play)"""
+    __tablename__ = "group_artist_plays"
+    
+    group_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("groups.id"), primary_key=True)
+    artist_id: Mapped[int] = mapped_column(Integer, ForeignKey("artists.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    play_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_played: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_group_artist_plays_top', 'group_id', 'artist_id', 'play_count'),
+    )
 
 
 class UserFriend(Base):
@@ -165,6 +302,8 @@ class ArtistCrown(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("groups.id"))
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"))
+    # A chave é o artista, não o nome: homônimos têm crowns separadas
+    artist_id: Mapped[int] = mapped_column(Integer, ForeignKey("artists.id"))
     artist_name: Mapped[str] = mapped_column(String(500))
     play_count: Mapped[int] = mapped_column(Integer, default=0)
     
@@ -172,5 +311,5 @@ class ArtistCrown(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     __table_args__ = (
-        UniqueConstraint('group_id', 'artist_name', name='uq_group_artist_crown'),
+        UniqueConstraint('group_id', 'artist_id', name='uq_group_artist_id_crown'),
     )
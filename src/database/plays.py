@@ -0,0 +1,471 @@
+"""
+Gravação do histórico de reproduções no esquema normalizado
+(artists, albums, tracks, track_artists e plays)
+"""
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from sqlalchemy import case, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.config import PLAY_DEDUP_WINDOW
+from src.database.models import Artist, Album, Track, TrackArtist, Play, GroupArtistPlays, ArtistCrown
+
+Executor = Union[AsyncSession, AsyncConnection]
+
+# Referência das faixas de horário de plays.dedup_bucket
+BUCKET_EPOCH = datetime(1970, 1, 1)
+
+# Linhas por INSERT em lote (abaixo do limite de parâmetros do SQLite)
+BULK_INSERT_SIZE = 500
+
+
+def normalize_artist_name(name: str) -> str:
+    """Normaliza nomes de artistas para comparação exata (caixa, acentos e espaços)"""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+def dialect_insert(executor: Executor, model):
+    """INSERT do dialeto em uso, com suporte a ON CONFLICT (PostgreSQL e SQLite)"""
+    dialect = executor.dialect if isinstance(executor, AsyncConnection) else executor.get_bind().dialect
+    if dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def resolve_artist(executor: Executor, spotify_id: Optional[str], name: str) -> int:
+    """Retorna o ID interno do artista, criando-o se necessário"""
+    if spotify_id:
+        result = await executor.execute(select(Artist.id).where(Artist.spotify_id == spotify_id))
+        artist_id = result.scalar_one_or_none()
+        if artist_id is not None:
+            return artist_id
+
+    # Artistas do histórico legado não têm ID do Spotify: reaproveita pelo nome
+    result = await executor.execute(
+        select(Artist.id).where(Artist.spotify_id.is_(None), Artist.name == name).limit(1)
+    )
+    artist_id = result.scalar_one_or_none()
+    if artist_id is not None:
+        if spotify_id:
+            await executor.execute(
+                update(Artist).where(Artist.id == artist_id).values(spotify_id=spotify_id)
+            )
+        return artist_id
+
+    if spotify_id:
+        await executor.execute(
+            dialect_insert(executor, Artist)
+            .values(spotify_id=spotify_id, name=name, name_normalized=normalize_artist_name(name),
+                    created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["spotify_id"])
+        )
+        result = await executor.execute(select(Artist.id).where(Artist.spotify_id == spotify_id))
+        return result.scalar_one()
+
+    result = await executor.execute(
+        dialect_insert(executor, Artist)
+        .values(spotify_id=None, name=name, name_normalized=normalize_artist_name(name),
+                created_at=datetime.utcnow())
+        .returning(Artist.id)
+    )
+    return result.scalar_one()
+
+
+async def resolve_album(executor: Executor, spotify_id: Optional[str], name: str,
+                        image_url: Optional[str]) -> int:
+    """Retorna o ID interno do álbum, criando-o se necessário"""
+    if spotify_id:
+        condition = Album.spotify_id == spotify_id
+    else:
+        condition = (Album.spotify_id.is_(None)) & (Album.name == name)
+
+    result = await executor.execute(select(Album.id).where(condition).limit(1))
+    album_id = result.scalar_one_or_none()
+    if album_id is not None:
+        return album_id
+
+    stmt = dialect_insert(executor, Album).values(
+        spotify_id=spotify_id, name=name, image_url=image_url, created_at=datetime.utcnow()
+    )
+    if spotify_id:
+        await executor.execute(stmt.on_conflict_do_nothing(index_elements=["spotify_id"]))
+        result = await executor.execute(select(Album.id).where(condition))
+        return result.scalar_one()
+
+    result = await executor.execute(stmt.returning(Album.id))
+    return result.scalar_one()
+
+
+async def link_track_artists(executor: Executor, track_id: int, artist_ids: List[int]) -> None:
+    """Liga a música aos artistas, na ordem dos créditos"""
+    if artist_ids:
+        await executor.execute(
+            dialect_insert(executor, TrackArtist)
+            .values([
+                {"track_id": track_id, "artist_id": artist_id, "position": position}
+                for position, artist_id in enumerate(dict.fromkeys(artist_ids))
+            ])
+            .on_conflict_do_nothing()
+        )
+
+
+async def resolve_track(executor: Executor, track: Dict[str, Any], legacy: bool = False) -> int:
+    """Retorna o ID interno de uma música da API do Spotify, criando as dimensões necessárias
+
+    legacy marca músicas importadas do histórico antigo; quando uma delas chega
+    depois com os IDs reais, os artistas e o álbum são religados.
+    """
+    result = await executor.execute(
+        select(Track.id, Track.legacy).where(Track.spotify_id == track['id'])
+    )
+    row = result.first()
+    if row is not None:
+        track_id, is_legacy = row
+        if is_legacy and not legacy and track['artists'] and all(artist.get('id') for artist in track['artists']):
+            await relink_legacy_track(executor, track_id, track)
+        return track_id
+
+    album = track['album']
+    album_id = await resolve_album(
+        executor,
+        album.get('id'),
+        album['name'],
+        album['images'][0]['url'] if album.get('images') else None
+    )
+    artist_ids = [
+        await resolve_artist(executor, artist.get('id'), artist['name'])
+        for artist in track['artists']
+    ]
+
+    await executor.execute(
+        dialect_insert(executor, Track)
+        .values(spotify_id=track['id'], name=track['name'], album_id=album_id, legacy=legacy,
+                created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["spotify_id"])
+    )
+    result = await executor.execute(select(Track.id).where(Track.spotify_id == track['id']))
+    track_id = result.scalar_one()
+
+    await link_track_artists(executor, track_id, artist_ids)
+    return track_id
+
+
+async def relink_legacy_track(executor: Executor, track_id: int, track: Dict[str, Any]) -> None:
+    """Troca os artistas e o álbum de uma música legada pelos da API e move as contagens
+
+    Artistas que continuam ligados (ex.: o artista legado reivindicado pelo ID)
+    não mudam; os removidos perdem e os novos ganham as reproduções da música
+    em group_artist_plays, com as crowns atualizadas.
+    """
+    album = track['album']
+    album_id = await resolve_album(
+        executor,
+        album.get('id'),
+        album['name'],
+        album['images'][0]['url'] if album.get('images') else None
+    )
+    new_ids = list(dict.fromkeys([
+        await resolve_artist(executor, artist['id'], artist['name'])
+        for artist in track['artists']
+    ]))
+
+    result = await executor.execute(select(TrackArtist.artist_id).where(TrackArtist.track_id == track_id))
+    old_ids = set(result.scalars().all())
+
+    await executor.execute(delete(TrackArtist).where(TrackArtist.track_id == track_id))
+    await link_track_artists(executor, track_id, new_ids)
+    await executor.execute(
+        update(Track).where(Track.id == track_id).values(album_id=album_id, legacy=False)
+    )
+
+    removed = old_ids - set(new_ids)
+    if not removed and old_ids.issuperset(new_ids):
+        return
+
+    result = await executor.execute(
+        select(Play.user_id, Play.group_id, Play.played_at).where(Play.track_id == track_id)
+    )
+    plays: Dict[Tuple[int, int], List[Tuple[int, datetime]]] = {}
+    for user_id, group_id, played_at in result.all():
+        plays.setdefault((user_id, group_id), []).append((track_id, played_at))
+
+    table = GroupArtistPlays.__table__
+    for (user_id, group_id), user_plays in plays.items():
+        if removed:
+            await executor.execute(
+                update(GroupArtistPlays)
+                .where(
+                    GroupArtistPlays.group_id == group_id,
+                    GroupArtistPlays.user_id == user_id,
+                    GroupArtistPlays.artist_id.in_(removed)
+                )
+                .values(play_count=table.c.play_count - len(user_plays))
+            )
+        # Os artistas novos contam as reproduções pela ligação recém-criada
+        counts = await increment_group_artist_plays(
+            executor, user_id, group_id, user_plays, artist_ids=set(new_ids) - old_ids
+        )
+        await update_crowns(executor, user_id, group_id, counts)
+
+    if removed:
+        await executor.execute(
+            delete(GroupArtistPlays).where(
+                GroupArtistPlays.artist_id.in_(removed),
+                GroupArtistPlays.play_count <= 0
+            )
+        )
+        for group_id in {group_id for _, group_id in plays}:
+            for artist_id in removed:
+                await refresh_crown(executor, group_id, artist_id)
+
+
+async def increment_group_artist_plays(executor: Executor, user_id: int, group_id: int,
+                                       plays: List[Tuple[int, datetime]],
+                                       artist_ids: Optional[Set[int]] = None) -> List[Tuple[int, int]]:
+    """Soma reproduções (track_id, played_at) ao agregado de cada artista das músicas
+
+    artist_ids restringe a soma a esses artistas. Retorna (artist_id, novo
+    play_count) para cada artista atualizado.
+    """
+    stmt = select(TrackArtist.track_id, TrackArtist.artist_id).where(
+        TrackArtist.track_id.in_({track_id for track_id, _ in plays})
+    )
+    if artist_ids is not None:
+        if not artist_ids:
+            return []
+        stmt = stmt.where(TrackArtist.artist_id.in_(artist_ids))
+    result = await executor.execute(stmt)
+    track_artists: Dict[int, List[int]] = {}
+    for track_id, artist_id in result.all():
+        track_artists.setdefault(track_id, []).append(artist_id)
+
+    increments: Dict[int, Tuple[int, datetime]] = {}
+    for track_id, played_at in plays:
+        for artist_id in track_artists.get(track_id, []):
+            count, last_played = increments.get(artist_id, (0, played_at))
+            increments[artist_id] = (count + 1, max(last_played, played_at))
+    if not increments:
+        return []
+
+    stmt = dialect_insert(executor, GroupArtistPlays).values([
+        {"group_id": group_id, "artist_id": artist_id, "user_id": user_id,
+         "play_count": count, "last_played": last_played}
+        for artist_id, (count, last_played) in increments.items()
+    ])
+    table = GroupArtistPlays.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["group_id", "artist_id", "user_id"],
+        set_={
+            "play_count": table.c.play_count + stmt.excluded.play_count,
+            "last_played": case(
+                (stmt.excluded.last_played > table.c.last_played, stmt.excluded.last_played),
+                else_=table.c.last_played
+            )
+        }
+    ).returning(table.c.artist_id, table.c.play_count)
+    result = await executor.execute(stmt)
+    return [(artist_id, play_count) for artist_id, play_count in result.all()]
+
+
+async def update_crowns(executor: Executor, user_id: int, group_id: int,
+                        counts: List[Tuple[int, int]]) -> None:
+    """Transfere ou atualiza crowns a partir das novas contagens do usuário
+
+    Cada artista custa um único upsert em uq_group_artist_id_crown: a linha só muda
+    se o usuário já é o dono ou se passou a contagem do dono atual. A contagem
+    comparada é a mesma linha de group_artist_plays usada na reconstrução.
+    """
+    if not counts:
+        return
+
+    result = await executor.execute(
+        select(Artist.id, Artist.name).where(Artist.id.in_([artist_id for artist_id, _ in counts]))
+    )
+    names = dict(result.all())
+    table = ArtistCrown.__table__
+    now = datetime.utcnow()
+
+    for artist_id, play_count in counts:
+        stmt = dialect_insert(executor, ArtistCrown).values(
+            group_id=group_id,
+            user_id=user_id,
+            artist_id=artist_id,
+            artist_name=names[artist_id],
+            play_count=play_count,
+            created_at=now,
+            updated_at=now
+        )
+        await executor.execute(stmt.on_conflict_do_update(
+            index_elements=["group_id", "artist_id"],
+            set_={
+                "user_id": stmt.excluded.user_id,
+                "artist_name": stmt.excluded.artist_name,
+                "play_count": stmt.excluded.play_count,
+                "updated_at": stmt.excluded.updated_at
+            },
+            where=or_(
+                table.c.user_id == stmt.excluded.user_id,
+                table.c.play_count < stmt.excluded.play_count
+            )
+        ))
+
+
+async def refresh_crown(executor: Executor, group_id: int, artist_id: int) -> None:
+    """Recalcula a crown de um artista no grupo depois que contagens diminuíram"""
+    result = await executor.execute(
+        select(GroupArtistPlays.user_id, GroupArtistPlays.play_count, Artist.name)
+        .join(Artist, Artist.id == GroupArtistPlays.artist_id)
+        .where(
+            GroupArtistPlays.group_id == group_id,
+            GroupArtistPlays.artist_id == artist_id,
+            GroupArtistPlays.play_count > 0
+        )
+        .order_by(GroupArtistPlays.play_count.desc(), GroupArtistPlays.last_played)
+        .limit(1)
+    )
+    top = result.first()
+    if top is None:
+        await executor.execute(
+            delete(ArtistCrown).where(ArtistCrown.group_id == group_id, ArtistCrown.artist_id == artist_id)
+        )
+        return
+
+    user_id, play_count, artist_name = top
+    now = datetime.utcnow()
+    stmt = dialect_insert(executor, ArtistCrown).values(
+        group_id=group_id,
+        user_id=user_id,
+        artist_id=artist_id,
+        artist_name=artist_name,
+        play_count=play_count,
+        created_at=now,
+        updated_at=now
+    )
+    await executor.execute(stmt.on_conflict_do_update(
+        index_elements=["group_id", "artist_id"],
+        set_={
+            "user_id": stmt.excluded.user_id,
+            "play_count": stmt.excluded.play_count,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+
+
+def parse_played_at(value: str) -> datetime:
+    """Converte o played_at ISO 8601 do Spotify para datetime UTC sem fuso"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def play_started_at(reference: datetime, elapsed_ms: int) -> datetime:
+    """Início estimado de uma reprodução (precisão de segundos)
+
+    O .fm (agora - progress_ms) e a coleta automática (played_at - duração) da
+    mesma reprodução chegam a horários próximos, mas não iguais; a chave única
+    (play_buckets) trata como a mesma reprodução tudo o que cair a até
+    PLAY_DEDUP_WINDOW segundos.
+    """
+    return (reference - timedelta(milliseconds=elapsed_ms)).replace(microsecond=0)
+
+
+def play_buckets(played_at: datetime) -> Tuple[int, int]:
+    """Faixas de horário da chave única de plays (dedup_bucket, dedup_bucket_shifted)
+
+    Duas grades de 2 * PLAY_DEDUP_WINDOW segundos, a segunda deslocada em
+    PLAY_DEDUP_WINDOW: inícios a até PLAY_DEDUP_WINDOW segundos um do outro
+    caem na mesma faixa em pelo menos uma delas, e o banco recusa o segundo
+    mesmo quando o .fm e a coleta gravam ao mesmo tempo em transações separadas.
+    Entre PLAY_DEDUP_WINDOW e o dobro, depende do alinhamento (uma música não
+    recomeça tão rápido).
+    """
+    seconds = int((played_at - BUCKET_EPOCH).total_seconds())
+    span = 2 * PLAY_DEDUP_WINDOW
+    return seconds // span, (seconds + PLAY_DEDUP_WINDOW) // span
+
+
+def play_row(user_id: int, group_id: int, track_id: int, played_at: datetime) -> Dict[str, Any]:
+    """Linha de plays com as faixas de horário da chave única"""
+    bucket, shifted = play_buckets(played_at)
+    return {
+        "user_id": user_id,
+        "group_id": group_id,
+        "track_id": track_id,
+        "played_at": played_at,
+        "dedup_bucket": bucket,
+        "dedup_bucket_shifted": shifted
+    }
+
+
+async def insert_plays(executor: Executor, rows: List[Dict[str, Any]]) -> List[Tuple[int, int, int, datetime]]:
+    """INSERTs de várias linhas em plays; retorna (user_id, group_id, track_id, played_at) das novas
+
+    Repetições de uma reprodução já gravada (ou do próprio lote) são descartadas
+    pelas chaves únicas das faixas de horário (ON CONFLICT DO NOTHING).
+    """
+    inserted = []
+    for i in range(0, len(rows), BULK_INSERT_SIZE):
+        result = await executor.execute(
+            dialect_insert(executor, Play)
+            .values(rows[i:i + BULK_INSERT_SIZE])
+            # Sem alvo: vale para as duas chaves únicas
+            .on_conflict_do_nothing()
+            .returning(Play.user_id, Play.group_id, Play.track_id, Play.played_at)
+        )
+        inserted.extend(result.all())
+    return inserted
+
+
+async def record_play(executor: Executor, user_id: int, group_id: int, track: Dict[str, Any],
+                      played_at: Optional[datetime] = None) -> bool:
+    """Registra uma reprodução e atualiza agregados e crowns (o commit fica a cargo de quem chama)
+
+    Retorna False se a reprodução já estava registrada (nada é alterado).
+    """
+    played_at = played_at or play_started_at(datetime.utcnow(), 0)
+    return await record_play_rows(executor, [(user_id, group_id, track, played_at)]) > 0
+
+
+async def record_plays(executor: Executor, user_id: int, group_ids: List[int],
+                       items: List[Tuple[Dict[str, Any], datetime]]) -> int:
+    """Registra em lote reproduções (música, played_at) de um usuário em cada grupo
+
+    Reproduções já gravadas são ignoradas pela chave única. Retorna o número
+    de linhas novas em plays.
+    """
+    return await record_play_rows(executor, [
+        (user_id, group_id, track, played_at)
+        for group_id in group_ids
+        for track, played_at in items
+    ])
+
+
+async def record_play_rows(executor: Executor,
+                           plays: List[Tuple[int, int, Dict[str, Any], datetime]]) -> int:
+    """Registra em lote reproduções (user_id, group_id, música, played_at) de vários usuários
+
+    Reproduções a até PLAY_DEDUP_WINDOW segundos de outra da mesma música (no
+    banco ou no próprio lote) são ignoradas pela chave única. Agregados e
+    crowns são atualizados uma vez por (usuário, grupo) só com as linhas
+    realmente novas.
+    """
+    track_ids: Dict[str, int] = {}
+    for _, _, track, _ in plays:
+        if track['id'] not in track_ids:
+            track_ids[track['id']] = await resolve_track(executor, track)
+
+    rows = [
+        play_row(user_id, group_id, track_ids[track['id']], played_at)
+        for user_id, group_id, track, played_at in plays
+    ]
+    inserted: Dict[Tuple[int, int], List[Tuple[int, datetime]]] = {}
+    for user_id, group_id, track_id, played_at in await insert_plays(executor, rows):
+        inserted.setdefault((user_id, group_id), []).append((track_id, played_at))
+
+    for (user_id, group_id), new_plays in inserted.items():
+        counts = await increment_group_artist_plays(executor, user_id, group_id, new_plays)
+        await update_crowns(executor, user_id, group_id, counts)
+
+    return sum(len(new_plays) for new_plays in inserted.values())
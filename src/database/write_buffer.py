@@ -0,0 +1,220 @@
+"""
+Buffer de escrita assíncrona (write-behind) para reproduções do .fm
+Acumula plays e upserts de usuário/grupo e grava tudo em INSERTs de várias
+linhas, fora do caminho da resposta ao usuário
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+
+from src.config import WRITE_BUFFER_FLUSH_MS, WRITE_BUFFER_BATCH_SIZE, WRITE_BUFFER_MAX_ROWS
+from src.database.db import db
+from src.database.models import User, Group
+from src.database.plays import dialect_insert, record_play_rows
+
+logger = logging.getLogger(__name__)
+
+# (user_id, group_id, música, played_at, dados do usuário, título do grupo)
+PendingPlay = Tuple[int, int, Dict[str, Any], datetime, Dict[str, Any], Optional[str]]
+
+# Falhas de conexão/banco indisponível: o lote inteiro volta para a fila. As
+# demais (dados inválidos) vêm de uma linha específica, isolada por bisseção
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, OSError, asyncio.TimeoutError)
+
+
+class PlayWriteBuffer:
+    """Fila limitada de reproduções gravadas em lote a cada N ms ou M linhas"""
+
+    def __init__(self, flush_ms: int, batch_size: int, max_rows: int):
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Lote em formação e gravação em andamento (recuperados no shutdown)
+        self._batch: List[PendingPlay] = []
+        # Reproduções devolvidas por falha transitória, regravadas no próximo lote
+        self._retry: List[PendingPlay] = []
+        self._flushing: Optional[asyncio.Task] = None
+        self.counters: Dict[str, float] = {
+            "submitted": 0,
+            "backpressure_waits": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "rows_failed": 0,
+            "rows_requeued": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0
+        }
+
+    def start(self) -> None:
+        """Inicia a tarefa de gravação no loop atual"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_rows)
+            self._task = asyncio.create_task(self._run())
+            logger.info("Buffer de escrita de reproduções iniciado")
+
+    async def close(self) -> None:
+        """Grava o que estiver pendente e encerra a tarefa"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._flushing is not None:
+            await self._flushing
+
+        pending, self._batch, self._retry = self._retry + self._batch, [], []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for i in range(0, len(pending), self.batch_size):
+            await self._flush(pending[i:i + self.batch_size])
+
+        # Sem próxima tentativa depois do shutdown
+        lost, self._retry = self._retry, []
+        if lost:
+            self.counters["rows_failed"] += len(lost)
+            logger.error(f"{len(lost)} reproduções não gravadas no shutdown")
+        logger.info(f"Buffer de escrita encerrado ({len(pending) - len(lost)} reproduções gravadas no shutdown)")
+
+    async def submit(self, user_id: int, group_id: int, track: Dict[str, Any], played_at: datetime,
+                     user_data: Dict[str, Any], chat_title: Optional[str]) -> None:
+        """Enfileira uma reprodução; aguarda (backpressure) se a fila estiver cheia"""
+        self.start()
+        self.counters["submitted"] += 1
+        item = (user_id, group_id, track, played_at, user_data, chat_title)
+        if self._queue.full():
+            self.counters["backpressure_waits"] += 1
+        await self._queue.put(item)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._retry:
+                # Espera um intervalo antes de tentar de novo o lote devolvido
+                await asyncio.sleep(self.flush_interval)
+                self._batch, self._retry = self._retry, []
+            else:
+                self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Protegido: um cancelamento no shutdown não interrompe um lote no meio
+            batch, self._batch = self._batch, []
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            try:
+                await asyncio.shield(self._flushing)
+            finally:
+                if self._flushing.done():
+                    self._flushing = None
+
+    async def _flush(self, batch: List[PendingPlay]) -> None:
+        started = time.monotonic()
+        users: Dict[int, Dict[str, Any]] = {}
+        groups: Dict[int, Dict[str, Any]] = {}
+        for user_id, group_id, _, _, user_data, chat_title in batch:
+            users[user_id] = {
+                "id": user_id,
+                "first_name": user_data.get('first_name') or "Unknown",
+                "last_name": user_data.get('last_name'),
+                "username": user_data.get('username')
+            }
+            groups[group_id] = {"id": group_id, "title": chat_title or "Unknown"}
+
+        try:
+            async with db.session_maker() as session:
+                now = datetime.utcnow()
+                stmt = dialect_insert(session, User).values([
+                    {**user, "created_at": now, "updated_at": now}
+                    for user in users.values()
+                ])
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={
+                        "first_name": stmt.excluded.first_name,
+                        "last_name": stmt.excluded.last_name,
+                        "username": stmt.excluded.username,
+                        "updated_at": stmt.excluded.updated_at
+                    }
+                ))
+
+                stmt = dialect_insert(session, Group).values([
+                    {**group, "created_at": now, "updated_at": now} for group in groups.values()
+                ])
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={"title": stmt.excluded.title, "updated_at": stmt.excluded.updated_at}
+                ))
+
+                await record_play_rows(session, [
+                    (user_id, group_id, track, played_at)
+                    for user_id, group_id, track, played_at, _, _ in batch
+                ])
+                await session.commit()
+        except TRANSIENT_ERRORS as e:
+            # Como no contador de mensagens: devolve o lote em vez de perder as reproduções
+            self._requeue(batch)
+            logger.error(f"Erro ao gravar lote de {len(batch)} reproduções (nova tentativa no próximo lote): {e}")
+            return
+        except Exception as e:
+            if len(batch) > 1:
+                # Uma linha inválida não derruba o lote: divide até isolá-la
+                middle = len(batch) // 2
+                await self._flush(batch[:middle])
+                await self._flush(batch[middle:])
+                return
+            self.counters["rows_failed"] += 1
+            user_id, group_id, track, _, _, _ = batch[0]
+            logger.error(
+                f"Reprodução descartada (user {user_id}, grupo {group_id}, música {track.get('id')}): {e}"
+            )
+            return
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.counters["flushes"] += 1
+        self.counters["rows_flushed"] += len(batch)
+        self.counters["last_batch_size"] = len(batch)
+        self.counters["max_batch_size"] = max(self.counters["max_batch_size"], len(batch))
+        self.counters["last_flush_ms"] = round(elapsed_ms, 2)
+        self.counters["max_flush_ms"] = round(max(self.counters["max_flush_ms"], elapsed_ms), 2)
+
+    def _requeue(self, batch: List[PendingPlay]) -> None:
+        """Guarda um lote para a próxima tentativa, respeitando o limite de linhas"""
+        self._retry.extend(batch)
+        self.counters["rows_requeued"] += len(batch)
+        overflow = len(self._retry) - self.max_rows
+        if overflow > 0:
+            # Mais antigas primeiro: a fila já está no limite de memória
+            del self._retry[:overflow]
+            self.counters["rows_failed"] += overflow
+            logger.error(f"{overflow} reproduções descartadas: fila de novas tentativas cheia")
+
+    def stats(self) -> Dict[str, float]:
+        """Tamanho de lote, latência de gravação e profundidade da fila"""
+        flushes = self.counters["flushes"]
+        return {
+            **self.counters,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "retry_depth": len(self._retry),
+            "avg_batch_size": round(self.counters["rows_flushed"] / flushes, 2) if flushes else 0.0
+        }
+
+
+# Instância global do buffer de reproduções
+play_write_buffer = PlayWriteBuffer(WRITE_BUFFER_FLUSH_MS, WRITE_BUFFER_BATCH_SIZE, WRITE_BUFFER_MAX_ROWS)
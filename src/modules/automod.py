@@ -1,78 +1,110 @@
 """
 Módulo de AutoMod - Filtros automáticos de links, spam e conteúdo
 """
-import re
-from telegram import Update
-from telegram.ext import ContextTypes, MessageHandler, filters
+import asyncio
+from telegram import Update, MessageEntity
+from telegram.ext import ContextTypes, CommandHandler
 from telegram.error import TelegramError
 
-from src.utils.permissions import bot_can_delete
-from src.utils.responses import responses
+from src.config import FLOOD_MAX_MESSAGES, FLOOD_WINDOW, FLOOD_MAX_DUPLICATES
 from src.database.db import db
-from sqlalchemy import select
-from src.database.models import Group
+from src.utils.permissions import is_admin, bot_can_delete
+from src.utils.responses import responses
+from src.utils.group_settings import get_group_settings, invalidate_group_settings
+from src.utils.flood import flood_detector
+from src.utils.message_context import MessageContext
+from src.utils.content_filter import (
+    get_group_rules,
+    normalize_term,
+    normalize_domain,
+    parse_term_list,
+    BANNED_WORD,
+    BANNED_DOMAIN,
+    LINK,
+    SPAM
+)
 
+VIOLATION_WARNINGS = {
+    BANNED_WORD: responses.BANNED_WORD_DETECTED,
+    BANNED_DOMAIN: responses.BANNED_DOMAIN_DETECTED,
+    LINK: responses.LINK_DETECTED,
+    SPAM: responses.SPAM_DETECTED
+}
 
-async def check_automod(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Verifica mensagens para AutoMod"""
-    if not update.message or not update.effective_chat or not update.effective_user:
-        return
+LINK_ENTITIES = [MessageEntity.URL, MessageEntity.TEXT_LINK]
+MENTION_ENTITIES = [MessageEntity.MENTION, MessageEntity.TEXT_MENTION]
+
+
+async def check_automod(update: Update, context: ContextTypes.DEFAULT_TYPE, message: MessageContext) -> bool:
+    """Etapa de AutoMod do pipeline; retorna True se a mensagem foi removida"""
+    # Caso comum: AutoMod desabilitado (configurações já carregadas no contexto)
+    group = message.settings
+    if not group or not group["automod_enabled"] or not message.text:
+        return False
     
     # Não modera admins
-    try:
-        member = await context.bot.get_chat_member(
-            update.effective_chat.id,
-            update.effective_user.id
-        )
-        if member.status in ["administrator", "creator"]:
-            return
-    except Exception:
-        pass
+    if await message.is_admin(context):
+        return False
     
-    # Verifica configurações do grupo
-    async for session in db.get_session():
-        result = await session.execute(
-            select(Group).where(Group.id == update.effective_chat.id)
+    # Links e menções vêm das entidades já marcadas pelo Telegram (inclui links ocultos em texto)
+    urls = []
+    mentions = 0
+    if update.message.entities:
+        for entity, value in update.message.parse_entities(LINK_ENTITIES + MENTION_ENTITIES).items():
+            if entity.type == MessageEntity.TEXT_LINK:
+                urls.append(entity.url)
+            elif entity.type == MessageEntity.URL:
+                urls.append(value)
+            else:
+                mentions += 1
+    
+    rules = get_group_rules(message.chat_id, group)
+    violation = rules.check(message.text, urls, mentions)
+    if violation:
+        return await remove_message(update, context, VIOLATION_WARNINGS[violation])
+    
+    # Flood: taxa de mensagens e repetições quase idênticas por usuário
+    if group["filter_spam"]:
+        flood = flood_detector.observe(
+            message.chat_id,
+            message.user.id,
+            message.text,
+            {
+                "max_messages": group.get("flood_max_messages"),
+                "window": group.get("flood_window"),
+                "max_duplicates": group.get("flood_max_duplicates")
+            }
         )
-        group = result.scalar_one_or_none()
-        
-        if not group or not group.automod_enabled:
-            return
-        
-        # Filtro de links
-        if group.filter_links and update.message.text:
-            if check_links(update.message.text):
-                if await bot_can_delete(update, context):
-                    try:
-                        await update.message.delete()
-                        warning = await update.message.reply_text(responses.LINK_DETECTED)
-                        await context.application.create_task(
-                            delete_after_delay(warning, 5)
-                        )
-                    except TelegramError:
-                        pass
-                return
-        
-        # Filtro de spam (mensagens repetidas rapidamente)
-        if group.filter_spam:
-            # Implementação básica - pode ser expandida
-            if update.message.text and len(update.message.text) > 500:
-                if await bot_can_delete(update, context):
-                    try:
-                        await update.message.delete()
-                        warning = await update.message.reply_text(responses.SPAM_DETECTED)
-                        await context.application.create_task(
-                            delete_after_delay(warning, 5)
-                        )
-                    except TelegramError:
-                        pass
-        
-        break
+        if flood:
+            # Um aviso por rajada; as demais mensagens são apenas removidas
+            warn = flood_detector.should_warn(message.chat_id, message.user.id, group.get("flood_window"))
+            return await remove_message(update, context, responses.FLOOD_DETECTED if warn else None)
+    
+    return False
+
+
+async def remove_message(update: Update, context: ContextTypes.DEFAULT_TYPE, warning_text: str | None) -> bool:
+    """Remove a mensagem e publica um aviso temporário; retorna True se removeu"""
+    if not await bot_can_delete(update, context):
+        return False
+    
+    try:
+        await update.message.delete()
+    except TelegramError:
+        return False
+    
+    if warning_text:
+        try:
+            warning = await update.message.reply_text(warning_text)
+            # Em segundo plano: o handler não espera o aviso expirar
+            context.application.create_task(delete_after_delay(warning, 5))
+        except TelegramError:
+            pass
+    return True
 
 
 async def delete_after_delay(message, delay: int) -> None:
     """Deleta mensagem após um delay"""
-    import asyncio
     await asyncio.sleep(delay)
     try:
         await message.delete()
@@ -80,18 +112,148 @@ async def delete_after_delay(message, delay: int) -> None:
         pass
 
 
-def check_links(text: str) -> bool:
-    """Verifica se há links no texto"""
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    return bool(re.search(url_pattern, text))
+async def update_filter_list(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                             column: str, add: bool) -> None:
+    """Adiciona ou remove um item da lista de termos/domínios proibidos do grupo"""
+    if not update.message or not update.effective_chat:
+        return
+    
+    if not await is_admin(update, context):
+        await update.message.reply_text(responses.NO_PERMISSION)
+        return
+    
+    command = update.message.text.split()[0] if update.message.text else ""
+    normalize = normalize_domain if column == "banned_domains" else normalize_term
+    item = normalize(" ".join(context.args)) if context.args else ""
+    if not item:
+        syntax = f"{command} dominio.com" if column == "banned_domains" else f"{command} termo"
+        await update.message.reply_text(responses.INVALID_SYNTAX.format(syntax=syntax))
+        return
+    
+    async for session in db.get_session():
+        group = await db.get_or_create_group(
+            session,
+            update.effective_chat.id,
+            update.effective_chat.title or "Unknown"
+        )
+        items = parse_term_list(getattr(group, column))
+        changed = False
+        if add and item in items:
+            reply = responses.FILTER_ALREADY_EXISTS
+        elif add:
+            items.append(item)
+            changed = True
+            reply = responses.FILTER_ADDED
+        elif item in items:
+            items.remove(item)
+            changed = True
+            reply = responses.FILTER_REMOVED
+        else:
+            reply = responses.FILTER_NOT_FOUND
+        
+        # Sem mudança: nada a gravar nem a invalidar
+        if changed:
+            setattr(group, column, "\n".join(items) or None)
+            await session.commit()
+        break
+    
+    if changed:
+        await invalidate_group_settings(update.effective_chat.id)
+    await update.message.reply_text(reply.format(item=item))
+
+
+async def ban_word_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /proibir - Adiciona termo proibido"""
+    await update_filter_list(update, context, "banned_words", add=True)
+
+
+async def unban_word_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /desproibir - Remove termo proibido"""
+    await update_filter_list(update, context, "banned_words", add=False)
+
+
+async def ban_domain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /proibirdominio - Adiciona domínio proibido"""
+    await update_filter_list(update, context, "banned_domains", add=True)
+
+
+async def unban_domain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /desproibirdominio - Remove domínio proibido"""
+    await update_filter_list(update, context, "banned_domains", add=False)
+
+
+async def filters_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /filtros - Lista termos e domínios proibidos do grupo"""
+    if not update.message or not update.effective_chat:
+        return
+    
+    if not await is_admin(update, context):
+        await update.message.reply_text(responses.NO_PERMISSION)
+        return
+    
+    group = await get_group_settings(update.effective_chat.id) or {}
+    words = parse_term_list(group.get("banned_words"))
+    domains = parse_term_list(group.get("banned_domains"))
+    await update.message.reply_text(responses.FILTER_LIST.format(
+        words="\n".join(words) or responses.FILTER_LIST_EMPTY,
+        domains="\n".join(domains) or responses.FILTER_LIST_EMPTY
+    ))
+
+
+async def antiflood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /antiflood - Mostra ou define os limites de flood do grupo"""
+    if not update.message or not update.effective_chat:
+        return
+    
+    if not await is_admin(update, context):
+        await update.message.reply_text(responses.NO_PERMISSION)
+        return
+    
+    syntax = "/antiflood {mensagens} {segundos} [repetições] ou /antiflood padrao"
+    if not context.args:
+        group = await get_group_settings(update.effective_chat.id) or {}
+        await update.message.reply_text(responses.FLOOD_LIMITS.format(
+            messages=group.get("flood_max_messages") or FLOOD_MAX_MESSAGES,
+            window=group.get("flood_window") or int(FLOOD_WINDOW),
+            duplicates=group.get("flood_max_duplicates") or FLOOD_MAX_DUPLICATES
+        ))
+        return
+    
+    if context.args[0].lower() == "padrao":
+        limits = [None, None, None]
+    else:
+        try:
+            limits = [int(arg) for arg in context.args[:3]]
+        except ValueError:
+            limits = []
+        if len(limits) < 2 or any(value <= 0 for value in limits):
+            await update.message.reply_text(responses.INVALID_SYNTAX.format(syntax=syntax))
+            return
+        limits += [None] * (3 - len(limits))
+    
+    async for session in db.get_session():
+        group = await db.get_or_create_group(
+            session,
+            update.effective_chat.id,
+            update.effective_chat.title or "Unknown"
+        )
+        group.flood_max_messages, group.flood_window, group.flood_max_duplicates = limits
+        await session.commit()
+        break
+    
+    await invalidate_group_settings(update.effective_chat.id)
+    await update.message.reply_text(responses.FLOOD_UPDATED.format(
+        messages=limits[0] or FLOOD_MAX_MESSAGES,
+        window=limits[1] or int(FLOOD_WINDOW),
+        duplicates=limits[2] or FLOOD_MAX_DUPLICATES
+    ))
 
 
 def register_automod_handlers(application) -> None:
     """Registra handlers de AutoMod"""
-    application.add_handler(
-        MessageHandler(
-            filters.TEXT & ~filters.COMMAND,
-            check_automod
-        ),
-        group=0
-    )
+    application.add_handler(CommandHandler("proibir", ban_word_command))
+    application.add_handler(CommandHandler("desproibir", unban_word_command))
+    application.add_handler(CommandHandler("proibirdominio", ban_domain_command))
+    application.add_handler(CommandHandler("desproibirdominio", unban_domain_command))
+    application.add_handler(CommandHandler("filtros", filters_command))
+    application.add_handler(CommandHandler("antiflood", antiflood_command))
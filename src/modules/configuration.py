@@ -9,6 +9,7 @@ from src.utils.permissions import is_admin
 from src.utils.responses import responses
 from src.database.db import db
 from src.database.models import Group
+from src.utils.group_settings import invalidate_group_settings
 
 
 async def config_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -121,6 +122,7 @@ async def config_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 group.automod_enabled = enabled
                 await session.commit()
                 break
+            await invalidate_group_settings(query.message.chat.id)
         
         status = "habilitado" if enabled else "desabilitado"
         await query.message.edit_text(f"AutoMod {status} com êxito.")
@@ -138,6 +140,7 @@ async def config_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 group.filter_links = enabled
                 await session.commit()
                 break
+            await invalidate_group_settings(query.message.chat.id)
         
         status = "habilitado" if enabled else "desabilitado"
         await query.message.edit_text(f"Filtro de links {status} com êxito.")
@@ -155,6 +158,7 @@ async def config_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 group.filter_spam = enabled
                 await session.commit()
                 break
+            await invalidate_group_settings(query.message.chat.id)
         
         status = "habilitado" if enabled else "desabilitado"
         await query.message.edit_text(f"Filtro de spam {status} com êxito.")
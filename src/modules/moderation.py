@@ -5,10 +5,12 @@ import asyncio
 import re
 from datetime import datetime, timedelta
 from telegram import Update, ChatPermissions
-from telegram.ext import ContextTypes, CommandHandler
+from telegram.ext import ContextTypes, CommandHandler, ChatMemberHandler
 from telegram.error import TelegramError
 
-from src.utils.permissions import is_admin, bot_can_restrict, bot_can_delete, get_user_from_message
+from src.utils.permissions import (
+    is_admin, bot_can_restrict, bot_can_delete, get_user_from_message, track_admin_changes
+)
 from src.utils.responses import responses
 from src.database.db import db
 
@@ -421,3 +423,9 @@ def register_moderation_handlers(application) -> None:
     application.add_handler(CommandHandler("unban", unban_command))
     application.add_handler(CommandHandler("nuke", nuke_command))
     application.add_handler(CommandHandler("purge", purge_command))
+    
+    # Promoções/rebaixamentos invalidam o cache de administradores (grupo próprio: sempre executa)
+    application.add_handler(
+        ChatMemberHandler(track_admin_changes, ChatMemberHandler.ANY_CHAT_MEMBER),
+        group=-1
+    )
@@ -0,0 +1,104 @@
+"""
+Pipeline único de mensagens de texto
+Um só handler por mensagem: carrega o contexto uma vez e executa, em ordem,
+AutoMod, rank e comandos de ponto, medindo o tempo de cada etapa
+"""
+import logging
+import time
+from typing import Any, Dict
+from telegram import Update
+from telegram.ext import ContextTypes, MessageHandler, filters
+
+from src.modules.automod import check_automod
+from src.modules.rank import track_messages
+from src.utils.message_context import MessageContext
+from src.utils.dot_commands import dot_commands
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("context", "automod", "rank", "dot_commands")
+
+
+class PipelineStats:
+    """Tempo acumulado e máximo por etapa do pipeline"""
+
+    def __init__(self):
+        self.messages = 0
+        self.stopped = 0
+        self.errors = 0
+        self._stages: Dict[str, Dict[str, float]] = {
+            stage: {"calls": 0, "total_ms": 0.0, "max_ms": 0.0} for stage in STAGES
+        }
+
+    def record(self, stage: str, started: float) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timing = self._stages[stage]
+        timing["calls"] += 1
+        timing["total_ms"] += elapsed_ms
+        timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Chamadas, média e máximo (ms) por etapa"""
+        return {
+            "messages": self.messages,
+            "stopped_by_automod": self.stopped,
+            "errors": self.errors,
+            "stages": {
+                stage: {
+                    "calls": timing["calls"],
+                    "avg_ms": round(timing["total_ms"] / timing["calls"], 3) if timing["calls"] else 0.0,
+                    "max_ms": round(timing["max_ms"], 3)
+                }
+                for stage, timing in self._stages.items()
+            }
+        }
+
+
+# Instância global das métricas do pipeline
+pipeline_stats = PipelineStats()
+
+
+async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Processa uma mensagem de texto por todas as etapas"""
+    if not update.message or not update.effective_chat or not update.effective_user:
+        return
+
+    pipeline_stats.messages += 1
+
+    started = time.perf_counter()
+    message = await MessageContext.load(update)
+    pipeline_stats.record("context", started)
+
+    # AutoMod primeiro: mensagem removida não conta no rank nem executa comandos
+    started = time.perf_counter()
+    try:
+        removed = await check_automod(update, context, message)
+    except Exception as e:
+        pipeline_stats.errors += 1
+        logger.error(f"Erro no AutoMod: {e}")
+        removed = False
+    pipeline_stats.record("automod", started)
+    if removed:
+        pipeline_stats.stopped += 1
+        return
+
+    started = time.perf_counter()
+    track_messages(message)
+    pipeline_stats.record("rank", started)
+
+    # Só mensagens iniciadas por ponto podem ser comandos
+    if message.text.startswith("."):
+        started = time.perf_counter()
+        await dot_commands.dispatch(update, context, message.text)
+        pipeline_stats.record("dot_commands", started)
+
+
+def register_pipeline_handlers(application) -> None:
+    """Registra o handler único de mensagens de texto"""
+    application.add_handler(
+        MessageHandler(
+            filters.TEXT & ~filters.COMMAND,
+            process_message
+        ),
+        group=0
+    )
@@ -2,40 +2,28 @@
 Módulo de sistema de rank
 """
 from telegram import Update
-from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters
+from telegram.ext import ContextTypes, CommandHandler
 
+from src.config import TOP_PAGE_SIZE
 from src.database.db import db
+from src.database.message_counter import message_counter
 from src.utils.responses import responses
+from src.utils.message_context import MessageContext
 
 
-async def track_messages(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Rastreia mensagens para o sistema de rank"""
-    if not update.message or not update.effective_chat or not update.effective_user:
-        return
-    
-    # Não conta comandos
-    if update.message.text and update.message.text.startswith('/'):
-        return
-    
-    user = update.effective_user
-    chat = update.effective_chat
+def track_messages(message: MessageContext) -> None:
+    """Etapa de rank do pipeline: conta a mensagem"""
+    user = message.user
     
-    # Salva usuário e incrementa contador
-    async for session in db.get_session():
-        await db.get_or_create_user(
-            session, 
-            user.id, 
-            user.username, 
-            user.first_name,
-            user.last_name
-        )
-        await db.get_or_create_group(
-            session,
-            chat.id,
-            chat.title or "Unknown"
-        )
-        await db.increment_message_count(session, user.id, chat.id)
-        break
+    # Incrementa em memória; o contador grava usuário, grupo e contagem em lote
+    message_counter.record(
+        message.chat_id,
+        message.chat_title,
+        user.id,
+        user.username,
+        user.first_name,
+        user.last_name
+    )
 
 
 async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -58,13 +46,37 @@ async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         break
 
 
+async def top_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comando /top [página] - Mostra o ranking de mensagens do grupo, paginado"""
+    if not update.message or not update.effective_chat:
+        return
+    
+    page = 1
+    if context.args and context.args[0].isdigit():
+        page = max(1, int(context.args[0]))
+    
+    chat_id = update.effective_chat.id
+    
+    async for session in db.get_session():
+        rows, total = await db.get_leaderboard(
+            session, chat_id, TOP_PAGE_SIZE, (page - 1) * TOP_PAGE_SIZE
+        )
+        
+        if not rows:
+            await update.message.reply_text(responses.TOP_EMPTY)
+            break
+        
+        pages = (total + TOP_PAGE_SIZE - 1) // TOP_PAGE_SIZE
+        text = responses.TOP_HEADER.format(page=page, pages=pages)
+        for position, _, first_name, username, count in rows:
+            name = first_name + (f" (@{username})" if username else "")
+            text += responses.TOP_ENTRY.format(position=position, name=name, count=count)
+        
+        await update.message.reply_text(text)
+        break
+
+
 def register_rank_handlers(application) -> None:
     """Registra handlers de rank"""
     application.add_handler(CommandHandler("rank", rank_command))
-    application.add_handler(
-        MessageHandler(
-            filters.TEXT & ~filters.COMMAND,
-            track_messages
-        ),
-        group=1
-    )
+    application.add_handler(CommandHandler("top", top_command))
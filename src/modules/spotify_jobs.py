@@ -0,0 +1,282 @@
+"""
+Tarefas periódicas do Spotify executadas pelo JobQueue (APScheduler)
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from telegram.ext import Application, ContextTypes
+from sqlalchemy import select, or_
+
+from src.config import (
+    TOKEN_REFRESH_INTERVAL,
+    TOKEN_REFRESH_AHEAD_MINUTES,
+    TOKEN_ACTIVE_WINDOW_HOURS,
+    TOKEN_REFRESH_CONCURRENCY,
+    SCROBBLE_ENABLED,
+    SCROBBLE_TICK_INTERVAL,
+    SCROBBLE_BATCH_SIZE,
+    SCROBBLE_CONCURRENCY,
+    SCROBBLE_MIN_INTERVAL,
+    SCROBBLE_MAX_INTERVAL
+)
+from src.database.db import db
+from src.database.models import SpotifyAccount, ScrobbleCursor, GroupUser
+from src.database.plays import record_plays, dialect_insert, play_started_at, parse_played_at
+from src.utils.spotify_client import spotify_client, SPOTIFY_API_URL
+from src.utils.rate_limit import spotify_governor
+from src.utils.spotify_tokens import token_cache, TOKEN_EXPIRY_MARGIN
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo da lista de IDs em cada consulta IN
+QUERY_BATCH_SIZE = 500
+
+# Máximo de itens por chamada ao recently-played (limite da API)
+RECENTLY_PLAYED_LIMIT = 50
+
+# Validade dos tokens de acesso do Spotify: uma renovação por conta a cada hora
+TOKEN_LIFETIME_SECONDS = 3600
+
+# Contadores da coleta automática (expostos em /metrics)
+scrobble_stats: Dict[str, int] = {
+    "runs": 0,
+    "accounts_polled": 0,
+    "plays_recorded": 0,
+    "errors": 0,
+    "deferred": 0,
+    # Coletas que voltaram com o limite de itens: reproduções anteriores podem ter ficado de fora
+    "truncated": 0,
+    # Ciclos em que havia mais contas vencidas do que o orçamento permitia
+    "full_batches": 0,
+    "last_batch_size": 0,
+    "capacity_active_accounts": 0
+}
+
+
+def scrobble_capacity() -> int:
+    """Contas ouvindo que a fatia "scrobble" atende no intervalo mínimo (coleta + renovação do token)"""
+    per_account_hour = 3600 / SCROBBLE_MIN_INTERVAL + 3600 / TOKEN_LIFETIME_SECONDS
+    return int(spotify_governor.budget("scrobble", 3600) / per_account_hour)
+
+
+async def refresh_expiring_tokens(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Renova antecipadamente os tokens de usuários ativos que estão para expirar"""
+    active_users = token_cache.active_users(timedelta(hours=TOKEN_ACTIVE_WINDOW_HOURS))
+    if not active_users:
+        return
+
+    ahead = timedelta(minutes=TOKEN_REFRESH_AHEAD_MINUTES)
+    expiring_before = datetime.utcnow() + ahead
+
+    expiring = []
+    try:
+        async with db.session_maker() as session:
+            for i in range(0, len(active_users), QUERY_BATCH_SIZE):
+                batch = active_users[i:i + QUERY_BATCH_SIZE]
+                stmt = select(SpotifyAccount.user_id).where(
+                    SpotifyAccount.user_id.in_(batch),
+                    SpotifyAccount.token_expires_at < expiring_before
+                )
+                result = await session.execute(stmt)
+                expiring.extend(row[0] for row in result.all())
+    except Exception as e:
+        logger.error(f"Erro ao buscar tokens a expirar: {e}")
+        return
+
+    if not expiring:
+        return
+
+    # O endpoint de token também passa pelo governador de taxa do cliente Spotify
+    semaphore = asyncio.Semaphore(TOKEN_REFRESH_CONCURRENCY)
+
+    async def refresh(user_id: int) -> bool:
+        async with semaphore:
+            try:
+                return await token_cache.refresh_ahead(user_id, ahead) is not None
+            except Exception as e:
+                logger.error(f"Erro ao renovar token antecipadamente para user {user_id}: {e}")
+                return False
+
+    results = await asyncio.gather(*(refresh(user_id) for user_id in expiring))
+    logger.info(f"Tokens renovados antecipadamente: {sum(results)}/{len(expiring)}")
+
+
+def _next_interval(current: int, found_plays: bool) -> int:
+    """Intervalo adaptativo: mínimo enquanto há reproduções, dobra quando não há"""
+    if found_plays:
+        return SCROBBLE_MIN_INTERVAL
+    return min(max(current * 2, SCROBBLE_MIN_INTERVAL), SCROBBLE_MAX_INTERVAL)
+
+
+async def scrobble_account(user_id: int, after_ms: int, interval: int) -> int:
+    """Coleta as reproduções novas de uma conta e avança o cursor; retorna quantas foram gravadas"""
+    recorded = 0
+    # A renovação do token, se houver, também sai da fatia reservada à coleta
+    token = await token_cache.get_token(user_id, touch=False, endpoint="scrobble")
+
+    if not token:
+        next_interval = SCROBBLE_MAX_INTERVAL
+    else:
+        status, data = await spotify_client.get(
+            f"{SPOTIFY_API_URL}/me/player/recently-played",
+            token,
+            params={"limit": RECENTLY_PLAYED_LIMIT, "after": after_ms},
+            endpoint="scrobble",
+            # Em segundo plano dá para esperar a vez por até um ciclo inteiro
+            queue_timeout=SCROBBLE_TICK_INTERVAL
+        )
+        if status == 429:
+            # Sem vaga no orçamento (o cliente já respeitou o Retry-After): mantém o
+            # intervalo da conta, sem encurtar o backoff nem avançar o cursor
+            scrobble_stats["deferred"] += 1
+            next_interval = max(interval, SCROBBLE_MIN_INTERVAL)
+        elif status != 200:
+            scrobble_stats["errors"] += 1
+            next_interval = SCROBBLE_MAX_INTERVAL
+        else:
+            items: List[Tuple[Dict[str, Any], datetime]] = [
+                # played_at do Spotify é o fim da reprodução; a chave usa o início
+                (item["track"], play_started_at(parse_played_at(item["played_at"]), item["track"].get("duration_ms", 0)))
+                for item in data.get("items", [])
+                if item.get("track") and item["track"].get("id")
+            ]
+            if len(data.get("items", [])) >= RECENTLY_PLAYED_LIMIT:
+                scrobble_stats["truncated"] += 1
+                logger.warning(
+                    f"Coleta do user {user_id} voltou com {RECENTLY_PLAYED_LIMIT} itens: "
+                    f"reproduções anteriores podem ter sido perdidas (contas demais para a fatia?)"
+                )
+            cursors = data.get("cursors") or {}
+            after_ms = int(cursors.get("after") or after_ms)
+
+            async with db.session_maker() as session:
+                if items:
+                    result = await session.execute(
+                        select(GroupUser.group_id).where(GroupUser.user_id == user_id).distinct()
+                    )
+                    group_ids = list(result.scalars().all())
+                    recorded = await record_plays(session, user_id, group_ids, items)
+                    await session.commit()
+
+            next_interval = _next_interval(interval, bool(items))
+
+    # Jitter evita que contas agendadas juntas voltem todas no mesmo ciclo
+    next_poll_at = datetime.utcnow() + timedelta(seconds=next_interval * random.uniform(1.0, 1.1))
+    async with db.session_maker() as session:
+        stmt = dialect_insert(session, ScrobbleCursor).values(
+            user_id=user_id,
+            after_ms=after_ms,
+            next_poll_at=next_poll_at,
+            interval_seconds=next_interval,
+            last_play_at=datetime.utcnow() if recorded else None,
+            updated_at=datetime.utcnow()
+        )
+        set_ = {
+            "after_ms": stmt.excluded.after_ms,
+            "next_poll_at": stmt.excluded.next_poll_at,
+            "interval_seconds": stmt.excluded.interval_seconds,
+            "updated_at": stmt.excluded.updated_at
+        }
+        if recorded:
+            set_["last_play_at"] = stmt.excluded.last_play_at
+        await session.execute(stmt.on_conflict_do_update(index_elements=["user_id"], set_=set_))
+        await session.commit()
+
+    return recorded
+
+
+async def scrobble_recent_plays(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Coleta as reproduções das contas cujo próximo horário de coleta já chegou"""
+    now = datetime.utcnow()
+    # Cada conta custa uma chamada (duas se o token precisar ser renovado): o lote
+    # cabe no que a fatia reservada permite por ciclo
+    budget = spotify_governor.budget("scrobble", SCROBBLE_TICK_INTERVAL)
+    limit = min(SCROBBLE_BATCH_SIZE, budget)
+    try:
+        async with db.session_maker() as session:
+            stmt = select(
+                SpotifyAccount.user_id,
+                SpotifyAccount.created_at,
+                ScrobbleCursor.after_ms,
+                ScrobbleCursor.interval_seconds,
+                SpotifyAccount.token_expires_at
+            ).outerjoin(
+                ScrobbleCursor, ScrobbleCursor.user_id == SpotifyAccount.user_id
+            ).where(
+                or_(ScrobbleCursor.user_id.is_(None), ScrobbleCursor.next_poll_at <= now)
+            ).order_by(
+                ScrobbleCursor.next_poll_at.nulls_first()
+            ).limit(limit)
+            result = await session.execute(stmt)
+            candidates = result.all()
+    except Exception as e:
+        logger.error(f"Erro ao buscar contas para coleta de reproduções: {e}")
+        return
+
+    refresh_before = now + TOKEN_EXPIRY_MARGIN + timedelta(seconds=SCROBBLE_TICK_INTERVAL)
+    due = []
+    cost = 0
+    for user_id, created_at, after_ms, interval, expires_at in candidates:
+        account_cost = 2 if expires_at is None or expires_at < refresh_before else 1
+        if cost + account_cost > budget:
+            break
+        cost += account_cost
+        due.append((user_id, created_at, after_ms, interval))
+
+    if len(candidates) == limit or len(due) < len(candidates):
+        # As que ficaram de fora voltam no próximo ciclo, com atraso
+        scrobble_stats["full_batches"] += 1
+
+    scrobble_stats["runs"] += 1
+    scrobble_stats["last_batch_size"] = len(due)
+    if not due:
+        return
+
+    semaphore = asyncio.Semaphore(SCROBBLE_CONCURRENCY)
+
+    async def poll(user_id: int, created_at: datetime, after_ms: int, interval: int) -> int:
+        async with semaphore:
+            if after_ms is None:
+                # Primeira coleta: começa no momento em que a conta foi conectada
+                after_ms = int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            try:
+                return await scrobble_account(user_id, after_ms, interval or 0)
+            except Exception as e:
+                scrobble_stats["errors"] += 1
+                logger.error(f"Erro ao coletar reproduções do user {user_id}: {e}")
+                return 0
+            finally:
+                scrobble_stats["accounts_polled"] += 1
+
+    results = await asyncio.gather(*(poll(*row) for row in due))
+    scrobble_stats["plays_recorded"] += sum(results)
+    logger.info(f"Coleta de reproduções: {len(due)} contas, {sum(results)} reproduções novas")
+
+
+def register_spotify_jobs(application: Application) -> None:
+    """Registra as tarefas periódicas do Spotify"""
+    if application.job_queue is None:
+        logger.warning("JobQueue indisponível (instale python-telegram-bot[job-queue]); tarefas do Spotify desativadas")
+        return
+
+    application.job_queue.run_repeating(
+        refresh_expiring_tokens,
+        interval=TOKEN_REFRESH_INTERVAL,
+        first=TOKEN_REFRESH_INTERVAL,
+        name="spotify_token_refresh"
+    )
+
+    if SCROBBLE_ENABLED:
+        scrobble_stats["capacity_active_accounts"] = scrobble_capacity()
+        logger.info(
+            f"Coleta de reproduções: fatia de {spotify_governor.budget('scrobble', 3600)} requisições/h, "
+            f"~{scrobble_stats['capacity_active_accounts']} contas ouvindo no intervalo de {SCROBBLE_MIN_INTERVAL}s"
+        )
+        application.job_queue.run_repeating(
+            scrobble_recent_plays,
+            interval=SCROBBLE_TICK_INTERVAL,
+            first=SCROBBLE_TICK_INTERVAL,
+            name="spotify_scrobbler"
+        )
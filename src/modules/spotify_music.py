@@ -3,65 +3,67 @@ Módulo Spotify - fui desenvolvido por: @vgsswon com propósito de interação c
 Mostra músicas que usuários estão ouvindo, estatísticas e permite pesquisas
 COM AUTENTICAÇÃO POR USUÁRIO
 """
+import asyncio
 import logging
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
-import aiohttp
+from typing import Optional, Dict, Any, List, Tuple
 from telegram import Update
 from telegram.ext import (
     Application,
     CommandHandler,
-    MessageHandler,
-    ContextTypes,
-    filters
+    ContextTypes
 )
 from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.db import db
-from src.database.models import SpotifyTrack, SpotifyAccount, User, Group, UserFriend, ArtistCrown
-from src.config import SPOTIFY_REDIRECT_URI
+from src.database.models import (
+    SpotifyAccount, User, UserFriend, ArtistCrown, Artist, ArtistAlias, GroupArtistPlays
+)
+from src.database.write_buffer import play_write_buffer
+from src.database.plays import resolve_artist, normalize_artist_name, dialect_insert, play_started_at, parse_played_at
+from src.config import (
+    SPOTIFY_REDIRECT_URI,
+    NOW_PLAYING_CACHE_TTL,
+    NOW_PLAYING_CACHE_SIZE,
+    FRIENDS_PAGE_SIZE,
+    FRIENDS_CONCURRENCY,
+    FRIENDS_DEADLINE,
+    ARTIST_RESOLVE_CACHE_TTL,
+    ARTIST_RESOLVE_CACHE_SIZE
+)
+from src.utils.spotify_client import spotify_client, SpotifyAPIError, SPOTIFY_API_URL
+from src.utils.cache import TTLCache
+from src.utils.spotify_tokens import token_cache, get_app_token
+from src.utils.dot_commands import dot_commands
 
 logger = logging.getLogger(__name__)
 
+# Cache curto de "tocando agora": vários .fm/.friends seguidos compartilham a mesma chamada
+now_playing_cache = TTLCache(NOW_PLAYING_CACHE_TTL, NOW_PLAYING_CACHE_SIZE)
+
+# Consultas de .whoknows já resolvidas: consulta normalizada -> (IDs de artista, nome canônico)
+artist_resolve_cache = TTLCache(ARTIST_RESOLVE_CACHE_TTL, ARTIST_RESOLVE_CACHE_SIZE)
+
 
-async def save_track_to_db(user_id: int, group_id: int, track_data: Dict[str, Any], user_data: Optional[Dict[str, Any]] = None, chat_title: Optional[str] = None) -> None:
-    """Salva uma música tocada no banco de dados"""
+async def save_track_to_db(user_id: int, group_id: int, track_data: Dict[str, Any], user_data: Optional[Dict[str, Any]] = None, chat_title: Optional[str] = None, played_at: Optional[datetime] = None) -> None:
+    """Enfileira uma música tocada para gravação em lote no banco de dados
+    
+    played_at é o início da reprodução; a mesma reprodução salva de novo é ignorada.
+    Arquivos locais não têm ID no Spotify e não entram no histórico.
+    """
+    if track_data.get('is_local') or not track_data.get('id'):
+        return
+    
     try:
-        track = track_data
-        track_id = track['id']
-        track_name = track['name']
-        artists = ", ".join([artist['name'] for artist in track['artists']])
-        album_name = track['album']['name']
-        album_image = track['album']['images'][0]['url'] if track['album']['images'] else None
-        spotify_url = track['external_urls']['spotify']
-        
-        async with db.session_maker() as session:
-            if user_data:
-                await session.merge(User(
-                    id=user_id,
-                    first_name=user_data.get('first_name', 'Unknown'),
-                    last_name=user_data.get('last_name'),
-                    username=user_data.get('username')
-                ))
-            else:
-                await session.merge(User(id=user_id, first_name="Unknown", username=None))
-            
-            await session.merge(Group(id=group_id, title=chat_title or "Unknown"))
-            
-            spotify_track = SpotifyTrack(
-                user_id=user_id,
-                group_id=group_id,
-                track_id=track_id,
-                track_name=track_name,
-                artist_name=artists,
-                album_name=album_name,
-                album_image_url=album_image,
-                spotify_url=spotify_url
-            )
-            
-            session.add(spotify_track)
-            await session.commit()
-            
+        await play_write_buffer.submit(
+            user_id,
+            group_id,
+            track_data,
+            played_at or play_started_at(datetime.utcnow(), 0),
+            user_data or {},
+            chat_title
+        )
     except Exception as e:
         logger.error(f"Erro ao salvar música no banco: {e}")
 
@@ -69,62 +71,50 @@ async def save_track_to_db(user_id: int, group_id: int, track_data: Dict[str, An
 async def get_user_spotify_token(user_id: int) -> Optional[str]:
     """Obtém o token de acesso do Spotify para um usuário específico (com refresh automático)"""
     try:
-        async with db.session_maker() as session:
-            stmt = select(SpotifyAccount).where(SpotifyAccount.user_id == user_id)
-            result = await session.execute(stmt)
-            account = result.scalar_one_or_none()
-            
-            if not account:
-                return None
-            
-            if datetime.utcnow() < account.token_expires_at:
-                return account.access_token
-            
-            from src.oauth_server import refresh_user_token
-            return await refresh_user_token(user_id)
+        return await token_cache.get_token(user_id)
     except Exception as e:
         logger.error(f"Erro ao obter token do usuário: {e}")
         return None
 
 
-async def get_current_playing(access_token: str) -> Optional[Dict[str, Any]]:
-    """Obtém a música que está tocando atualmente"""
+async def _fetch_current_playing(access_token: str) -> Optional[Dict[str, Any]]:
+    url = f"{SPOTIFY_API_URL}/me/player/currently-playing"
+    status, data = await spotify_client.get(url, access_token)
+    
+    if status == 200:
+        # progress_ms vale para o momento da consulta, não para quando o cache é lido
+        data['fetched_at'] = datetime.utcnow()
+        return data
+    elif status == 204:
+        return None
+    raise SpotifyAPIError(status)
+
+
+async def get_current_playing(access_token: str, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Obtém a música que está tocando atualmente (com cache curto por usuário)"""
     try:
-        url = "https://api.spotify.com/v1/me/player/currently-playing"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 204:
-                    return None
-                else:
-                    logger.error(f"Erro ao buscar música atual: {response.status}")
-                    return None
+        key = ("current", user_id or access_token)
+        return await now_playing_cache.get_or_load(key, lambda: _fetch_current_playing(access_token))
                     
     except Exception as e:
         logger.error(f"Erro ao buscar música atual: {e}")
         return None
 
 
-async def get_recently_played(access_token: str, limit: int = 10) -> Optional[Dict[str, Any]]:
-    """Obtém as músicas tocadas recentemente"""
+async def _fetch_recently_played(access_token: str, limit: int) -> Optional[Dict[str, Any]]:
+    url = f"{SPOTIFY_API_URL}/me/player/recently-played"
+    status, data = await spotify_client.get(url, access_token, params={"limit": limit})
+    
+    if status == 200:
+        return data
+    raise SpotifyAPIError(status)
+
+
+async def get_recently_played(access_token: str, limit: int = 10, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Obtém as músicas tocadas recentemente (com cache curto por usuário)"""
     try:
-        url = f"https://api.spotify.com/v1/me/player/recently-played?limit={limit}"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao buscar músicas recentes: {response.status}")
-                    return None
+        key = ("recent", user_id or access_token, limit)
+        return await now_playing_cache.get_or_load(key, lambda: _fetch_recently_played(access_token, limit))
                     
     except Exception as e:
         logger.error(f"Erro ao buscar músicas recentes: {e}")
@@ -134,23 +124,19 @@ async def get_recently_played(access_token: str, limit: int = 10) -> Optional[Di
 async def search_track(access_token: str, query: str) -> Optional[Dict[str, Any]]:
     """Pesquisa por uma música"""
     try:
-        url = "https://api.spotify.com/v1/search"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
+        url = f"{SPOTIFY_API_URL}/search"
         params = {
             "q": query,
             "type": "track",
             "limit": 5
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao pesquisar música: {response.status}")
-                    return None
+        status, data = await spotify_client.get(url, access_token, params=params)
+        if status == 200:
+            return data
+        else:
+            logger.error(f"Erro ao pesquisar música: {status}")
+            return None
                     
     except Exception as e:
         logger.error(f"Erro ao pesquisar música: {e}")
@@ -160,23 +146,19 @@ async def search_track(access_token: str, query: str) -> Optional[Dict[str, Any]
 async def search_artist(access_token: str, query: str) -> Optional[Dict[str, Any]]:
     """Pesquisa por um artista"""
     try:
-        url = "https://api.spotify.com/v1/search"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
+        url = f"{SPOTIFY_API_URL}/search"
         params = {
             "q": query,
             "type": "artist",
             "limit": 5
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao pesquisar artista: {response.status}")
-                    return None
+        status, data = await spotify_client.get(url, access_token, params=params)
+        if status == 200:
+            return data
+        else:
+            logger.error(f"Erro ao pesquisar artista: {status}")
+            return None
                     
     except Exception as e:
         logger.error(f"Erro ao pesquisar artista: {e}")
@@ -186,23 +168,19 @@ async def search_artist(access_token: str, query: str) -> Optional[Dict[str, Any
 async def search_album(access_token: str, query: str) -> Optional[Dict[str, Any]]:
     """Pesquisa por um álbum"""
     try:
-        url = "https://api.spotify.com/v1/search"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
+        url = f"{SPOTIFY_API_URL}/search"
         params = {
             "q": query,
             "type": "album",
             "limit": 5
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao pesquisar álbum: {response.status}")
-                    return None
+        status, data = await spotify_client.get(url, access_token, params=params)
+        if status == 200:
+            return data
+        else:
+            logger.error(f"Erro ao pesquisar álbum: {status}")
+            return None
                     
     except Exception as e:
         logger.error(f"Erro ao pesquisar álbum: {e}")
@@ -212,18 +190,15 @@ async def search_album(access_token: str, query: str) -> Optional[Dict[str, Any]
 async def get_user_top_tracks(access_token: str, time_range: str = "medium_term", limit: int = 10) -> Optional[Dict[str, Any]]:
     """Obtém as músicas mais ouvidas do usuário"""
     try:
-        url = f"https://api.spotify.com/v1/me/top/tracks?time_range={time_range}&limit={limit}"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
+        url = f"{SPOTIFY_API_URL}/me/top/tracks"
+        params = {"time_range": time_range, "limit": limit}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao buscar top músicas: {response.status}")
-                    return None
+        status, data = await spotify_client.get(url, access_token, params=params)
+        if status == 200:
+            return data
+        else:
+            logger.error(f"Erro ao buscar top músicas: {status}")
+            return None
                     
     except Exception as e:
         logger.error(f"Erro ao buscar top músicas: {e}")
@@ -233,18 +208,15 @@ async def get_user_top_tracks(access_token: str, time_range: str = "medium_term"
 async def get_user_top_artists(access_token: str, time_range: str = "medium_term", limit: int = 10) -> Optional[Dict[str, Any]]:
     """Obtém os artistas mais ouvidos do usuário"""
     try:
-        url = f"https://api.spotify.com/v1/me/top/artists?time_range={time_range}&limit={limit}"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
+        url = f"{SPOTIFY_API_URL}/me/top/artists"
+        params = {"time_range": time_range, "limit": limit}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Erro ao buscar top artistas: {response.status}")
-                    return None
+        status, data = await spotify_client.get(url, access_token, params=params)
+        if status == 200:
+            return data
+        else:
+            logger.error(f"Erro ao buscar top artistas: {status}")
+            return None
                     
     except Exception as e:
         logger.error(f"Erro ao buscar top artistas: {e}")
@@ -358,6 +330,7 @@ async def disconnect_spotify_command(update: Update, context: ContextTypes.DEFAU
             stmt = delete(SpotifyAccount).where(SpotifyAccount.user_id == user_id)
             result = await session.execute(stmt)
             await session.commit()
+            await token_cache.invalidate(user_id)
             
             if result.rowcount > 0:
                 await update.message.reply_text(
@@ -389,19 +362,26 @@ async def fm_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
     
-    current = await get_current_playing(access_token)
+    current = await get_current_playing(access_token, user_id)
     
     if not current or not current.get('item'):
-        recent = await get_recently_played(access_token, limit=1)
+        recent = await get_recently_played(access_token, limit=1, user_id=user_id)
         if recent and recent.get('items'):
             track = recent['items'][0]['track']
             is_recent = True
+            # No recently-played, played_at marca o fim da reprodução
+            played_at = play_started_at(
+                parse_played_at(recent['items'][0]['played_at']), track.get('duration_ms', 0)
+            )
         else:
             await update.message.reply_text("🎵 Você não está ouvindo nada no Spotify no momento.")
             return
     else:
         track = current['item']
         is_recent = False
+        played_at = play_started_at(
+            current.get('fetched_at') or datetime.utcnow(), current.get('progress_ms') or 0
+        )
     
     group_id = update.message.chat.id
     
@@ -412,13 +392,14 @@ async def fm_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     }
     chat_title = update.message.chat.title
     
-    await save_track_to_db(user_id, group_id, track, user_data, chat_title)
+    await save_track_to_db(user_id, group_id, track, user_data, chat_title, played_at)
     
     track_name = track['name']
     artists = ", ".join([artist['name'] for artist in track['artists']])
     album_name = track['album']['name']
-    album_image = track['album']['images'][0]['url'] if track['album']['images'] else None
-    track_url = track['external_urls']['spotify']
+    album_image = track['album']['images'][0]['url'] if track['album'].get('images') else None
+    # Arquivos locais não têm página no Spotify
+    track_url = track.get('external_urls', {}).get('spotify')
     
     user_name = update.message.from_user.first_name
     status = f"🎵 {user_name} ouviu recentemente:" if is_recent else f"🎵 {user_name} está ouvindo agora:"
@@ -427,9 +408,10 @@ async def fm_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         f"{status}\n\n"
         f"🎼 **{track_name}**\n"
         f"👤 {artists}\n"
-        f"💿 {album_name}\n\n"
-        f"[Abrir no Spotify]({track_url})"
+        f"💿 {album_name}"
     )
+    if track_url:
+        caption += f"\n\n[Abrir no Spotify]({track_url})"
     
     if album_image:
         await update.message.reply_photo(
@@ -652,7 +634,7 @@ async def plays_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         return
     
-    recent = await get_recently_played(access_token, limit=10)
+    recent = await get_recently_played(access_token, limit=10, user_id=user_id)
     
     if not recent or not recent.get('items'):
         await update.message.reply_text("🎵 Você não tem histórico de reproduções recentes.")
@@ -731,39 +713,61 @@ async def chart_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await update.message.reply_text(text, parse_mode='Markdown')
 
 
-async def dot_fm_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .fm"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.fm'):
-        await fm_command(update, context)
-
-
-async def dot_w_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .w"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.w'):
-        await weekly_command(update, context)
-
-
-async def dot_profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .profile"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.profile'):
-        await profile_command(update, context)
-
-
-async def dot_plays_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .plays"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.plays'):
-        await plays_command(update, context)
-
-
-async def dot_chart_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .chart"""
-    if update.message and update.message.text:
-        text = update.message.text.strip()
-        if text.startswith('.chart'):
-            parts = text.split()
-            if len(parts) > 1:
-                context.args = parts[1:]
-            await chart_command(update, context)
+async def resolve_artist_query(session: AsyncSession, query: str) -> Optional[Tuple[List[int], str]]:
+    """Resolve o texto do .whoknows para IDs internos de artista e o nome canônico
+    
+    Ordem: cache em memória, tabela de aliases, nome normalizado exato e, por fim,
+    a busca do Spotify. Só um resultado com o nome exato é salvo como alias; o
+    primeiro resultado da busca vale apenas para esta consulta.
+    """
+    alias = normalize_artist_name(query)
+    if not alias:
+        return None
+    
+    found, cached = artist_resolve_cache.lookup(alias)
+    if found:
+        return cached
+    
+    result = await session.execute(
+        select(Artist.id, Artist.name)
+        .join(ArtistAlias, ArtistAlias.artist_id == Artist.id)
+        .where(ArtistAlias.alias == alias)
+    )
+    row = result.first()
+    exact = row is not None
+    
+    if not row:
+        result = await session.execute(
+            select(Artist.id, Artist.name).where(Artist.name_normalized == alias).limit(1)
+        )
+        row = result.first()
+        exact = row is not None
+    
+    if not row:
+        app_token = await get_app_token()
+        results = await search_artist(app_token, query) if app_token else None
+        items = (results or {}).get('artists', {}).get('items', [])
+        if not items:
+            return None
+        
+        best = next((item for item in items if normalize_artist_name(item['name']) == alias), None)
+        exact = best is not None
+        best = best or items[0]
+        artist_id = await resolve_artist(session, best['id'], best['name'])
+        row = (artist_id, best['name'])
+    
+    canonical_id, canonical_name = row
+    # Contagem só pelo artista resolvido: homônimos têm IDs diferentes
+    resolved = ([canonical_id], canonical_name)
+    if exact:
+        await session.execute(
+            dialect_insert(session, ArtistAlias)
+            .values(alias=alias, artist_id=canonical_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing()
+        )
+        artist_resolve_cache.set(alias, resolved)
+    await session.commit()
+    return resolved
 
 
 async def whoknows_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -780,22 +784,31 @@ async def whoknows_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     try:
         async with db.session_maker() as session:
+            resolved = await resolve_artist_query(session, artist_query)
+            if not resolved:
+                await update.message.reply_text(f"❌ Artista não encontrado: {artist_query}")
+                return
+            
+            artist_ids, artist_name = resolved
+            
+            # Leitura top-N do agregado mantido a cada play (sem varrer o histórico)
+            play_count = func.sum(GroupArtistPlays.play_count)
             stmt = select(
-                SpotifyTrack.user_id,
+                GroupArtistPlays.user_id,
                 User.first_name,
                 User.username,
-                func.count(SpotifyTrack.id).label('play_count')
+                play_count.label('play_count')
             ).join(
-                User, SpotifyTrack.user_id == User.id
+                User, GroupArtistPlays.user_id == User.id
             ).where(
-                SpotifyTrack.group_id == group_id,
-                SpotifyTrack.artist_name.ilike(f"%{artist_query}%")
+                GroupArtistPlays.group_id == group_id,
+                GroupArtistPlays.artist_id.in_(artist_ids)
             ).group_by(
-                SpotifyTrack.user_id,
+                GroupArtistPlays.user_id,
                 User.first_name,
                 User.username
             ).order_by(
-                func.count(SpotifyTrack.id).desc()
+                play_count.desc()
             ).limit(10)
             
             result = await session.execute(stmt)
@@ -803,14 +816,14 @@ async def whoknows_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             
             if not listeners:
                 await update.message.reply_text(
-                    f"❌ Ninguém no grupo ouviu **{artist_query}** ainda.\n"
+                    f"❌ Ninguém no grupo ouviu **{artist_name}** ainda.\n"
                     f"Use .fm para registrar suas músicas!",
                     parse_mode='Markdown'
                 )
                 return
             
             chat_title = update.message.chat.title or "este grupo"
-            text = f"👥 **Top ouvintes de {artist_query} em {chat_title}:**\n\n"
+            text = f"👥 **Top ouvintes de {artist_name} em {chat_title}:**\n\n"
             
             for i, (user_id, first_name, username, count) in enumerate(listeners, 1):
                 crown = "👑 " if i == 1 else ""
@@ -819,32 +832,16 @@ async def whoknows_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             
             await update.message.reply_text(text, parse_mode='Markdown')
             
-            if listeners:
-                crown_user_id = listeners[0][0]
-                artist_name = artist_query
-                
-                delete_stmt = delete(ArtistCrown).where(
-                    ArtistCrown.group_id == group_id,
-                    ArtistCrown.artist_name.ilike(f"%{artist_query}%")
-                )
-                await session.execute(delete_stmt)
-                
-                new_crown = ArtistCrown(
-                    group_id=group_id,
-                    user_id=crown_user_id,
-                    artist_name=artist_name,
-                    play_count=listeners[0][3]
-                )
-                session.add(new_crown)
-                await session.commit()
-                
     except Exception as e:
         logger.error(f"Erro ao buscar whoknows: {e}")
         await update.message.reply_text("❌ Erro ao buscar os dados.")
 
 
 async def crowns_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Comando .crowns - Mostra ranking de crowns (artistas mais ouvidos) do grupo"""
+    """Comando .crowns - Mostra ranking de crowns (artistas mais ouvidos) do grupo
+    
+    As crowns são mantidas a cada play registrado; aqui é só uma leitura por group_id.
+    """
     if not update.message or not update.message.from_user:
         return
     
@@ -874,7 +871,7 @@ async def crowns_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             if not crown_holders:
                 await update.message.reply_text(
                     "👑 Ainda não há crowns neste grupo!\n\n"
-                    "Use .whoknows [artista] para começar a competir por crowns."
+                    "Use .fm para registrar suas músicas e começar a competir por crowns."
                 )
                 return
             
@@ -892,16 +889,33 @@ async def crowns_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("❌ Erro ao buscar os dados.")
 
 
+async def _friend_now_playing(friend_id: int, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+    """Busca a música atual de um amigo respeitando o limite de concorrência"""
+    async with semaphore:
+        friend_token = await get_user_spotify_token(friend_id)
+        if not friend_token:
+            return None
+        
+        current = await get_current_playing(friend_token, friend_id)
+        if current and current.get('item'):
+            return current['item']
+        return None
+
+
 async def friends_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Comando .friends - Mostra o que seus amigos estão ouvindo"""
+    """Comando .friends [página] - Mostra o que seus amigos estão ouvindo"""
     if not update.message or not update.message.from_user:
         return
     
     user_id = update.message.from_user.id
     
+    page = 1
+    if context.args and context.args[0].isdigit():
+        page = max(int(context.args[0]), 1)
+    
     try:
         async with db.session_maker() as session:
-            stmt = select(UserFriend.friend_id).where(UserFriend.user_id == user_id)
+            stmt = select(UserFriend.friend_id).where(UserFriend.user_id == user_id).order_by(UserFriend.id)
             result = await session.execute(stmt)
             friend_ids = [row[0] for row in result.all()]
             
@@ -913,43 +927,71 @@ async def friends_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 )
                 return
             
-            friends_listening = []
-            for friend_id in friend_ids[:10]:
-                friend_token = await get_user_spotify_token(friend_id)
-                if not friend_token:
-                    continue
-                
-                current = await get_current_playing(friend_token)
-                if current and current.get('item'):
-                    track = current['item']
-                    
-                    user_stmt = select(User).where(User.id == friend_id)
-                    user_result = await session.execute(user_stmt)
-                    friend_user = user_result.scalar_one_or_none()
-                    
-                    if friend_user:
-                        friends_listening.append({
-                            'name': friend_user.first_name,
-                            'username': friend_user.username,
-                            'track': track['name'],
-                            'artist': ", ".join([a['name'] for a in track['artists']]),
-                            'url': track['external_urls']['spotify']
-                        })
-            
-            if not friends_listening:
-                await update.message.reply_text(
-                    "🎵 Nenhum dos seus amigos está ouvindo música no momento."
-                )
+            total_pages = (len(friend_ids) + FRIENDS_PAGE_SIZE - 1) // FRIENDS_PAGE_SIZE
+            if page > total_pages:
+                await update.message.reply_text(f"❌ Página inválida. Você tem {total_pages} página(s) de amigos.")
                 return
             
-            text = "👥 **O que seus amigos estão ouvindo:**\n\n"
-            for friend in friends_listening:
-                user_display = f"{friend['name']}" + (f" (@{friend['username']})" if friend['username'] else "")
-                text += f"🎵 **{user_display}**\n"
-                text += f"   [{friend['track']}]({friend['url']})\n"
-                text += f"   👤 {friend['artist']}\n\n"
+            page_ids = friend_ids[(page - 1) * FRIENDS_PAGE_SIZE:page * FRIENDS_PAGE_SIZE]
+            
+            users_stmt = select(User).where(User.id.in_(page_ids))
+            users_result = await session.execute(users_stmt)
+            friend_users = {friend.id: friend for friend in users_result.scalars().all()}
+        
+        # Consulta todos os amigos da página em paralelo, com prazo total para o comando
+        semaphore = asyncio.Semaphore(FRIENDS_CONCURRENCY)
+        tasks = {
+            friend_id: asyncio.create_task(_friend_now_playing(friend_id, semaphore))
+            for friend_id in page_ids if friend_id in friend_users
+        }
+        
+        timed_out = 0
+        if tasks:
+            done, pending = await asyncio.wait(tasks.values(), timeout=FRIENDS_DEADLINE)
+            for task in pending:
+                task.cancel()
+            # Aguarda o cancelamento terminar (libera conexões e evita "Task was destroyed")
+            await asyncio.gather(*pending, return_exceptions=True)
+            timed_out = len(pending)
+        
+        friends_listening = []
+        for friend_id, task in tasks.items():
+            if not task.done() or task.cancelled() or task.exception():
+                continue
             
-            await update.message.reply_text(text, parse_mode='Markdown', disable_web_page_preview=True)
+            track = task.result()
+            if track:
+                friend_user = friend_users[friend_id]
+                friends_listening.append({
+                    'name': friend_user.first_name,
+                    'username': friend_user.username,
+                    'track': track['name'],
+                    'artist': ", ".join([a['name'] for a in track['artists']]),
+                    'url': track['external_urls']['spotify']
+                })
+        
+        footer = ""
+        if timed_out:
+            footer += f"⏱️ {timed_out} amigo(s) não responderam a tempo.\n"
+        if total_pages > 1:
+            footer += f"📄 Página {page}/{total_pages} - use .friends <página> para navegar"
+        
+        if not friends_listening:
+            text = "🎵 Nenhum dos seus amigos está ouvindo música no momento."
+            if footer:
+                text += f"\n\n{footer}"
+            await update.message.reply_text(text)
+            return
+        
+        text = "👥 **O que seus amigos estão ouvindo:**\n\n"
+        for friend in friends_listening:
+            user_display = f"{friend['name']}" + (f" (@{friend['username']})" if friend['username'] else "")
+            text += f"🎵 **{user_display}**\n"
+            text += f"   [{friend['track']}]({friend['url']})\n"
+            text += f"   👤 {friend['artist']}\n\n"
+        text += footer
+        
+        await update.message.reply_text(text, parse_mode='Markdown', disable_web_page_preview=True)
             
     except Exception as e:
         logger.error(f"Erro ao buscar amigos: {e}")
@@ -1006,29 +1048,6 @@ async def add_friend_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("❌ Erro ao adicionar amigo.")
 
 
-async def dot_whoknows_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .whoknows"""
-    if update.message and update.message.text:
-        text = update.message.text.strip()
-        if text.startswith('.whoknows'):
-            parts = text.split(maxsplit=1)
-            if len(parts) > 1:
-                context.args = parts[1].split()
-            await whoknows_command(update, context)
-
-
-async def dot_crowns_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .crowns"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.crowns'):
-        await crowns_command(update, context)
-
-
-async def dot_friends_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para detectar mensagens .friends"""
-    if update.message and update.message.text and update.message.text.strip().startswith('.friends'):
-        await friends_command(update, context)
-
-
 def register_spotify_handlers(application: Application) -> None:
     """Registra os handlers do módulo Spotify"""
     application.add_handler(CommandHandler("conectarspotify", connect_spotify_command))
@@ -1047,11 +1066,12 @@ def register_spotify_handlers(application: Application) -> None:
     application.add_handler(CommandHandler("pesquisarartista", search_artist_command))
     application.add_handler(CommandHandler("pesquisaralbum", search_album_command))
     
-    application.add_handler(MessageHandler(filters.Regex(r'^\.fm\b'), dot_fm_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.w\b'), dot_w_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.profile\b'), dot_profile_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.plays\b'), dot_plays_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.chart\b'), dot_chart_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.whoknows\b'), dot_whoknows_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.crowns\b'), dot_crowns_handler), group=-1)
-    application.add_handler(MessageHandler(filters.Regex(r'^\.friends\b'), dot_friends_handler), group=-1)
+    # Comandos de ponto, despachados pelo pipeline de mensagens
+    dot_commands.register("fm", fm_command, aliases=("np",))
+    dot_commands.register("w", weekly_command)
+    dot_commands.register("profile", profile_command)
+    dot_commands.register("plays", plays_command)
+    dot_commands.register("chart", chart_command)
+    dot_commands.register("whoknows", whoknows_command, aliases=("wk",))
+    dot_commands.register("crowns", crowns_command)
+    dot_commands.register("friends", friends_command)
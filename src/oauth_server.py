@@ -5,16 +5,18 @@ Agora também inclui webhook do Telegram
 import logging
 import os
 import secrets
-import base64
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-import aiohttp
 from quart import Quart, request, redirect, jsonify
 from sqlalchemy import select
 from telegram import Update
 from src.config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_REDIRECT_URI
 from src.database.db import db
 from src.database.models import SpotifyAccount, User
+from src.utils.spotify_client import spotify_client, SPOTIFY_API_URL
+from src.utils.rate_limit import spotify_governor
+from src.utils.spotify_tokens import token_cache, spotify_auth_headers, SPOTIFY_TOKEN_URL
+from src.utils.webhook_intake import webhook_intake
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +29,6 @@ webhook_secret_token = None
 pending_auth_states: Dict[str, int] = {}
 
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
-SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_SCOPES = "user-read-currently-playing user-read-recently-played user-top-read user-read-playback-state"
 
 
@@ -143,7 +144,8 @@ async def health_check():
             "webhook": "/webhook",
             "spotify_auth": "/auth/spotify",
             "spotify_callback": "/callback/spotify",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     })
 
@@ -208,29 +210,18 @@ async def spotify_callback():
         return "❌ State inválido ou expirado", 400
     
     try:
-        auth_header = base64.b64encode(
-            f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode()
-        ).decode()
-        
-        headers = {
-            "Authorization": f"Basic {auth_header}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
         data = {
             "grant_type": "authorization_code",
             "code": code,
             "redirect_uri": SPOTIFY_REDIRECT_URI
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(SPOTIFY_TOKEN_URL, headers=headers, data=data) as response:
-                if response.status != 200:
-                    error_data = await response.text()
-                    logger.error(f"Erro ao obter token: {error_data}")
-                    return "❌ Erro ao obter token de acesso", 500
-                
-                token_data = await response.json()
+        status, token_data = await spotify_client.request(
+            "POST", SPOTIFY_TOKEN_URL, headers=spotify_auth_headers(), data=data
+        )
+        if status != 200:
+            logger.error(f"Erro ao obter token: {token_data}")
+            return "❌ Erro ao obter token de acesso", 500
         
         access_token = token_data["access_token"]
         refresh_token = token_data["refresh_token"]
@@ -264,6 +255,8 @@ async def spotify_callback():
             
             await db_session.commit()
         
+        await token_cache.store(telegram_user_id, access_token, expires_at)
+        
         return """
         <html>
             <head>
@@ -290,67 +283,19 @@ async def spotify_callback():
 async def get_spotify_user_info(access_token: str) -> Dict:
     """Obtém informações do usuário do Spotify"""
     try:
-        headers = {"Authorization": f"Bearer {access_token}"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://api.spotify.com/v1/me", headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                return {}
+        status, data = await spotify_client.get(f"{SPOTIFY_API_URL}/me", access_token)
+        if status == 200:
+            return data
+        return {}
     except Exception as e:
         logger.error(f"Erro ao obter info do usuário: {e}")
         return {}
 
 
 async def refresh_user_token(user_id: int) -> Optional[str]:
-    """Atualiza o token de acesso de um usuário"""
+    """Atualiza o token de acesso de um usuário (via cache com refresh único por usuário)"""
     try:
-        async with db.session_maker() as session:
-            stmt = select(SpotifyAccount).where(SpotifyAccount.user_id == user_id)
-            result = await session.execute(stmt)
-            account = result.scalar_one_or_none()
-            
-            if not account:
-                return None
-            
-            if datetime.utcnow() < account.token_expires_at:
-                return account.access_token
-            
-            auth_header = base64.b64encode(
-                f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode()
-            ).decode()
-            
-            headers = {
-                "Authorization": f"Basic {auth_header}",
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-            
-            data = {
-                "grant_type": "refresh_token",
-                "refresh_token": account.refresh_token
-            }
-            
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.post(SPOTIFY_TOKEN_URL, headers=headers, data=data) as response:
-                    if response.status != 200:
-                        logger.error(f"Erro ao renovar token para user {user_id}")
-                        return None
-                    
-                    token_data = await response.json()
-            
-            new_access_token = token_data["access_token"]
-            expires_in = token_data.get("expires_in", 3600)
-            new_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-            
-            account.access_token = new_access_token
-            account.token_expires_at = new_expires_at
-            
-            if "refresh_token" in token_data:
-                account.refresh_token = token_data["refresh_token"]
-            
-            await session.commit()
-            
-            return new_access_token
-            
+        return await token_cache.get_token(user_id)
     except Exception as e:
         logger.error(f"Erro ao renovar token: {e}")
         return None
@@ -367,6 +312,33 @@ async def health():
     return jsonify({"status": "ok"})
 
 
+@app.route("/metrics")
+async def metrics():
+    """Métricas internas de desempenho"""
+    from src.modules.spotify_music import now_playing_cache
+    from src.modules.spotify_jobs import scrobble_stats
+    from src.database.write_buffer import play_write_buffer
+    from src.database.message_counter import message_counter
+    from src.utils.cache import cache_stats
+    from src.utils.flood import flood_detector
+    from src.modules.pipeline import pipeline_stats
+    from src.utils.update_processor import update_processor
+    
+    return jsonify({
+        "spotify_rate_limit": spotify_governor.stats(),
+        "now_playing_cache": now_playing_cache.stats(),
+        "spotify_tokens": token_cache.stats(),
+        "scrobbler": scrobble_stats,
+        "play_write_buffer": play_write_buffer.stats(),
+        "message_counter": message_counter.stats(),
+        "caches": cache_stats(),
+        "flood_detector": flood_detector.stats(),
+        "message_pipeline": pipeline_stats.stats(),
+        "update_processor": update_processor.stats(),
+        "webhook_intake": webhook_intake.stats()
+    })
+
+
 @app.route("/")
 async def root():
     """Root endpoint para Render detectar a porta"""
@@ -398,7 +370,10 @@ async def telegram_webhook():
     try:
         json_data = await request.get_json()
         update = Update.de_json(json_data, bot_application.bot)
-        await bot_application.update_queue.put(update)
+        webhook_intake.start(bot_application)
+        # Sempre 200: um update descartado sob carga não deve ser reenviado pelo Telegram
+        if not webhook_intake.submit(update):
+            return jsonify({"ok": True, "shed": True})
         return jsonify({"ok": True})
     except Exception as e:
         logger.error(f"Erro ao processar webhook: {e}")
@@ -0,0 +1,265 @@
+"""
+Cache em memória com TTL, despejo LRU e coalescência de requisições
+e backends plugáveis (em processo ou Redis) para estado compartilhado
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.config import CACHE_URL, CACHE_NAMESPACE
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Dependência opcional: sem ela só o cache em processo fica disponível
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Cache limitado por tamanho e tempo, com uma única carga em andamento por chave"""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor) sem disparar carga"""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Armazena um valor, despejando o menos usado se o cache estiver cheio"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove uma chave do cache"""
+        self._data.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna o valor em cache ou executa o loader uma única vez por chave
+
+        Chamadas concorrentes para a mesma chave aguardam a mesma carga.
+        Exceções do loader são propagadas e o resultado não é armazenado.
+        """
+        found, value = self.lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+
+        def _done(finished: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            if not finished.cancelled() and finished.exception() is None:
+                self.set(key, finished.result())
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de acerto/erro do cache"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
+
+
+class CacheBackend(ABC):
+    """Interface comum: get/set com TTL, invalidação e carga única por chave"""
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @abstractmethod
+    async def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor); None também é um valor válido (cache negativo)"""
+
+    @abstractmethod
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Armazena um valor pelo TTL informado (ou o padrão do cache)"""
+
+    @abstractmethod
+    async def invalidate(self, key: Hashable) -> None:
+        """Remove uma chave do cache"""
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        """Retorna o valor em cache ou executa o loader uma única vez por chave neste processo"""
+        found, value = await self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+
+        async def load() -> Any:
+            loaded = await loader()
+            await self.set(key, loaded, ttl)
+            return loaded
+
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de acerto/erro do cache"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
+
+
+class LocalCache(CacheBackend):
+    """Cache LRU com TTL dentro do processo"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        super().__init__(name, ttl)
+        self._data = TTLCache(ttl, maxsize)
+
+    async def get(self, key: Hashable) -> Tuple[bool, Any]:
+        return self._data.lookup(key)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data.set(key, value, ttl)
+
+    async def invalidate(self, key: Hashable) -> None:
+        self._data.invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        local = self._data.stats()
+        return {**super().stats(), "size": local["size"], "evictions": local["evictions"]}
+
+
+class RedisCache(CacheBackend):
+    """Cache compartilhado entre workers via protocolo Redis (valores em JSON)
+
+    Falhas de conexão viram cache miss: o chamador recorre à fonte original.
+    client retorna o cliente do loop atual (ver redis_client).
+    """
+
+    def __init__(self, name: str, ttl: float, client: Callable[[], Any]):
+        super().__init__(name, ttl)
+        self._client = client
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([CACHE_NAMESPACE, self.name, *map(str, parts)])
+
+    async def get(self, key: Hashable) -> Tuple[bool, Any]:
+        try:
+            raw = await self._client().get(self._key(key))
+            if raw is None:
+                return False, None
+            # Valor corrompido ou gravado por outro programa também vira miss
+            return True, json.loads(raw)["v"]
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: erro ao ler do Redis: {e}")
+            return False, None
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await self._client().set(
+                self._key(key),
+                json.dumps({"v": value}),
+                px=int((self.ttl if ttl is None else ttl) * 1000)
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: erro ao gravar no Redis: {e}")
+
+    async def invalidate(self, key: Hashable) -> None:
+        try:
+            await self._client().delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: erro ao invalidar no Redis: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "errors": self.errors}
+
+
+_caches: List[CacheBackend] = []
+# Um cliente por loop: as conexões do redis.asyncio pertencem ao loop em que foram
+# abertas, e o servidor OAuth roda em outro loop (thread separada via start.py)
+_redis_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def redis_client() -> Any:
+    """Cliente Redis do loop atual (criado na primeira chamada em cada loop)"""
+    loop = asyncio.get_running_loop()
+    client = _redis_clients.get(loop)
+    if client is None:
+        client = _redis_clients[loop] = aioredis.from_url(CACHE_URL)
+    return client
+
+
+def create_cache(name: str, ttl: float, maxsize: int) -> CacheBackend:
+    """Cria um cache nomeado: Redis se CACHE_URL estiver configurada, senão em processo"""
+    if CACHE_URL and aioredis is not None:
+        cache: CacheBackend = RedisCache(name, ttl, redis_client)
+    else:
+        if CACHE_URL:
+            logger.warning(f"CACHE_URL configurada, mas o pacote redis não está instalado; cache {name} em processo")
+        cache = LocalCache(name, ttl, maxsize)
+
+    _caches.append(cache)
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Métricas de todos os caches criados por create_cache"""
+    return {cache.name: cache.stats() for cache in _caches}
@@ -0,0 +1,199 @@
+"""
+Motor de filtros do AutoMod
+Padrões pré-compilados, busca de termos e domínios proibidos em uma única
+passada (Aho–Corasick) e regras por grupo compiladas uma vez e reaproveitadas
+"""
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from src.config import (
+    SPAM_MAX_LENGTH,
+    SPAM_MAX_MENTIONS,
+    SPAM_MAX_REPEATED_CHARS,
+    GROUP_SETTINGS_CACHE_TTL,
+    CACHE_MAX_ENTRIES
+)
+from src.utils.cache import TTLCache
+
+# Fallback para textos sem entidades (o Telegram já marca links em message.entities)
+URL_PATTERN = re.compile(r"(?:https?://|www\.)[^\s<>\"']+", re.IGNORECASE)
+REPEATED_CHARS_PATTERN = re.compile(r"(.)\1{%d,}" % max(SPAM_MAX_REPEATED_CHARS - 1, 1), re.DOTALL)
+
+# Tipos de violação, na ordem em que são verificados
+BANNED_WORD = "banned_word"
+BANNED_DOMAIN = "banned_domain"
+LINK = "link"
+SPAM = "spam"
+
+
+def normalize_term(term: str) -> str:
+    """Termo proibido em minúsculas e sem espaços extras"""
+    return " ".join(term.lower().split())
+
+
+def normalize_domain(domain: str) -> str:
+    """Domínio sem esquema, www, porta ou caminho (ex.: https://www.site.com/x -> site.com)"""
+    domain = domain.strip().lower()
+    if "://" not in domain:
+        domain = f"//{domain}"
+    host = urlsplit(domain).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def parse_term_list(value: Optional[str]) -> List[str]:
+    """Lista armazenada no banco (um item por linha)"""
+    return [line for line in (value or "").splitlines() if line]
+
+
+class AhoCorasick:
+    """Autômato de múltiplos padrões: encontra todos os termos em uma passada pelo texto"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        # Cada estado: transições, estado de falha e padrões (tipo, tamanho) que terminam nele
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]
+
+        for kind, pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((kind, len(pattern)))
+
+        queue = deque(self._goto[0].values())
+        order = []
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+        # Transições já resolvidas (sem seguir links de falha na busca): um acesso a dict por caractere
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in order]
+        for state in order:
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def matches(self, text: str) -> Iterable[Tuple[str, int, int]]:
+        """Gera (tipo, início, fim) de cada ocorrência"""
+        delta, output = self._delta, self._output
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if output[state]:
+                for kind, length in output[state]:
+                    yield kind, index - length + 1, index + 1
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class GroupRules:
+    """Regras compiladas de um grupo: termos, domínios, links e spam"""
+
+    def __init__(self, filter_links: bool, filter_spam: bool,
+                 banned_words: Iterable[str], banned_domains: Iterable[str]):
+        self.filter_links = filter_links
+        self.filter_spam = filter_spam
+        self.banned_domains: Set[str] = {d for d in map(normalize_domain, banned_domains) if d}
+        self._matcher = AhoCorasick(
+            [(BANNED_WORD, term) for term in {normalize_term(w) for w in banned_words}]
+            + [(BANNED_DOMAIN, domain) for domain in self.banned_domains]
+        )
+
+    def _find_banned(self, text: str) -> Optional[str]:
+        lowered = text.lower()
+        size = len(lowered)
+        for kind, start, end in self._matcher.matches(lowered):
+            before = lowered[start - 1] if start > 0 else " "
+            after = lowered[end] if end < size else " "
+            if kind == BANNED_WORD:
+                # Só palavras inteiras: "classe" não casa com um termo contido nela
+                if not _is_word_char(before) and not _is_word_char(after):
+                    return kind
+            elif not (_is_word_char(before) or before == "-") and not (_is_word_char(after) or after == "-"):
+                return kind
+        return None
+
+    def _domain_banned(self, url: str) -> bool:
+        host = normalize_domain(url)
+        # site.com também bloqueia subdomínios (a.site.com), sem casar outrosite.com
+        while host:
+            if host in self.banned_domains:
+                return True
+            _, _, host = host.partition(".")
+        return False
+
+    def check(self, text: str, urls: List[str], mentions: int = 0) -> Optional[str]:
+        """Tipo da primeira violação encontrada, ou None
+
+        urls vem das entidades url/text_link da mensagem; sem entidades,
+        os links são procurados no texto com o padrão pré-compilado.
+        """
+        if self._matcher:
+            violation = self._find_banned(text)
+            if violation:
+                return violation
+
+        if not urls and (self.filter_links or self.banned_domains):
+            urls = URL_PATTERN.findall(text)
+
+        if self.banned_domains and any(self._domain_banned(url) for url in urls):
+            return BANNED_DOMAIN
+
+        if self.filter_links and urls:
+            return LINK
+
+        if self.filter_spam and (
+            len(text) > SPAM_MAX_LENGTH
+            or mentions >= SPAM_MAX_MENTIONS
+            or REPEATED_CHARS_PATTERN.search(text)
+        ):
+            return SPAM
+
+        return None
+
+
+# Regras compiladas por grupo, junto com as configurações que as geraram
+_rules_cache = TTLCache(GROUP_SETTINGS_CACHE_TTL, CACHE_MAX_ENTRIES)
+
+
+def get_group_rules(group_id: int, settings: Dict[str, Any]) -> GroupRules:
+    """Regras do grupo, recompiladas apenas quando as configurações mudam"""
+    fingerprint = (
+        settings["filter_links"],
+        settings["filter_spam"],
+        settings.get("banned_words"),
+        settings.get("banned_domains")
+    )
+    found, cached = _rules_cache.lookup(group_id)
+    if found and cached[0] == fingerprint:
+        return cached[1]
+
+    rules = GroupRules(
+        settings["filter_links"],
+        settings["filter_spam"],
+        parse_term_list(settings.get("banned_words")),
+        parse_term_list(settings.get("banned_domains"))
+    )
+    _rules_cache.set(group_id, (fingerprint, rules))
+    return rules
@@ -0,0 +1,74 @@
+"""
+Despachante dos comandos de ponto (.fm, .whoknows...)
+O primeiro token é lido uma única vez e procurado em uma árvore de prefixos
+(trie) com os nomes e apelidos; texto sem ponto inicial é descartado no
+primeiro caractere
+"""
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.ext import ContextTypes
+
+DotHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
+PREFIX = "."
+
+
+class _Node:
+    __slots__ = ("children", "handler")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.handler: Optional[DotHandler] = None
+
+
+class DotCommandDispatcher:
+    """Trie de comandos de ponto com apelidos e separação de argumentos"""
+
+    def __init__(self):
+        self._root = _Node()
+        self.commands: Dict[str, List[str]] = {}
+
+    def register(self, name: str, handler: DotHandler, aliases: Tuple[str, ...] = ()) -> None:
+        """Registra um comando (sem o ponto) e seus apelidos"""
+        for word in (name, *aliases):
+            node = self._root
+            for char in word.lower():
+                node = node.children.setdefault(char, _Node())
+            node.handler = handler
+        self.commands[name] = list(aliases)
+
+    def match(self, text: str) -> Optional[Tuple[DotHandler, List[str]]]:
+        """(handler, argumentos) do comando no início do texto, ou None"""
+        if not text or text[0] != PREFIX:
+            return None
+
+        node = self._root
+        size = len(text)
+        index = 1
+        while index < size:
+            char = text[index]
+            child = node.children.get(char.lower())
+            if child is None:
+                break
+            node = child
+            index += 1
+
+        # O nome precisa terminar em fronteira de palavra: ".fmx" não é ".fm"
+        if node.handler is None or (index < size and (text[index].isalnum() or text[index] == "_")):
+            return None
+        return node.handler, text[index:].split()
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str) -> bool:
+        """Executa o comando do texto; retorna True se havia um comando"""
+        matched = self.match(text)
+        if matched is None:
+            return False
+
+        handler, args = matched
+        context.args = args
+        await handler(update, context)
+        return True
+
+
+# Instância global do despachante de comandos de ponto
+dot_commands = DotCommandDispatcher()
@@ -0,0 +1,168 @@
+"""
+Detector de flood do AutoMod
+Janelas deslizantes por (chat, usuário) com a taxa de mensagens e as
+impressões (amostra dos menores hashes de 4-gramas) das mensagens recentes,
+para pegar repetições com palavras trocadas; usuários ociosos são
+descartados para limitar a memória
+"""
+import re
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from src.config import (
+    FLOOD_MAX_MESSAGES,
+    FLOOD_WINDOW,
+    FLOOD_MAX_DUPLICATES,
+    FLOOD_DUPLICATE_WINDOW,
+    FLOOD_SIMILARITY,
+    FLOOD_IDLE_TTL,
+    FLOOD_MAX_TRACKED
+)
+
+FLOOD = "flood"
+DUPLICATE = "duplicate"
+
+# 4-gramas de caracteres dentro de cada palavra (com as bordas): trocar ou
+# acrescentar uma palavra muda só os 4-gramas dela
+SHINGLE_SIZE = 4
+# Menores hashes guardados por mensagem: mensagens curtas cabem inteiras (Jaccard
+# exato); nas longas, a amostra estima a semelhança com memória fixa
+SKETCH_SIZE = 32
+
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def fingerprint(text: str) -> array:
+    """Impressão da mensagem: os menores hashes dos seus 4-gramas, em ordem"""
+    # Sem acentos, caixa e pontuação: "Imperdível!!" e "imperdivel" geram os mesmos 4-gramas
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+
+    hashes = set()
+    for word in NON_WORD_PATTERN.split(normalized):
+        if not word:
+            continue
+        padded = f" {word} ".encode()
+        for i in range(max(len(padded) - SHINGLE_SIZE + 1, 1)):
+            # crc32 é estável entre processos (hash() de str é aleatório por execução)
+            hashes.add(zlib.crc32(padded[i:i + SHINGLE_SIZE]))
+    return array("I", sorted(hashes)[:SKETCH_SIZE])
+
+
+def similarity(a: array, b: array) -> float:
+    """Semelhança de Jaccard estimada pelas impressões (1.0 = mesmos 4-gramas)"""
+    if not a and not b:
+        # Sem texto aproveitável (só emojis/pontuação): conta como a mesma mensagem
+        return 1.0
+    union = sorted(set(a).union(b))[:SKETCH_SIZE]
+    common = set(a).intersection(b)
+    return sum(1 for value in union if value in common) / len(union)
+
+
+class FloodState:
+    """Janelas de um usuário em um chat"""
+
+    __slots__ = ("timestamps", "fingerprints", "last_seen", "warned_at")
+
+    def __init__(self):
+        self.timestamps: Deque[float] = deque()
+        self.fingerprints: Deque[Tuple[float, array]] = deque()
+        self.last_seen = 0.0
+        self.warned_at = float("-inf")
+
+
+class FloodDetector:
+    """Contadores por (chat, usuário) com atualização O(1) amortizada e memória limitada"""
+
+    def __init__(self, idle_ttl: float, max_tracked: int):
+        self.idle_ttl = idle_ttl
+        self.max_tracked = max_tracked
+        # Ordem de uso: os ociosos ficam no início e são descartados primeiro
+        self._states: "OrderedDict[Tuple[int, int], FloodState]" = OrderedDict()
+        self.counters: Dict[str, int] = {
+            "messages": 0,
+            "flood": 0,
+            "duplicate": 0,
+            "evictions": 0
+        }
+
+    def _evict(self, now: float) -> None:
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if len(self._states) <= self.max_tracked and now - state.last_seen < self.idle_ttl:
+                break
+            del self._states[key]
+            self.counters["evictions"] += 1
+
+    def observe(self, chat_id: int, user_id: int, text: str, limits: Optional[Dict[str, int]] = None,
+                now: Optional[float] = None) -> Optional[str]:
+        """Registra uma mensagem e retorna "flood", "duplicate" ou None
+
+        limits aceita max_messages, window, max_duplicates e duplicate_window
+        (padrões do config para chaves ausentes ou None).
+        """
+        now = time.monotonic() if now is None else now
+        limits = limits or {}
+        max_messages = limits.get("max_messages") or FLOOD_MAX_MESSAGES
+        window = limits.get("window") or FLOOD_WINDOW
+        max_duplicates = limits.get("max_duplicates") or FLOOD_MAX_DUPLICATES
+        duplicate_window = limits.get("duplicate_window") or FLOOD_DUPLICATE_WINDOW
+
+        self.counters["messages"] += 1
+        key = (chat_id, user_id)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = FloodState()
+        else:
+            self._states.move_to_end(key)
+        state.last_seen = now
+        self._evict(now)
+
+        timestamps = state.timestamps
+        timestamps.append(now)
+        while timestamps[0] <= now - window:
+            timestamps.popleft()
+
+        fingerprints = state.fingerprints
+        while fingerprints and fingerprints[0][0] <= now - duplicate_window:
+            fingerprints.popleft()
+        current = fingerprint(text)
+        duplicates = sum(
+            1 for _, previous in fingerprints
+            if similarity(previous, current) >= FLOOD_SIMILARITY
+        )
+        fingerprints.append((now, current))
+        # A comparação é linear no histórico: mantém só as mais recentes
+        if len(fingerprints) > max_duplicates * 4:
+            fingerprints.popleft()
+
+        if len(timestamps) > max_messages:
+            self.counters["flood"] += 1
+            return FLOOD
+        if duplicates >= max_duplicates:
+            self.counters["duplicate"] += 1
+            return DUPLICATE
+        return None
+
+    def should_warn(self, chat_id: int, user_id: int, window: Optional[float] = None,
+                    now: Optional[float] = None) -> bool:
+        """Um aviso por rajada (janela do grupo): evita que o próprio bot inunde o chat"""
+        now = time.monotonic() if now is None else now
+        window = window or FLOOD_WINDOW
+        state = self._states.get((chat_id, user_id))
+        if state is None or now - state.warned_at < window:
+            return False
+        state.warned_at = now
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores para monitoramento"""
+        return {**self.counters, "tracked": len(self._states)}
+
+
+# Instância global do detector de flood
+flood_detector = FloodDetector(FLOOD_IDLE_TTL, FLOOD_MAX_TRACKED)
@@ -0,0 +1,35 @@
+"""
+Configurações de grupo usadas no caminho quente (AutoMod), com cache
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import select
+
+from src.config import GROUP_SETTINGS_CACHE_TTL, CACHE_MAX_ENTRIES
+from src.database.db import db
+from src.database.models import Group
+from src.utils.cache import create_cache
+
+group_settings_cache = create_cache("group_settings", GROUP_SETTINGS_CACHE_TTL, CACHE_MAX_ENTRIES)
+
+
+async def get_group_settings(group_id: int) -> Optional[Dict[str, Any]]:
+    """Configurações de AutoMod do grupo, ou None se o grupo não tem registro"""
+    async def load() -> Optional[Dict[str, Any]]:
+        async with db.session_maker() as session:
+            result = await session.execute(
+                select(
+                    Group.automod_enabled, Group.filter_links, Group.filter_spam,
+                    Group.banned_words, Group.banned_domains,
+                    Group.flood_max_messages, Group.flood_window, Group.flood_max_duplicates
+                )
+                .where(Group.id == group_id)
+            )
+            row = result.first()
+            return dict(row._mapping) if row else None
+    
+    return await group_settings_cache.get_or_load(group_id, load)
+
+
+async def invalidate_group_settings(group_id: int) -> None:
+    """Descarta as configurações em cache após uma alteração"""
+    await group_settings_cache.invalidate(group_id)
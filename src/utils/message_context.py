@@ -0,0 +1,42 @@
+"""
+Contexto de uma mensagem no pipeline de entrada
+Carregado uma vez por update e compartilhado entre AutoMod, rank e comandos de ponto
+"""
+from typing import Any, Dict, Optional
+from telegram import Update
+from telegram.constants import ChatType
+from telegram.ext import ContextTypes
+
+from src.utils.group_settings import get_group_settings
+from src.utils.permissions import is_admin
+
+
+class MessageContext:
+    """Dados do chat, do usuário e do texto de uma mensagem, resolvidos uma única vez"""
+
+    __slots__ = ("update", "chat_id", "chat_title", "user", "text", "is_private", "settings", "_is_admin")
+
+    def __init__(self, update: Update, settings: Optional[Dict[str, Any]]):
+        self.update = update
+        self.chat_id = update.effective_chat.id
+        self.chat_title = update.effective_chat.title or "Unknown"
+        self.user = update.effective_user
+        self.text = update.message.text or ""
+        self.is_private = update.effective_chat.type == ChatType.PRIVATE
+        # Configurações do grupo (None: chat privado ou grupo sem registro)
+        self.settings = settings
+        self._is_admin: Optional[bool] = None
+
+    @classmethod
+    async def load(cls, update: Update) -> "MessageContext":
+        """Monta o contexto; no máximo uma consulta ao banco (configurações fora do cache)"""
+        settings = None
+        if update.effective_chat.type != ChatType.PRIVATE:
+            settings = await get_group_settings(update.effective_chat.id)
+        return cls(update, settings)
+
+    async def is_admin(self, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """Se o autor é administrador (consultado uma vez por mensagem)"""
+        if self._is_admin is None:
+            self._is_admin = await is_admin(self.update, context)
+        return self._is_admin
@@ -1,59 +1,112 @@
 """
 Utilitários para verificação de permissões
 """
+from typing import Any, Dict, Optional
 from telegram import Update, ChatMember, ChatMemberAdministrator
+from telegram.constants import ChatType
 from telegram.ext import ContextTypes
 
+from src.config import PERMISSION_CACHE_TTL, CACHE_MAX_ENTRIES
+from src.utils.cache import create_cache
+
+# Administradores por chat (um get_chat_administrators por chat, não por mensagem);
+# invalidado pelas atualizações chat_member/my_chat_member e expirado pelo TTL
+admin_cache = create_cache("chat_admins", PERMISSION_CACHE_TTL, CACHE_MAX_ENTRIES)
+
+
+async def get_chat_admins(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> Dict[str, Dict[str, Any]]:
+    """Status e permissões dos administradores do chat, por ID de usuário (com cache)"""
+    async def load() -> Dict[str, Dict[str, Any]]:
+        admins = await context.bot.get_chat_administrators(chat_id)
+        # Chaves em texto: o valor precisa sobreviver à serialização JSON do Redis
+        return {
+            str(member.user.id): {
+                "status": str(member.status),
+                "can_delete_messages": bool(
+                    isinstance(member, ChatMemberAdministrator) and member.can_delete_messages
+                ),
+                "can_restrict_members": bool(
+                    isinstance(member, ChatMemberAdministrator) and member.can_restrict_members
+                )
+            }
+            for member in admins
+        }
+    
+    return await admin_cache.get_or_load(chat_id, load)
+
+
+async def get_admin_permissions(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+                                user_id: int) -> Optional[Dict[str, Any]]:
+    """Permissões do usuário se ele for administrador do chat, senão None"""
+    admins = await get_chat_admins(context, chat_id)
+    return admins.get(str(user_id))
+
+
+async def invalidate_chat_admins(chat_id: int) -> None:
+    """Descarta a lista de administradores em cache do chat"""
+    await admin_cache.invalidate(chat_id)
+
 
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Verifica se o usuário é administrador"""
     if not update.effective_chat or not update.effective_user:
         return False
     
+    # Chats privados não têm administradores
+    if update.effective_chat.type == ChatType.PRIVATE:
+        return False
+    
     try:
-        member = await context.bot.get_chat_member(
+        member = await get_admin_permissions(
+            context,
             update.effective_chat.id,
             update.effective_user.id
         )
-        return member.status in [ChatMember.ADMINISTRATOR, ChatMember.OWNER]
+        return member is not None and member["status"] in [ChatMember.ADMINISTRATOR, ChatMember.OWNER]
     except Exception:
         return False
 
 
-async def bot_can_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """Verifica se o bot pode deletar mensagens"""
-    if not update.effective_chat:
+async def _bot_has_permission(update: Update, context: ContextTypes.DEFAULT_TYPE, permission: str) -> bool:
+    if not update.effective_chat or update.effective_chat.type == ChatType.PRIVATE:
         return False
     
     try:
-        bot_member = await context.bot.get_chat_member(
+        bot_member = await get_admin_permissions(
+            context,
             update.effective_chat.id,
             context.bot.id
         )
-        if bot_member.status == ChatMember.ADMINISTRATOR:
-            if isinstance(bot_member, ChatMemberAdministrator):
-                return bot_member.can_delete_messages or False
-        return bot_member.status == ChatMember.OWNER
+        if bot_member is None:
+            return False
+        if bot_member["status"] == ChatMember.ADMINISTRATOR:
+            return bot_member[permission]
+        return bot_member["status"] == ChatMember.OWNER
     except Exception:
         return False
 
 
+async def bot_can_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Verifica se o bot pode deletar mensagens"""
+    return await _bot_has_permission(update, context, "can_delete_messages")
+
+
 async def bot_can_restrict(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Verifica se o bot pode restringir usuários"""
-    if not update.effective_chat:
-        return False
+    return await _bot_has_permission(update, context, "can_restrict_members")
+
+
+async def track_admin_changes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Invalida o cache de administradores quando um membro (ou o bot) muda de cargo"""
+    change = update.chat_member or update.my_chat_member
+    if not change:
+        return
     
-    try:
-        bot_member = await context.bot.get_chat_member(
-            update.effective_chat.id,
-            context.bot.id
-        )
-        if bot_member.status == ChatMember.ADMINISTRATOR:
-            if isinstance(bot_member, ChatMemberAdministrator):
-                return bot_member.can_restrict_members or False
-        return bot_member.status == ChatMember.OWNER
-    except Exception:
-        return False
+    admin_statuses = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+    old, new = change.old_chat_member, change.new_chat_member
+    # Entradas/saídas de membros comuns não alteram a lista de administradores
+    if old.status in admin_statuses or new.status in admin_statuses:
+        await invalidate_chat_admins(change.chat.id)
 
 
 def get_user_from_message(update: Update) -> tuple[int | None, str | None]:
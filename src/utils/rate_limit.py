@@ -0,0 +1,185 @@
+"""
+Controle global de taxa para a API do Spotify
+Token bucket por endpoint + pausa global ao receber 429 com Retry-After
+Os limitadores pertencem a um loop: chamadas de outro loop (servidor OAuth em
+thread separada via start.py) pedem a vaga no loop dono, com um orçamento só
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from aiolimiter import AsyncLimiter
+
+from src.config import SPOTIFY_RATE_LIMIT, SPOTIFY_RATE_PERIOD, SPOTIFY_SCROBBLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Orçamento por endpoint: (requisições, período em segundos)
+ENDPOINT_BUDGETS: Dict[str, Tuple[int, float]] = {
+    "currently-playing": (60, 30),
+    "recently-played": (60, 30),
+    "top": (30, 30),
+    "search": (30, 30),
+    "me": (20, 30),
+    "token": (30, 30),
+    # Coleta em segundo plano: fatia reservada (ver RESERVED_ENDPOINTS)
+    "scrobble": (SPOTIFY_SCROBBLE_RATE, SPOTIFY_RATE_PERIOD),
+}
+
+# Endpoints com fatia reservada: não passam pelo limite global, que é reduzido
+# na mesma proporção. O total continua em SPOTIFY_RATE_LIMIT e a coleta em
+# segundo plano não consome o orçamento dos comandos
+RESERVED_ENDPOINTS = frozenset({"scrobble"})
+
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class SpotifyRateGovernor:
+    """Governa todas as chamadas ao Spotify do processo"""
+
+    def __init__(self, max_rate: int, time_period: float,
+                 budgets: Dict[str, Tuple[int, float]]):
+        self._budgets = budgets
+        self._reserved = RESERVED_ENDPOINTS & budgets.keys()
+        reserved_rate = sum(
+            budgets[name][0] * time_period / budgets[name][1] for name in self._reserved
+        )
+        if reserved_rate >= max_rate:
+            logger.warning(
+                f"Fatias reservadas ({reserved_rate:.0f}) consomem todo o limite global ({max_rate}): "
+                f"aumente SPOTIFY_RATE_LIMIT"
+            )
+        self._global_rate = (max(max_rate - reserved_rate, 1), time_period)
+        # Criados no primeiro acquire, no loop que passa a ser o dono (_bind)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[AsyncLimiter] = None
+        self._endpoints: Dict[str, AsyncLimiter] = {}
+        # Vez de cada endpoint: um pedido por endpoint aguarda capacidade, na ordem de chegada
+        self._turns: Dict[str, asyncio.Lock] = {}
+        self._blocked_until = 0.0
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "queued": 0,
+            "throttled": 0,
+            "dropped": 0
+        }
+
+    @staticmethod
+    def endpoint_for(url: str) -> str:
+        """Classifica a URL no orçamento correspondente"""
+        parsed = urlparse(url)
+        if parsed.netloc == "accounts.spotify.com":
+            return "token"
+
+        path = parsed.path.rstrip("/")
+        if path.endswith("/currently-playing"):
+            return "currently-playing"
+        if path.endswith("/recently-played"):
+            return "recently-played"
+        if "/me/top/" in path:
+            return "top"
+        if path.endswith("/search"):
+            return "search"
+        if path.endswith("/me"):
+            return "me"
+        return "other"
+
+    def budget(self, endpoint: str, seconds: float) -> int:
+        """Requisições que o orçamento do endpoint permite em um intervalo"""
+        rate, period = self._budgets[endpoint]
+        return int(rate * seconds / period)
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Cria os limitadores no loop atual (o anterior terminou ou ainda não havia)"""
+        self._loop = loop
+        self._global = AsyncLimiter(*self._global_rate)
+        self._endpoints = {
+            name: AsyncLimiter(rate, period) for name, (rate, period) in self._budgets.items()
+        }
+        self._turns = {}
+
+    def _limiters(self, endpoint: str) -> list[AsyncLimiter]:
+        if endpoint in self._reserved:
+            return [self._endpoints[endpoint]]
+        limiters = [self._global]
+        if endpoint in self._endpoints:
+            limiters.insert(0, self._endpoints[endpoint])
+        return limiters
+
+    async def acquire(self, endpoint: str, deadline: float) -> bool:
+        """Aguarda vaga para a requisição; retorna False se o prazo expirar
+
+        deadline segue loop.time() (o relógio monotônico, igual em todos os loops).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None and self._loop.is_running():
+                # Outro loop (thread) em execução é o dono: pede a vaga lá
+                future = asyncio.run_coroutine_threadsafe(self.acquire(endpoint, deadline), self._loop)
+                return await asyncio.wrap_future(future)
+            self._bind(loop)
+
+        limiters = self._limiters(endpoint)
+        cooldown = self._blocked_until - loop.time()
+        if cooldown > 0 or not all(limiter.has_capacity() for limiter in limiters):
+            self.counters["queued"] += 1
+
+        turn = self._turns.setdefault(endpoint, asyncio.Lock())
+        try:
+            await asyncio.wait_for(turn.acquire(), timeout=max(deadline - loop.time(), 0))
+            try:
+                # Só consome quando todos os limites têm capacidade: um prazo que expira
+                # esperando o limite global não gasta a vaga do endpoint
+                while True:
+                    now = loop.time()
+                    cooldown = self._blocked_until - now
+                    if cooldown > 0:
+                        if now + cooldown > deadline:
+                            raise asyncio.TimeoutError
+                        await asyncio.sleep(cooldown)
+                        continue
+                    empty = [limiter for limiter in limiters if not limiter.has_capacity()]
+                    if not empty:
+                        break
+                    if now >= deadline:
+                        raise asyncio.TimeoutError
+                    # Tempo de uma vaga no limite mais apertado
+                    drip = min(limiter.time_period / limiter.max_rate for limiter in empty)
+                    await asyncio.sleep(min(drip, deadline - now))
+
+                for limiter in limiters:
+                    # Não espera: a capacidade foi conferida acima, sem await no meio
+                    await limiter.acquire()
+            finally:
+                turn.release()
+        except asyncio.TimeoutError:
+            self.counters["dropped"] += 1
+            logger.warning(f"Requisição ao Spotify descartada após espera na fila ({endpoint})")
+            return False
+
+        self.counters["requests"] += 1
+        return True
+
+    def register_retry_after(self, retry_after: Optional[str]) -> None:
+        """Pausa todas as chamadas pelo tempo indicado no header Retry-After"""
+        try:
+            seconds = float(retry_after) if retry_after else DEFAULT_RETRY_AFTER
+        except ValueError:
+            seconds = DEFAULT_RETRY_AFTER
+
+        loop = asyncio.get_running_loop()
+        self._blocked_until = max(self._blocked_until, loop.time() + seconds)
+        self.counters["throttled"] += 1
+        logger.warning(f"Spotify retornou 429, pausando chamadas por {seconds:.1f}s")
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores para monitoramento"""
+        loop_time = asyncio.get_running_loop().time()
+        return {
+            **self.counters,
+            "cooldown_seconds": round(max(self._blocked_until - loop_time, 0), 2)
+        }
+
+
+# Instância global do governador de taxa
+spotify_governor = SpotifyRateGovernor(SPOTIFY_RATE_LIMIT, SPOTIFY_RATE_PERIOD, ENDPOINT_BUDGETS)
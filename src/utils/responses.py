@@ -32,6 +32,9 @@ class FormalResponses:
     # Rank
     RANK_MESSAGE = "Posição no ranking: #{position}\nTotal de mensagens: {count}"
     RANK_NOT_FOUND = "Registro não encontrado. Você ainda não enviou mensagens neste grupo."
+    TOP_HEADER = "Ranking de mensagens — página {page}/{pages}\n\n"
+    TOP_ENTRY = "#{position} {name} — {count} mensagens\n"
+    TOP_EMPTY = "Nenhuma mensagem registrada nesta página do ranking."
     
     # Configurações
     CONFIG_WELCOME = "Configurações de boas-vindas atualizadas."
@@ -56,6 +59,17 @@ class FormalResponses:
     # AutoMod
     LINK_DETECTED = "Link não autorizado detectado e removido."
     SPAM_DETECTED = "Conteúdo identificado como spam e removido."
+    BANNED_WORD_DETECTED = "Termo proibido detectado e removido."
+    BANNED_DOMAIN_DETECTED = "Link para domínio proibido detectado e removido."
+    FILTER_ADDED = "{item} adicionado à lista de itens proibidos."
+    FILTER_ALREADY_EXISTS = "{item} já consta na lista de itens proibidos."
+    FILTER_REMOVED = "{item} removido da lista de itens proibidos."
+    FILTER_NOT_FOUND = "{item} não consta na lista de itens proibidos."
+    FILTER_LIST = "Termos proibidos:\n{words}\n\nDomínios proibidos:\n{domains}"
+    FILTER_LIST_EMPTY = "(nenhum)"
+    FLOOD_DETECTED = "Envio excessivo de mensagens detectado. Mensagens removidas."
+    FLOOD_LIMITS = "Limites de flood: {messages} mensagens em {window} segundos; {duplicates} repetições."
+    FLOOD_UPDATED = "Limites de flood atualizados: {messages} mensagens em {window} segundos; {duplicates} repetições."
     
     # Errors gerais
     OPERATION_FAILED = "Falha operacional detectada. Verifique a sintaxe ou suas permissões."
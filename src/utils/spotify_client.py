@@ -0,0 +1,138 @@
+"""
+Cliente HTTP compartilhado para a API do Spotify
+Mantém um único pool de conexões keep-alive durante toda a vida da aplicação
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+import aiohttp
+
+from src.config import (
+    SPOTIFY_POOL_SIZE,
+    SPOTIFY_KEEPALIVE_TIMEOUT,
+    SPOTIFY_DNS_CACHE_TTL,
+    SPOTIFY_REQUEST_TIMEOUT,
+    SPOTIFY_QUEUE_TIMEOUT
+)
+from src.utils.rate_limit import spotify_governor
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+
+
+class SpotifyAPIError(Exception):
+    """Resposta inesperada da API do Spotify"""
+
+    def __init__(self, status: int):
+        super().__init__(f"status {status}")
+        self.status = status
+
+
+class SpotifyClient:
+    """Cliente único com pool de conexões para api.spotify.com e accounts.spotify.com"""
+
+    def __init__(self, pool_size: int, keepalive_timeout: float, dns_cache_ttl: int,
+                 request_timeout: float, queue_timeout: float):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
+        self.queue_timeout = queue_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Cria uma sessão com pool limitado, keep-alive e cache de DNS"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+
+    async def start(self) -> None:
+        """Abre o pool de conexões (chamado no startup da aplicação)"""
+        if self._session and not self._session.closed:
+            return
+
+        self._session = self._create_session()
+        self._loop = asyncio.get_running_loop()
+        logger.info(f"Cliente Spotify iniciado (pool de {self.pool_size} conexões)")
+
+    async def close(self) -> None:
+        """Fecha o pool de conexões (chamado no shutdown da aplicação)"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Cliente Spotify encerrado")
+        self._session = None
+        self._loop = None
+
+    async def request(self, method: str, url: str, *, headers: Optional[Dict[str, str]] = None,
+                      params: Optional[Dict[str, Any]] = None,
+                      data: Optional[Dict[str, Any]] = None,
+                      endpoint: Optional[str] = None,
+                      queue_timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """Executa uma requisição e retorna (status, corpo JSON ou texto)
+
+        Passa pelo governador de taxa: respeita Retry-After e, se a fila não
+        liberar a chamada dentro de SPOTIFY_QUEUE_TIMEOUT (ou queue_timeout),
+        retorna (429, None). endpoint escolhe outro orçamento que não o deduzido da URL.
+        """
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        loop = asyncio.get_running_loop()
+        endpoint = endpoint or spotify_governor.endpoint_for(url)
+        deadline = loop.time() + (self.queue_timeout if queue_timeout is None else queue_timeout)
+
+        while True:
+            if not await spotify_governor.acquire(endpoint, deadline):
+                return 429, None
+
+            # A sessão pertence ao loop em que foi criada; outro loop (ex.: servidor
+            # OAuth rodando em thread separada via start.py) usa uma sessão avulsa
+            if self._loop is not loop:
+                async with self._create_session() as session:
+                    status, body, retry_after = await self._send(session, method, url, headers, params, data)
+            else:
+                status, body, retry_after = await self._send(self._session, method, url, headers, params, data)
+
+            if status != 429:
+                return status, body
+
+            spotify_governor.register_retry_after(retry_after)
+
+    @staticmethod
+    async def _send(session: aiohttp.ClientSession, method: str, url: str,
+                    headers: Optional[Dict[str, str]], params: Optional[Dict[str, Any]],
+                    data: Optional[Dict[str, Any]]) -> Tuple[int, Any, Optional[str]]:
+        async with session.request(method, url, headers=headers, params=params, data=data) as response:
+            if response.content_type == "application/json":
+                body = await response.json()
+            else:
+                body = await response.text()
+            return response.status, body, response.headers.get("Retry-After")
+
+    async def get(self, url: str, access_token: str,
+                  params: Optional[Dict[str, Any]] = None,
+                  endpoint: Optional[str] = None,
+                  queue_timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """GET autenticado com o token de acesso do usuário"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+        return await self.request("GET", url, headers=headers, params=params, endpoint=endpoint,
+                                  queue_timeout=queue_timeout)
+
+
+# Instância global do cliente Spotify
+spotify_client = SpotifyClient(
+    SPOTIFY_POOL_SIZE,
+    SPOTIFY_KEEPALIVE_TIMEOUT,
+    SPOTIFY_DNS_CACHE_TTL,
+    SPOTIFY_REQUEST_TIMEOUT,
+    SPOTIFY_QUEUE_TIMEOUT
+)
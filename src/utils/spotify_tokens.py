@@ -0,0 +1,208 @@
+"""
+Cache dos tokens de acesso do Spotify
+Evita consultas ao banco no caminho quente e garante um único refresh por usuário
+"""
+import asyncio
+import base64
+import logging
+import weakref
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select
+
+from src.config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, CACHE_MAX_ENTRIES
+from src.database.db import db
+from src.database.models import SpotifyAccount
+from src.utils.cache import create_cache
+from src.utils.spotify_client import spotify_client
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+# Renova o token um pouco antes de expirar para não usá-lo no limite
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=60)
+
+# TTL padrão do cache; cada token é gravado com o tempo que falta para expirar
+TOKEN_CACHE_TTL = 3600
+
+
+def spotify_auth_headers() -> Dict[str, str]:
+    """Headers de autenticação do app para o endpoint de token"""
+    auth_header = base64.b64encode(
+        f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode()
+    ).decode()
+
+    return {
+        "Authorization": f"Basic {auth_header}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+
+
+async def request_token_refresh(refresh_token: str, endpoint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Troca um refresh token por um novo token de acesso (endpoint: orçamento do governador)"""
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token
+    }
+
+    status, token_data = await spotify_client.request(
+        "POST", SPOTIFY_TOKEN_URL, headers=spotify_auth_headers(), data=data, endpoint=endpoint
+    )
+    if status != 200:
+        return None
+    return token_data
+
+
+_app_token: Optional[Tuple[str, datetime]] = None
+
+
+async def get_app_token() -> Optional[str]:
+    """Token do próprio app (client credentials), para buscas que não dependem de usuário"""
+    global _app_token
+    if _app_token and datetime.utcnow() + TOKEN_EXPIRY_MARGIN < _app_token[1]:
+        return _app_token[0]
+
+    status, token_data = await spotify_client.request(
+        "POST", SPOTIFY_TOKEN_URL, headers=spotify_auth_headers(),
+        data={"grant_type": "client_credentials"}
+    )
+    if status != 200:
+        logger.error(f"Erro ao obter token do app: {status}")
+        return None
+
+    expires_at = datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600))
+    _app_token = (token_data["access_token"], expires_at)
+    return _app_token[0]
+
+
+class TokenCache:
+    """Tokens por usuário em cache (compartilhado se houver Redis), com write-through para spotify_accounts"""
+
+    def __init__(self):
+        self._tokens = create_cache("spotify_tokens", TOKEN_CACHE_TTL, CACHE_MAX_ENTRIES)
+        # Só existe enquanto alguém segura ou aguarda o lock: não cresce com os usuários já vistos
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._last_used: Dict[int, datetime] = {}
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "db_loads": 0,
+            # Renovações no caminho de um comando (o que a renovação antecipada deve evitar)
+            "refreshes_inline": 0,
+            "refreshes_ahead": 0,
+            # Renovações pedidas por tarefas em segundo plano (ex.: coleta de reproduções)
+            "refreshes_background": 0,
+            "refresh_failures": 0
+        }
+
+    @staticmethod
+    def _is_fresh(expires_at: datetime) -> bool:
+        return datetime.utcnow() + TOKEN_EXPIRY_MARGIN < expires_at
+
+    async def _cached(self, user_id: int) -> Optional[Tuple[str, datetime]]:
+        found, value = await self._tokens.get(user_id)
+        if not found:
+            return None
+        access_token, expires_at = value
+        return access_token, datetime.fromisoformat(expires_at)
+
+    async def store(self, user_id: int, access_token: str, expires_at: datetime) -> None:
+        """Atualiza o token em cache (após login ou refresh); expira junto com o token"""
+        ttl = (expires_at - datetime.utcnow()).total_seconds()
+        if ttl > 0:
+            await self._tokens.set(user_id, [access_token, expires_at.isoformat()], ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Remove o token do cache (ex.: conta desconectada)"""
+        await self._tokens.invalidate(user_id)
+
+    def active_users(self, window: timedelta) -> List[int]:
+        """Usuários que usaram algum comando do Spotify dentro da janela"""
+        cutoff = datetime.utcnow() - window
+        for user_id in [uid for uid, used in self._last_used.items() if used < cutoff]:
+            del self._last_used[user_id]
+        return list(self._last_used)
+
+    async def get_token(self, user_id: int, touch: bool = True,
+                        endpoint: Optional[str] = None) -> Optional[str]:
+        """Retorna um token válido, renovando-o se necessário
+
+        touch=False não conta como uso (tarefas em segundo plano não mantêm o
+        usuário na lista de renovação antecipada) e a renovação, se houver, é
+        contada em refreshes_background. endpoint escolhe o orçamento da renovação.
+        """
+        if touch:
+            self._last_used[user_id] = datetime.utcnow()
+        cached = await self._cached(user_id)
+        if cached and self._is_fresh(cached[1]):
+            self.counters["hits"] += 1
+            return cached[0]
+
+        # Apenas um carregamento/refresh por usuário; os demais aguardam o resultado
+        async with self._lock(user_id):
+            cached = await self._cached(user_id)
+            if cached and self._is_fresh(cached[1]):
+                self.counters["hits"] += 1
+                return cached[0]
+
+            counter = "refreshes_inline" if touch else "refreshes_background"
+            return await self._load_or_refresh(user_id, force=False, counter=counter, endpoint=endpoint)
+
+    async def refresh_ahead(self, user_id: int, min_validity: timedelta) -> Optional[str]:
+        """Renova o token antes de expirar, se ainda não foi renovado por outro caminho"""
+        async with self._lock(user_id):
+            cached = await self._cached(user_id)
+            if cached and datetime.utcnow() + min_validity < cached[1]:
+                return cached[0]
+
+            return await self._load_or_refresh(user_id, force=True, counter="refreshes_ahead")
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        """Lock de carga/refresh do usuário (o mesmo para todos que o pedirem ao mesmo tempo)"""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def _load_or_refresh(self, user_id: int, force: bool, counter: str,
+                               endpoint: Optional[str] = None) -> Optional[str]:
+        async with db.session_maker() as session:
+            self.counters["db_loads"] += 1
+            stmt = select(SpotifyAccount).where(SpotifyAccount.user_id == user_id)
+            result = await session.execute(stmt)
+            account = result.scalar_one_or_none()
+
+            if not account:
+                await self.invalidate(user_id)
+                return None
+
+            if not force and self._is_fresh(account.token_expires_at):
+                await self.store(user_id, account.access_token, account.token_expires_at)
+                return account.access_token
+
+            token_data = await request_token_refresh(account.refresh_token, endpoint=endpoint)
+            if not token_data:
+                self.counters["refresh_failures"] += 1
+                logger.error(f"Erro ao renovar token para user {user_id}")
+                return None
+
+            account.access_token = token_data["access_token"]
+            account.token_expires_at = datetime.utcnow() + timedelta(
+                seconds=token_data.get("expires_in", 3600)
+            )
+            if "refresh_token" in token_data:
+                account.refresh_token = token_data["refresh_token"]
+
+            await session.commit()
+
+            self.counters[counter] += 1
+            await self.store(user_id, account.access_token, account.token_expires_at)
+            return account.access_token
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        return {"backend": self._tokens.stats()["backend"], **self.counters, "locks": len(self._locks)}
+
+
+# Instância global do cache de tokens
+token_cache = TokenCache()
@@ -0,0 +1,192 @@
+"""
+Processamento concorrente de updates com ordem garantida por chave
+Updates rodam em paralelo em duas faixas: a rápida (mensagens, moderação,
+configuração) e a lenta (IA e Spotify), cada uma com seu limite. Updates
+com a mesma chave (chat, ou chat + usuário) são executados na ordem de chegada;
+os que esperam o anterior da chave não ocupam vaga no limite global
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Hashable, Tuple
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from src.config import UPDATE_MAX_PENDING, UPDATE_FAST_CONCURRENCY, UPDATE_SLOW_CONCURRENCY
+from src.utils.dot_commands import dot_commands
+
+FAST = "fast"
+SLOW = "slow"
+
+# Comandos que dependem de APIs externas lentas (IA e Spotify)
+SLOW_COMMANDS = frozenset({
+    "gerarimagem", "pesquisar", "perguntar",
+    "fm", "w", "profile", "plays", "chart", "whoknows", "crowns", "friends",
+    "pesquisarmusica", "pesquisarartista", "pesquisaralbum", "adicionaramigo"
+})
+
+
+def classify_update(update: object) -> Tuple[str, Hashable]:
+    """Faixa e chave de ordenação de um update
+
+    Comandos, callbacks e mudanças de membros seguem a ordem do chat (ex.: /ban
+    antes de /unban). Mensagens comuns só precisam de ordem por usuário (AutoMod
+    e anti-flood). Comandos lentos têm chave própria por usuário: não travam o
+    chat inteiro nem atrasam a moderação das mensagens comuns do mesmo usuário.
+    """
+    if not isinstance(update, Update) or update.effective_chat is None:
+        return FAST, None
+
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id if update.effective_user else None
+    message = update.message
+    text = message.text if message and message.text else ""
+
+    if text.startswith("/"):
+        command = text[1:].split(maxsplit=1)[0].split("@")[0].lower() if len(text) > 1 else ""
+        if command in SLOW_COMMANDS:
+            return SLOW, ("slow", chat_id, user_id)
+        return FAST, ("chat", chat_id)
+
+    if text.startswith(".") and dot_commands.match(text):
+        return SLOW, ("slow", chat_id, user_id)
+
+    if message is not None and user_id is not None:
+        return FAST, ("user", chat_id, user_id)
+
+    return FAST, ("chat", chat_id)
+
+
+class LaneUpdateProcessor(BaseUpdateProcessor):
+    """Processador de updates com faixas rápida/lenta e ordem por chave"""
+
+    def __init__(self, max_pending: int, fast_concurrency: int, slow_concurrency: int):
+        # O semáforo da classe base limita updates aguardando faixa ou executando; os que
+        # esperam o anterior da mesma chave ficam fora dele (uma chave não trava os outros chats)
+        super().__init__(max_pending)
+        self._capacity = {FAST: fast_concurrency, SLOW: slow_concurrency}
+        self._lanes: Dict[str, asyncio.Semaphore] = {}
+        # Último update de cada chave: o próximo da mesma chave espera por ele
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+        # Updates recebidos da aplicação (a fila de webhooks compara com os que repassou)
+        self.received = 0
+        self._counters: Dict[str, Dict[str, float]] = {
+            lane: {"processed": 0, "chained": 0, "waiting": 0, "running": 0,
+                   "max_wait_ms": 0.0, "total_wait_ms": 0.0}
+            for lane in self._capacity
+        }
+
+    async def initialize(self) -> None:
+        self._lanes = {lane: asyncio.Semaphore(capacity) for lane, capacity in self._capacity.items()}
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.received += 1
+        lane, key = classify_update(update)
+        counters = self._counters[lane]
+        queued = time.monotonic()
+
+        # Encadeia na chave antes de qualquer await: preserva a ordem de chegada
+        previous = self._tails.get(key) if key is not None else None
+        done = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._tails[key] = done
+
+        admitted = False
+        try:
+            if previous is not None:
+                counters["chained"] += 1
+                try:
+                    # shield: cancelar quem espera não pode cancelar o future do anterior
+                    await asyncio.shield(previous)
+                finally:
+                    counters["chained"] -= 1
+            # Só entra no limite global depois do anterior da chave
+            async with self._semaphore:
+                admitted = True
+                await self._run_in_lane(lane, coroutine, queued)
+        finally:
+            if not admitted:
+                # Cancelado (shutdown) antes de executar
+                coroutine.close()
+            if previous is not None and not previous.done():
+                # Cancelado ainda na fila: o próximo da chave continua esperando o anterior
+                previous.add_done_callback(lambda _: self._release(key, done))
+            else:
+                self._release(key, done)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Executa o update na sua faixa, sem ordenação por chave"""
+        lane, _ = classify_update(update)
+        await self._run_in_lane(lane, coroutine, time.monotonic())
+
+    async def _run_in_lane(self, lane: str, coroutine: Awaitable[Any], queued: float) -> None:
+        counters = self._counters[lane]
+        counters["waiting"] += 1
+        waiting = True
+        try:
+            async with self._lanes[lane]:
+                waiting = False
+                counters["waiting"] -= 1
+                waited_ms = (time.monotonic() - queued) * 1000
+                counters["total_wait_ms"] += waited_ms
+                counters["max_wait_ms"] = max(counters["max_wait_ms"], waited_ms)
+                counters["running"] += 1
+                try:
+                    await coroutine
+                finally:
+                    counters["running"] -= 1
+                    counters["processed"] += 1
+        finally:
+            if waiting:
+                counters["waiting"] -= 1
+                coroutine.close()
+
+    def has_room(self, update: object) -> bool:
+        """Se a faixa do update tem vaga: menos aguardando que a sua capacidade
+
+        A folga de uma capacidade mantém a faixa ocupada entre uma execução e
+        outra; o excesso fica na fila de entrada, que é priorizada.
+        """
+        lane, _ = classify_update(update)
+        return (
+            self._counters[lane]["waiting"] < self._capacity[lane]
+            and self.current_concurrent_updates < self.max_concurrent_updates
+        )
+
+    def _release(self, key: Hashable, done: asyncio.Future) -> None:
+        """Libera o próximo update da chave"""
+        if not done.done():
+            done.set_result(None)
+        if key is not None and self._tails.get(key) is done:
+            del self._tails[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila e ocupação de cada faixa"""
+        lanes = {}
+        for lane, counters in self._counters.items():
+            capacity = self._capacity[lane]
+            processed = counters["processed"]
+            lanes[lane] = {
+                "capacity": capacity,
+                "running": counters["running"],
+                "waiting": counters["waiting"],
+                "chained": counters["chained"],
+                "utilization": round(counters["running"] / capacity, 3),
+                "processed": processed,
+                "avg_wait_ms": round(counters["total_wait_ms"] / processed, 2) if processed else 0.0,
+                "max_wait_ms": round(counters["max_wait_ms"], 2)
+            }
+        return {
+            "max_pending": self.max_concurrent_updates,
+            "in_flight": self.current_concurrent_updates,
+            "queue_depth": sum(counters["waiting"] for counters in self._counters.values()),
+            "chained_depth": sum(counters["chained"] for counters in self._counters.values()),
+            "ordered_keys": len(self._tails),
+            "lanes": lanes
+        }
+
+
+# Instância global do processador de updates
+update_processor = LaneUpdateProcessor(UPDATE_MAX_PENDING, UPDATE_FAST_CONCURRENCY, UPDATE_SLOW_CONCURRENCY)
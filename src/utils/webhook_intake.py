@@ -0,0 +1,162 @@
+"""
+Fila de entrada dos webhooks do Telegram
+Limitada e com prioridades: moderação > comandos (Spotify/IA) > mensagens
+comuns. Cheia, descarta primeiro as mensagens comuns mais antigas; os
+updates só seguem para a aplicação quando a faixa do processador que vai
+executá-los tem vaga
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from telegram import Update
+
+from src.config import WEBHOOK_QUEUE_SIZE
+from src.utils.dot_commands import dot_commands
+
+logger = logging.getLogger(__name__)
+
+MODERATION = 0
+COMMAND = 1
+MESSAGE = 2
+PRIORITY_NAMES = {MODERATION: "moderation", COMMAND: "command", MESSAGE: "message"}
+
+MODERATION_COMMANDS = frozenset({
+    "ban", "kick", "mute", "unmute", "unban", "nuke", "purge",
+    "configuracoes", "proibir", "desproibir", "proibirdominio", "desproibirdominio",
+    "filtros", "antiflood"
+})
+
+# Espera entre verificações de vaga quando as faixas estão cheias (s)
+SATURATED_POLL_INTERVAL = 0.01
+
+
+def update_priority(update: Update) -> int:
+    """Classe de prioridade de um update"""
+    # Botões de configuração e mudanças de membros/administradores contam como moderação
+    if update.callback_query or update.chat_member or update.my_chat_member:
+        return MODERATION
+
+    message = update.message
+    text = message.text if message and message.text else ""
+    if text.startswith("/"):
+        command = text[1:].split(maxsplit=1)[0].split("@")[0].lower() if len(text) > 1 else ""
+        return MODERATION if command in MODERATION_COMMANDS else COMMAND
+    if text.startswith(".") and dot_commands.match(text):
+        return COMMAND
+    return MESSAGE
+
+
+class WebhookIntake:
+    """Fila limitada por prioridade entre o endpoint do webhook e a aplicação do bot"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._queues: List[Deque[Update]] = [deque() for _ in PRIORITY_NAMES]
+        self._application: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        # Repassados à aplicação (em trânsito até o processador recebê-los)
+        self._forwarded = 0
+        self.counters: Dict[str, Dict[str, int]] = {
+            name: {"accepted": 0, "shed": 0, "forwarded": 0} for name in PRIORITY_NAMES.values()
+        }
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues)
+
+    def start(self, application: Any) -> None:
+        """Inicia o repasse para a aplicação no loop atual"""
+        self._application = application
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Encerra o repasse e entrega o que restou na fila (processado no stop da aplicação)"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        pending = len(self)
+        while self._pop(force=True) is not None:
+            pass
+        logger.info(f"Fila de webhooks encerrada ({pending} updates repassados no shutdown)")
+
+    def submit(self, update: Update) -> bool:
+        """Enfileira um update; retorna False se ele foi descartado por falta de espaço"""
+        priority = update_priority(update)
+
+        if len(self) >= self.capacity:
+            # Abre espaço descartando o update mais antigo da classe menos prioritária
+            victim = next(
+                (p for p in range(MESSAGE, priority, -1) if self._queues[p]),
+                None
+            )
+            if victim is None:
+                self.counters[PRIORITY_NAMES[priority]]["shed"] += 1
+                return False
+            self._queues[victim].popleft()
+            self.counters[PRIORITY_NAMES[victim]]["shed"] += 1
+
+        self._queues[priority].append(update)
+        self.counters[PRIORITY_NAMES[priority]]["accepted"] += 1
+        self.max_depth = max(self.max_depth, len(self))
+        self._ready.set()
+        return True
+
+    def _pop(self, force: bool = False) -> Optional[Update]:
+        """Repassa o próximo update com vaga na sua faixa (maior prioridade primeiro)
+
+        Com force, repassa o de maior prioridade mesmo sem vaga (shutdown).
+        """
+        processor = self._application.update_processor
+        for priority, queue in enumerate(self._queues):
+            # Só o mais antigo de cada prioridade: a ordem de chegada se mantém dentro dela
+            if queue and (force or processor.has_room(queue[0])):
+                update = queue.popleft()
+                self._application.update_queue.put_nowait(update)
+                self._forwarded += 1
+                self.counters[PRIORITY_NAMES[priority]]["forwarded"] += 1
+                return update
+        return None
+
+    def _in_transit(self) -> bool:
+        """Se há update repassado que o processador ainda não contou na faixa"""
+        return self._forwarded > self._application.update_processor.received
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while len(self):
+                if self._in_transit():
+                    # Cede a vez para a aplicação entregar o último ao processador
+                    await asyncio.sleep(0)
+                # Só repassa com vaga na faixa: o excesso fica aqui, onde é limitado e priorizado
+                # (um comando lento não segura as mensagens se só a faixa lenta estiver cheia)
+                elif self._pop() is None:
+                    await asyncio.sleep(SATURATED_POLL_INTERVAL)
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila e contagens por prioridade"""
+        return {
+            "capacity": self.capacity,
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "depth_by_priority": {
+                PRIORITY_NAMES[priority]: len(queue) for priority, queue in enumerate(self._queues)
+            },
+            "priorities": self.counters
+        }
+
+
+# Instância global da fila de webhooks
+webhook_intake = WebhookIntake(WEBHOOK_QUEUE_SIZE)
@@ -12,6 +12,10 @@ from hypercorn.config import Config
 from src.bot import create_application
 from src.oauth_server import app, set_bot_application
 from src.config import get_oauth_base_url
+from src.utils.spotify_client import spotify_client
+from src.database.write_buffer import play_write_buffer
+from src.database.message_counter import message_counter
+from src.utils.webhook_intake import webhook_intake
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -37,7 +41,10 @@ async def setup_webhook(bot_app):
         # Configura novo webhook com token secreto
         await bot_app.bot.set_webhook(
             url=webhook_url,
-            allowed_updates=["message", "edited_message", "callback_query", "inline_query"],
+            allowed_updates=[
+                "message", "edited_message", "callback_query", "inline_query",
+                "chat_member", "my_chat_member"
+            ],
             secret_token=WEBHOOK_SECRET_TOKEN
         )
         logger.info(f"✅ Webhook configurado: {webhook_url}")
@@ -71,12 +78,20 @@ async def shutdown(signal_name=None):
         except:
             pass
         
+        # Repassa os updates ainda na fila de entrada; o stop da aplicação os processa
+        await webhook_intake.close()
+        
         try:
             await bot_app.stop()
             await bot_app.shutdown()
             logger.info("Bot application encerrado")
         except Exception as e:
             logger.error(f"Erro ao encerrar bot: {e}")
+    
+    # Grava reproduções e contagens ainda em memória antes de fechar as conexões
+    await play_write_buffer.close()
+    await message_counter.close()
+    await spotify_client.close()
 
 
 async def main():
@@ -132,6 +147,9 @@ async def main():
             raise
         logger.info("=" * 60)
         
+        # Pool de conexões compartilhado com a API do Spotify
+        await spotify_client.start()
+        
         await bot_app.start()
         
         # Configura webhook